@@ -0,0 +1,132 @@
+#!/usr/bin/python3
+#
+# Copyright (c) 2015 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+"""Compares the per-file cost of fetching the analyze properties with
+   XPath expressions which are built and evaluated for every file (the
+   former way) and with the compiled XPath objects of AnalyzeQuery.
+   The files are parsed once before the measurement.
+
+   Usage: python3 benchmarks/bench_analyze.py [FILES]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from docmanager.analyzer import Analyzer, AnalyzeQuery
+from docmanager.core import NS
+from docmanager.logmanager import setloglevel
+from docmanager.xmlhandler import XmlHandler
+from docmanager.xmlutil import localname
+
+DOCUMENT = """<?xml version="1.0" encoding="UTF-8"?>
+<article xmlns="http://docbook.org/ns/docbook"
+         xmlns:dm="urn:x-suse:ns:docmanager" version="5.0">
+  <title>Article {0}</title>
+  <info>
+    <dm:docmanager>
+      <dm:maintainer>user{1}</dm:maintainer>
+      <dm:status>{2}</dm:status>
+      <dm:priority>{3}</dm:priority>
+      <dm:deadline>2026-{4:02d}-01</dm:deadline>
+      <dm:translation>yes</dm:translation>
+    </dm:docmanager>
+  </info>
+  <para>Hello</para>
+</article>
+"""
+
+STATUS = ("editing", "edited", "proofing", "proofed")
+FIELDS = {"maintainer", "status", "priority", "deadline"}
+FILTERS = ["status=editing", "-translation=no"]
+
+
+def uncompiled(handler, fields, filters):
+    """The former fetch_data: both XPath expressions are built and
+       evaluated for every file"""
+    dm = handler.dm
+    xpath = "*[self::dm:" + " or self::dm:".join(fields) + "]"
+    data = { localname(e.tag): e.text for e in dm.xpath(xpath, namespaces=NS) }
+
+    conditions = dict()
+    for f in filters:
+        if f[0] not in "+-":
+            f = "+" + f
+        prop, cond = f[1:].split("=", 1)
+        conditions[prop] = (f[0], cond)
+
+    xpath = "*[self::dm:" + " or self::dm:".join(conditions) + "]"
+    values = { localname(e.tag): e.text for e in dm.xpath(xpath, namespaces=NS) }
+
+    for prop, (mode, cond) in conditions.items():
+        if prop not in values or (mode == '+') != (values[prop] == cond):
+            return {}
+
+    return data
+
+
+def compiled(handler, query):
+    """fetch_data with the compiled AnalyzeQuery"""
+    return Analyzer(handler).fetch_data(query)
+
+
+def measure(func, handlers, *args):
+    """Returns the average time per file in microseconds"""
+    best = None
+
+    for _ in range(3):
+        start = time.perf_counter()
+        for handler in handlers:
+            func(handler, *args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best / len(handlers) * 1000000
+
+
+def main(count):
+    setloglevel(0)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        handlers = list()
+
+        for i in range(count):
+            filename = os.path.join(tmpdir, "file-{}.xml".format(i))
+            with open(filename, 'w') as f:
+                f.write(DOCUMENT.format(i, i % 7, STATUS[i % 4], i % 10 + 1, i % 12 + 1))
+            handlers.append(XmlHandler(filename, True, True))
+
+        query = AnalyzeQuery(FIELDS, FILTERS)
+
+        # both variants must return the same data
+        for handler in handlers:
+            assert uncompiled(handler, FIELDS, FILTERS) == compiled(handler, query)
+
+        before = measure(uncompiled, handlers, FIELDS, FILTERS)
+        after = measure(compiled, handlers, query)
+
+        print("{} files".format(count))
+        print("{:<28} {:>10.1f} us/file".format("XPath built per file", before))
+        print("{:<28} {:>10.1f} us/file".format("compiled AnalyzeQuery", after))
+        print("{:<28} {:>10.1f}x".format("speedup", before / after))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3000)
@@ -0,0 +1,133 @@
+#!/usr/bin/python3
+#
+# Copyright (c) 2015 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+"""Measures the memory of the XmlHandlers over a synthetic corpus: the
+   peak of the Python allocations (tracemalloc) and the peak RSS of the
+   process. Every scenario runs in a fresh process.
+
+   Scenarios:
+     handlers   keeps an XmlHandler of every file alive
+     set        docmanager set (the files are parsed, changed, and written
+                one after another)
+     stop       docmanager set --stop-on-error (all files are parsed first)
+     get        docmanager get
+
+   Usage: python3 benchmarks/bench_memory.py [FILES]
+"""
+
+import os
+import resource
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from docmanager.logmanager import setloglevel
+
+DOCUMENT = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE article [ <!ENTITY product "DocManager"> ]>
+<article xmlns="http://docbook.org/ns/docbook"
+         xmlns:dm="urn:x-suse:ns:docmanager" version="5.0">
+  <title>Article {0} about &product;</title>
+  <info>
+    <dm:docmanager>
+      <dm:maintainer>user{1}</dm:maintainer>
+      <dm:status>editing</dm:status>
+    </dm:docmanager>
+  </info>
+{2}</article>
+"""
+
+PARA = """  <para>Lorem ipsum dolor sit amet, &product; consectetur adipisici elit,
+    sed eiusmod tempor incidunt ut labore et dolore magna aliqua.</para>
+"""
+
+SCENARIOS = ("handlers", "set", "stop", "get")
+
+
+def write_corpus(tmpdir, count):
+    """Writes count files with 40 paragraphs each"""
+    files = list()
+
+    for i in range(count):
+        filename = os.path.join(tmpdir, "file-{}.xml".format(i))
+        with open(filename, 'w') as f:
+            f.write(DOCUMENT.format(i, i % 7, PARA * 40))
+        files.append(filename)
+
+    return files
+
+
+def run(scenario, files):
+    """Runs a scenario in the current process and prints its measurement"""
+    from docmanager.action import Actions
+    from docmanager.cli import parsecli
+    from docmanager.xmlhandler import XmlHandler
+
+    setloglevel(0)
+    devnull = open(os.devnull, 'w')
+    stdout, sys.stdout = sys.stdout, devnull
+
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    if scenario == "handlers":
+        handlers = [ XmlHandler(f) for f in files ]
+    else:
+        command = { "set": "-j 1 set -p status=edited",
+                    "stop": "-j 1 set --stop-on-error -p status=edited",
+                    "get": "-j 1 get -p status" }[scenario]
+        Actions(parsecli(shlex.split(command) + files)).parse()
+
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    sys.stdout = stdout
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print("{:>10} {:>16.1f} {:>14.1f} {:>9.2f}".format(
+          scenario, peak / 2**20, rss / 1024, elapsed))
+
+
+def main(count):
+    print("{} files".format(count))
+    print("{:>10} {:>16} {:>14} {:>9}".format(
+          "scenario", "tracemalloc [MiB]", "max RSS [MiB]", "time [s]"))
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        write_corpus(tmpdir, count)
+        listfile = os.path.join(tmpdir, "files.txt")
+
+        for scenario in SCENARIOS:
+            # every scenario gets a fresh copy of the corpus and a fresh process
+            files = write_corpus(tmpdir, count)
+            with open(listfile, 'w') as f:
+                f.write("\n".join(files))
+
+            subprocess.check_call([sys.executable, "-W", "ignore", __file__, "--run", scenario, listfile])
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--run"]:
+        with open(sys.argv[3]) as f:
+            run(sys.argv[2], f.read().split("\n"))
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,100 @@
+#!/usr/bin/python3
+#
+# Copyright (c) 2015 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+"""Compares the prolog scanner (findprolog) with a complete SAX pass over
+   the document, which was the former way to detect the prolog.
+
+   Usage: python3 benchmarks/bench_prolog.py [CHAPTERS ...]
+"""
+
+import os
+import sys
+import tempfile
+import timeit
+import xml.sax
+
+from docmanager.logmanager import setloglevel
+from docmanager.xmlutil import findprolog
+
+HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE book [
+  <!ENTITY % entities SYSTEM "entity-decl.ent">
+  %entities;
+]>
+<book xmlns="http://docbook.org/ns/docbook"
+      xmlns:dm="urn:x-suse:ns:docmanager" version="5.0">
+  <title>Benchmark</title>
+  <info>
+    <dm:docmanager>
+      <dm:maintainer>toms</dm:maintainer>
+    </dm:docmanager>
+  </info>
+"""
+
+CHAPTER = """  <chapter xml:id="ch{0}">
+    <title>Chapter {0}</title>
+    <para>Lorem ipsum dolor sit amet, consectetur adipisici elit, sed
+      eiusmod tempor incidunt ut labore et dolore magna aliqua.</para>
+    <para>Ut enim ad minim veniam, quis nostrud exercitation ullamco
+      laboris nisi ut aliquid ex ea commodi consequat.</para>
+  </chapter>
+"""
+
+
+def write_book(filename, chapters):
+    """Writes a DocBook 5 book with the given number of chapters"""
+    with open(filename, 'w') as f:
+        f.write(HEADER)
+        for i in range(chapters):
+            f.write(CHAPTER.format(i))
+        f.write("</book>\n")
+
+
+def sax_pass(filename):
+    """A complete SAX pass over the document"""
+    parser = xml.sax.make_parser()
+    parser.setFeature(xml.sax.handler.feature_external_ges, False)
+    parser.setFeature(xml.sax.handler.feature_external_pes, False)
+    parser.setContentHandler(xml.sax.handler.ContentHandler())
+    parser.parse(filename)
+
+
+def main(sizes):
+    setloglevel(0)
+    print("{:>9} {:>12} {:>14} {:>14} {:>9}".format(
+          "chapters", "size [KiB]", "SAX pass [ms]", "findprolog [ms]", "speedup"))
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for chapters in sizes:
+            filename = os.path.join(tmpdir, "book-{}.xml".format(chapters))
+            write_book(filename, chapters)
+            size = os.path.getsize(filename) / 1024
+            number = 10
+
+            sax = min(timeit.repeat(lambda: sax_pass(filename),
+                                    number=number, repeat=3)) / number
+            scan = min(timeit.repeat(lambda: findprolog(filename),
+                                     number=number, repeat=3)) / number
+
+            print("{:>9} {:>12.0f} {:>14.3f} {:>14.3f} {:>8.0f}x".format(
+                  chapters, size, sax * 1000, scan * 1000, sax / scan))
+
+
+if __name__ == "__main__":
+    main([int(i) for i in sys.argv[1:]] or [10, 100, 1000, 10000])
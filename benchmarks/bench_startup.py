@@ -0,0 +1,101 @@
+#!/usr/bin/python3
+#
+# Copyright (c) 2015 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+"""Measures the startup time of docmanager: a bare interpreter, the
+   import of the package, `docmanager --version`, and `docmanager get`
+   on a small file. Every command runs in a new process.
+
+   Usage: python3 benchmarks/bench_startup.py [RUNS]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+DOCUMENT = """<?xml version="1.0" encoding="UTF-8"?>
+<article xmlns="http://docbook.org/ns/docbook"
+         xmlns:dm="urn:x-suse:ns:docmanager" version="5.0">
+  <title>Startup</title>
+  <info>
+    <dm:docmanager>
+      <dm:maintainer>toms</dm:maintainer>
+    </dm:docmanager>
+  </info>
+  <para>Hello</para>
+</article>
+"""
+
+MAIN = "import sys; from docmanager import main; sys.argv[0] = 'docmanager'; main()"
+
+
+def measure(cmd, runs, env):
+    """Runs a command several times and returns the wall times in seconds"""
+    times = list()
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.check_call(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                              env=env)
+        times.append(time.perf_counter() - start)
+
+    return times
+
+
+def median(values):
+    """Returns the median of a list of numbers (the statistics module
+       needs Python 3.4)
+    """
+    values = sorted(values)
+    middle = len(values) // 2
+
+    if len(values) % 2:
+        return values[middle]
+
+    return (values[middle - 1] + values[middle]) / 2
+
+
+def main(runs):
+    # never forward the calls to a running server
+    env = dict(os.environ, DOCMANAGER_NO_SERVER="1")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "startup.xml")
+        with open(filename, 'w') as f:
+            f.write(DOCUMENT)
+
+        commands = [
+            ("python -c pass", [sys.executable, "-c", "pass"]),
+            ("import docmanager", [sys.executable, "-c", "import docmanager"]),
+            ("docmanager --version", [sys.executable, "-c", MAIN, "--version"]),
+            ("docmanager get", [sys.executable, "-c", MAIN, "get", "-p", "maintainer", filename]),
+        ]
+
+        print("{:<22} {:>12} {:>12} {:>12}".format("command", "min [ms]", "median [ms]", "max [ms]"))
+
+        for name, cmd in commands:
+            times = measure(cmd, runs, env)
+            print("{:<22} {:>12.1f} {:>12.1f} {:>12.1f}".format(
+                  name, min(times) * 1000, median(times) * 1000,
+                  max(times) * 1000))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
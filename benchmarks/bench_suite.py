@@ -0,0 +1,305 @@
+#!/usr/bin/python3
+#
+# Copyright (c) 2015 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+"""Runs the benchmark suite over a generated corpus (see corpus.py) and
+   compares the results with the stored baselines.
+
+   Cases:
+     parse            XmlHandler of every file
+     parse-readonly   XmlHandler in the read-only head parse mode
+     get              docmanager get
+     set              docmanager set (every file is changed and written)
+     analyze          docmanager analyze with filters and sort
+     render-*         the text, table, json, and xml renderers of get
+
+   Every case runs several times; the fastest run counts. A case is a
+   regression if it is slower than its baseline by more than the
+   threshold. Absolute timings are only comparable on the same machine,
+   so the baselines are stored per machine: they are keyed by the host
+   name and the Python interpreter and kept outside of the repository
+   (by default in $XDG_CACHE_HOME/docmanager/bench-baselines.json).
+   Baselines are only compared if they were measured over the same
+   corpus. To compare a change with the baseline commit, run the suite
+   with --save on a checkout of the baseline commit first.
+
+   Usage: python3 benchmarks/bench_suite.py [OPTIONS] [CASE ...]
+
+     --save             store the results as the new baselines
+     --threshold N      allowed slowdown in percent (default: 25)
+     --baselines FILE   the baseline file
+                        (default: $XDG_CACHE_HOME/docmanager/bench-baselines.json)
+     --repeat N         runs per case (default: 5)
+     --files, --size, --entities, --properties, --seed
+                        the corpus parameters (see corpus.py)
+
+   The exit code is 1 if a case regressed.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shlex
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+from corpus import Corpus, DEFAULT_CORPUS, write_corpus
+from docmanager.logmanager import setloglevel
+
+BASELINES = os.path.join(os.path.expanduser(os.environ.get('XDG_CACHE_HOME', '~/.cache/')),
+                         "docmanager", "bench-baselines.json")
+
+GET = "-j 1 get -p maintainer -p status -p priority -p bugtracker/component"
+ANALYZE = "-j 1 analyze -q -qf '{os.file} {maintainer} {priority}' " \
+          "--filter 'priority>=3' --filter=-status=locdrop -s priority"
+RENDERERS = ("text", "table", "json", "xml")
+
+
+@contextmanager
+def redirect_stdout(stream):
+    """Replaces sys.stdout temporarily (contextlib.redirect_stdout needs
+       Python 3.4)
+    """
+    saved = sys.stdout
+    sys.stdout = stream
+    try:
+        yield stream
+    finally:
+        sys.stdout = saved
+
+
+def machine_key():
+    """Returns the key of the baselines of this machine and interpreter
+
+    :rtype: str
+    """
+    return "{} {} {} ({})".format(platform.node(), platform.python_implementation(),
+                                  platform.python_version(), platform.machine())
+
+
+def docmanager(cmdline, files):
+    """Runs a docmanager command with stdout redirected to /dev/null
+
+    :param str cmdline: The command line without the files
+    :param list files: The files
+    :return: (result of the command, parsed arguments)
+    """
+    from docmanager.action import Actions
+    from docmanager.cli import parsecli
+
+    args = parsecli(shlex.split(cmdline) + files)
+
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        return Actions(args).parse(), args
+
+
+def case_parse(files, readonly=False):
+    """Returns the function of the parse cases"""
+    from docmanager.xmlhandler import XmlHandler
+
+    def run():
+        for fname in files:
+            XmlHandler(fname, True, readonly)
+
+    return run
+
+
+def case_set(files):
+    """Returns the function of the set case; the status alternates, so
+       every run has to write every file
+    """
+    values = ["edited", "editing"]
+
+    def run():
+        values.reverse()
+        docmanager("-j 1 set -p status={}".format(values[0]), files)
+
+    return run
+
+
+def case_render(files, fmt):
+    """Returns the function of a render case; the properties are fetched
+       once before the measurement
+    """
+    from docmanager.display import getrenderer
+
+    data, args = docmanager(GET + ("" if fmt == "text" else " --format " + fmt), files)
+    renderer = getrenderer(fmt)
+
+    def run():
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            renderer(data, args=args)
+
+    return run
+
+
+CASES = [
+    ("parse", lambda files: case_parse(files)),
+    ("parse-readonly", lambda files: case_parse(files, True)),
+    ("get", lambda files: lambda: docmanager(GET, files)),
+    ("set", case_set),
+    ("analyze", lambda files: lambda: docmanager(ANALYZE, files)),
+] + [ ("render-" + fmt, lambda files, fmt=fmt: case_render(files, fmt)) for fmt in RENDERERS ]
+
+
+def measure(func, repeat):
+    """Runs a function several times
+
+    :return: the time of the fastest run in seconds
+    :rtype: float
+    """
+    times = list()
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+def load_baselines(filename):
+    """Returns the stored baselines of all machines
+
+    :return: { machine key: { "corpus": ..., "results": ... } }
+    :rtype: dict
+    """
+    try:
+        with open(filename) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return dict()
+
+
+def save_baselines(filename, corpus, results):
+    """Stores the results as the baselines of this machine; the
+       baselines of the other machines are kept
+    """
+    baselines = load_baselines(filename)
+    baselines[machine_key()] = { "corpus": corpus._asdict(),
+                                 "results": results }
+
+    dirname = os.path.dirname(filename)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+
+    with open(filename, 'w') as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def report(results, baselines, threshold):
+    """Prints the results and the change against the baselines
+
+    :param dict results: { case: seconds }
+    :param dict baselines: The baselines of this machine (or None)
+    :param float threshold: The allowed slowdown in percent
+    :return: the names of the regressed cases
+    :rtype: list
+    """
+    regressions = list()
+    stored = (baselines or {}).get("results", {})
+
+    print("{:<16} {:>12} {:>14} {:>9}".format("case", "time [ms]", "baseline [ms]", "change"))
+
+    for name, seconds in results.items():
+        line = "{:<16} {:>12.1f}".format(name, seconds * 1000)
+
+        if name in stored:
+            change = (seconds / stored[name] - 1) * 100
+            line += " {:>14.1f} {:>+8.1f}%".format(stored[name] * 1000, change)
+
+            if change > threshold:
+                line += "  REGRESSION"
+                regressions.append(name)
+
+        print(line)
+
+    return regressions
+
+
+def parse_args(argv):
+    """Parses the command line of the suite"""
+    parser = argparse.ArgumentParser(description="Runs the benchmark suite")
+    parser.add_argument("cases", nargs="*", metavar="CASE",
+                        help="the cases to run (default: all)")
+    parser.add_argument("--save", action="store_true",
+                        help="store the results as the new baselines")
+    parser.add_argument("--threshold", type=float, default=25.0,
+                        help="allowed slowdown in percent (default: %(default)s)")
+    parser.add_argument("--baselines", default=BASELINES,
+                        help="the baseline file (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="runs per case (default: %(default)s)")
+
+    for field, conv in zip(Corpus._fields, (int, int, float, int, int)):
+        parser.add_argument("--" + field, type=conv, default=getattr(DEFAULT_CORPUS, field))
+
+    args = parser.parse_args(argv)
+
+    unknown = set(args.cases) - { c[0] for c in CASES }
+    if unknown:
+        parser.error("unknown cases: {}".format(", ".join(sorted(unknown))))
+
+    return args
+
+
+def main(argv):
+    args = parse_args(argv)
+    corpus = Corpus(**{ field: getattr(args, field) for field in Corpus._fields })
+    cases = [ c for c in CASES if not args.cases or c[0] in args.cases ]
+
+    setloglevel(0)
+
+    baselines = load_baselines(args.baselines).get(machine_key())
+    if baselines is None:
+        print("No baselines for {} in {}.".format(machine_key(), args.baselines))
+    elif baselines["corpus"] != corpus._asdict():
+        print("The baselines were measured over another corpus, they are not compared.")
+        baselines = None
+
+    print("{} files, {} KiB, {} entities per paragraph, {} properties, seed {}".format(*corpus))
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        files = write_corpus(tmpdir, corpus)
+        results = dict()
+
+        for name, factory in cases:
+            results[name] = measure(factory(files), args.repeat)
+
+    regressions = report(results, baselines, args.threshold)
+
+    if args.save:
+        if baselines is not None:
+            # keep the baselines of the cases which did not run
+            results = dict(baselines["results"], **results)
+        save_baselines(args.baselines, corpus, results)
+        print("Saved the baselines of {} to {}".format(machine_key(), args.baselines))
+    elif regressions:
+        print("{} case(s) slower than the baselines by more than {}%: {}".format(
+              len(regressions), args.threshold, ", ".join(regressions)))
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
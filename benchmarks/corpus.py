@@ -0,0 +1,160 @@
+#!/usr/bin/python3
+#
+# Copyright (c) 2015 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+"""Deterministic generator of DocBook 5 corpora for the benchmarks
+
+   The same parameters and the same seed always produce the same files,
+   so measurements of different commits run over identical input.
+
+   Parameters:
+     files        number of files
+     size         approximate size of every file in KiB
+     entities     entity references per paragraph (the entities are
+                  declared in the internal subset of every file)
+     properties   number of properties in dm:docmanager
+
+   Usage: python3 benchmarks/corpus.py DIRECTORY [FILES [SIZE [ENTITIES [PROPERTIES]]]]
+"""
+
+import os
+import random
+import sys
+from collections import namedtuple
+
+Corpus = namedtuple("Corpus", "files size entities properties seed")
+
+DEFAULT_CORPUS = Corpus(files=200, size=16, entities=0.5, properties=8, seed=0)
+
+HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE article [
+{entities}]>
+<article xmlns="http://docbook.org/ns/docbook"
+         xmlns:dm="urn:x-suse:ns:docmanager" version="5.0" xml:id="art{number}">
+  <title>Article {number}</title>
+  <info>
+    <dm:docmanager>
+{properties}    </dm:docmanager>
+  </info>
+"""
+
+SECTION = """  <section xml:id="sec{number}-{section}">
+    <title>Section {section}</title>
+"""
+
+STATUS = ("editing", "edited", "proofing", "proofed", "comment", "locdrop")
+MAINTAINERS = ("toms", "rsalevsky", "mschnitzer", "fsundermeyer", "tbazant")
+WORDS = ("lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipisici",
+         "elit", "sed", "eiusmod", "tempor", "incidunt", "labore", "dolore",
+         "magna", "aliqua", "enim", "minim", "veniam", "nostrud")
+ENTITIES = ("product", "productnumber", "suse", "exampleuser", "wsI")
+
+
+def entity_declarations():
+    """Returns the internal subset with the declarations of ENTITIES"""
+    return "".join('  <!ENTITY {} "{} value">\n'.format(name, name.upper())
+                   for name in ENTITIES)
+
+
+def properties(rng, count):
+    """Returns count dm:docmanager properties; the first ones are the
+       properties which are used by the benchmarks (maintainer, status,
+       priority, deadline and bugtracker with a component attribute)
+    """
+    values = [
+        ("maintainer", rng.choice(MAINTAINERS)),
+        ("status", rng.choice(STATUS)),
+        ("priority", str(rng.randint(1, 10))),
+        ("deadline", "2026-{:02d}-{:02d}".format(rng.randint(1, 12), rng.randint(1, 28))),
+    ]
+    lines = [ "      <dm:{0}>{1}</dm:{0}>\n".format(name, value)
+              for name, value in values[:count] ]
+
+    if count > len(values):
+        lines.append('      <dm:bugtracker>\n'
+                     '        <dm:component name="{}">Documentation</dm:component>\n'
+                     '      </dm:bugtracker>\n'.format(rng.choice(MAINTAINERS)))
+
+    for i in range(len(values) + 1, count):
+        lines.append("      <dm:prop{0}>value{1}</dm:prop{0}>\n".format(i, rng.randint(0, 99)))
+
+    return "".join(lines)
+
+
+def paragraph(rng, entities):
+    """Returns a paragraph with 40 words and on average the given number
+       of entity references
+    """
+    words = [ rng.choice(WORDS) for _ in range(40) ]
+
+    count = int(entities) + (rng.random() < entities % 1)
+    for _ in range(count):
+        words[rng.randrange(len(words))] = "&{};".format(rng.choice(ENTITIES))
+
+    return "    <para>{}</para>\n".format(" ".join(words))
+
+
+def document(corpus, number):
+    """Returns the content of a file of the corpus
+
+    :param Corpus corpus: The corpus parameters
+    :param int number: The number of the file
+    :return: the XML document
+    :rtype: str
+    """
+    rng = random.Random("{}-{}".format(corpus.seed, number))
+    parts = [ HEADER.format(number=number, entities=entity_declarations(),
+                            properties=properties(rng, corpus.properties)) ]
+    size = len(parts[0])
+    section = 0
+
+    while size < corpus.size * 1024:
+        parts.append(SECTION.format(number=number, section=section))
+        for _ in range(5):
+            parts.append(paragraph(rng, corpus.entities))
+        parts.append("  </section>\n")
+        size += sum(len(p) for p in parts[-7:])
+        section += 1
+
+    parts.append("</article>\n")
+    return "".join(parts)
+
+
+def write_corpus(directory, corpus=DEFAULT_CORPUS):
+    """Writes the files of a corpus
+
+    :param str directory: The target directory
+    :param Corpus corpus: The corpus parameters
+    :return: the file names
+    :rtype: list
+    """
+    files = list()
+
+    for number in range(corpus.files):
+        filename = os.path.join(directory, "file-{:05d}.xml".format(number))
+        with open(filename, 'w') as f:
+            f.write(document(corpus, number))
+        files.append(filename)
+
+    return files
+
+
+if __name__ == "__main__":
+    params = [ conv(arg) for conv, arg in zip((int, int, float, int), sys.argv[2:]) ]
+    corpus = DEFAULT_CORPUS._replace(**dict(zip(Corpus._fields, params)))
+    print("\n".join(write_corpus(sys.argv[1], corpus)))
@@ -22,29 +22,72 @@ __version__="3.3.4"
 import atexit
 import sys
 import time
-from docmanager.action import Actions
 from docmanager.cli import parsecli
-from docmanager.core import ReturnCodes
-from docmanager.display import getrenderer
+from docmanager import profiler, timings
+from docmanager.client import forward
+from docmanager.core import ReturnCodes, PROFILE_TOP, TIMINGS_SLOWEST
 from docmanager.exceptions import DMConfigFileNotFound
 from docmanager.logmanager import log
 # from xml.sax._exceptions import SAXParseException
 
 def shutdown(start):
     end = int(round(time.time() * 1000))
-    log.info("DocManager Runtime: %d seconds" % ((end-start)/1000))
+    log.info("DocManager Runtime: %.3f seconds" % ((end-start)/1000))
 
 def main(cliargs=None):
     """Entry point for the application script
 
+    If a server is running (see 'docmanager serve'), the command is
+    forwarded to it; otherwise it runs in this process.
+
+    :param list cliargs: Arguments to parse or None (=use sys.argv)
+    """
+
+    start = int(round(time.time() * 1000))
+
+    # the client never sets the log level (see parsecli), so the runtime
+    # is only logged for commands which run in this process
+    exitcode = forward(cliargs)
+    if exitcode is not None:
+        sys.exit(exitcode)
+
+    atexit.register(shutdown, start)
+    run(cliargs)
+
+def run(cliargs=None):
+    """Runs a command and exits with its return code
+
     :param list cliargs: Arguments to parse or None (=use sys.argv)
     """
 
-    atexit.register(shutdown, int(round(time.time() * 1000)))
+    start = time.perf_counter(), time.process_time()
+
+    # the sub commands pull in lxml and multiprocessing, so import them
+    # only if the command is not forwarded to a server
+    from docmanager.action import Actions
+    from docmanager.display import getrenderer
+
+    imported = time.perf_counter(), time.process_time()
+    args = None
 
     try:
-        a = Actions(parsecli(cliargs))
-        res = a.parse()
+        args = parsecli(cliargs)
+
+        # the phases before the command line was parsed (which includes
+        # reading the config files)
+        if args.timings:
+            timings.enable(start)
+            timings.add("import", imported[0] - start[0], imported[1] - start[1])
+            timings.add("config", time.perf_counter() - imported[0],
+                        time.process_time() - imported[1])
+
+        if args.profile:
+            profiler.start(args.profile)
+
+        with timings.phase("command"):
+            a = Actions(args)
+            res = a.parse()
+
         renderer = None
 
         if hasattr(a.args, 'format') is False:
@@ -52,7 +95,10 @@ def main(cliargs=None):
         else:
             renderer = getrenderer(a.args.format)
 
-        sys.exit(renderer(res, args=a.args))
+        with timings.phase("render"):
+            exitcode = renderer(res, args=a.args)
+
+        sys.exit(exitcode)
     except PermissionError as err: # noqa
         log.error("%s on file %r.", err.args[1], err.filename)
         sys.exit(ReturnCodes.E_PERMISSION_DENIED)
@@ -67,3 +113,9 @@ def main(cliargs=None):
         sys.exit(ReturnCodes.E_FILE_NOT_FOUND)
     except KeyboardInterrupt:
         sys.exit()
+    finally:
+        profiler.stop(PROFILE_TOP)
+
+        recorded = timings.disable()
+        if recorded is not None:
+            timings.report(recorded, args.timings_format, TIMINGS_SLOWEST)
@@ -18,47 +18,68 @@
 
 import os.path
 import sys
-import threading
-from collections import OrderedDict, namedtuple
+from collections import OrderedDict
 from configparser import ConfigParser, NoOptionError
-from docmanager.analyzer import Analyzer
-from docmanager.config import GLOBAL_CONFIG, USER_CONFIG, GIT_CONFIG
-from docmanager.core import DEFAULT_DM_PROPERTIES, ReturnCodes, BT_ELEMENTLIST
+from docmanager.cli import parsecli
+from docmanager.config import GLOBAL_CONFIG, USER_CONFIG, get_git_repo_config
+from docmanager.core import DEFAULT_DM_PROPERTIES, ReturnCodes, BT_ELEMENTLIST, \
+     READONLY_ACTIONS, INDEXED_ACTIONS, BATCH_ACTIONS
 from docmanager.exceptions import *
-from docmanager.logmanager import log, logmgr_flog
+from docmanager.batch import BatchCommand, JobCollected, read_script
+from docmanager import jobs, profiler, timings
+from docmanager.jobs import HANDLER_ERRORS, handler_error, open_handler, pool_options, run_job, \
+     execute_job, job_init, job_set, job_set_attr, job_del_attr, job_get_attr, \
+     job_get, job_delete, job_analyze, job_index, job_batch, job_validate
+from docmanager.logmanager import log
 from docmanager.shellcolors import red, green, yellow
-from docmanager.xmlhandler import XmlHandler
-from docmanager.display import print_stats
+from docmanager.display import getrenderer, print_stats
+from functools import partial
 from math import trunc
-from multiprocessing.pool import ThreadPool
 
 
 class Actions(object):
     """An Actions instance represents an action event
     """
 
-    def __init__(self, args):
+    def __init__(self, args, batchcommand=None):
         """Initialize Actions class
 
         :param argparse.Namespace args: result from argparse.parse_args
+        :param BatchCommand batchcommand: The sub command runs as a part of
+                                          a batch script (see batch)
         """
-        logmgr_flog()
-
         # set default variables
         self.__files = args.files
         self.__args = args
         self.__xml = OrderedDict()
+        self.__batchcommand = batchcommand
+        self.__executor = getattr(args, 'executor', 'thread')
+        self.__indexfile = None
+
+        # the read-only sub commands take the handlers from the metadata
+        # index if --use-index is set
+        if getattr(args, 'use_index', False) and args.action in INDEXED_ACTIONS:
+            self.__indexfile = args.index_file
 
         # set the default output format for 'alias' sub cmd to 'table'
         if args.action == "alias":
             args.format = "table"
 
-        if self.__files:
+        # The files are parsed when the sub command runs and every handler is
+        # released as soon as its job is done (see run_jobs). Only with
+        # --stop-on-error, sub commands which write the files parse all files
+        # first, so they stop before anything is written. The process
+        # executor checks all files in its workers instead (see run_jobs).
+        if self.__files and self.__executor == "thread" and \
+           getattr(args, 'stop_on_error', False) and \
+           args.action not in READONLY_ACTIONS and batchcommand is None:
             # temporary xml handler list
             xml = list()
 
-            # start multiple processes for initialize all XML files
-            with ThreadPool(processes=self.__args.jobs) as pool:
+            # start multiple threads for initialize all XML files
+            from multiprocessing.pool import ThreadPool
+
+            with ThreadPool(processes=self.__args.jobs, **pool_options()) as pool:
                 for i in pool.map(self.init_xml_handlers, self.__files):
                     xml.append(i)
 
@@ -71,6 +92,9 @@ class Actions(object):
                     if x is not "file":
                         self.__xml[name][x] = i[x]
 
+                if "timings" in self.__xml[name]:
+                    timings.add_file(name, self.__xml[name].pop("timings"))
+
                 # stop if we found an error and --stop-on-error is set
                 if self.__args.stop_on_error and "error" in self.__xml[name]:
                     log.error("{}: {}".format(name, self.__xml[name]["errorstr"]))
@@ -84,34 +108,142 @@ class Actions(object):
         """
         handler = None
 
-        try:
-            handler = { "file": fname, "handler": XmlHandler(fname, True) }
-        except (DMXmlParseError, DMInvalidXMLRootElement, DMFileNotFoundError, DMNotDocBook5File) as err:
-            handler = { "file": fname, "errorstr": err.errorstr, "error": err.error }
+        # read-only sub commands only need the head of a file
+        readonly = self.__args.action in READONLY_ACTIONS
+
+        with timings.recording() as phases:
+            try:
+                handler = { "file": fname,
+                            "handler": open_handler(fname, readonly, self.__indexfile) }
+            except HANDLER_ERRORS as err:
+                handler = handler_error(fname, err)
+
+        if timings.ENABLED:
+            handler["timings"] = phases
 
         return handler
 
-    def parse(self):
-        logmgr_flog()
+    def execute_handler_job(self, job, jobargs, fname):
+        """Executes a job on an already parsed handler (see run_jobs)
+
+        :param function job: A job function from docmanager.jobs
+        :param tuple jobargs: Further arguments for the job
+        :param str fname: The file name
+        :return: result of the job with the key 'file'
+        :rtype: dict
+        """
+        if "error" in self.__xml[fname]:
+            return dict(self.__xml[fname], file=fname)
+
+        handler = self.__xml[fname].pop("handler")
+        with timings.recording() as phases:
+            try:
+                result = execute_job(handler, job, jobargs)
+            finally:
+                handler.release()
+
+        if timings.ENABLED:
+            result["timings"] = phases
+
+        result["file"] = fname
+        return result
+
+    def run_jobs(self, job, *jobargs):
+        """Executes a job (see docmanager.jobs) for every file
+
+        If the handlers were already parsed (see __init__), the job runs on
+        them, and the files are written by --jobs threads. Otherwise every
+        file is parsed and processed by a thread or by a worker process
+        (see --executor) and only the results are kept.
 
+        :param function job: A job function from docmanager.jobs
+        :param jobargs: Further arguments for the job (must be picklable)
+        :return: generator of result dictionaries in the order of the files;
+                 invalid files contain the keys 'error' and 'errorstr'
+        """
+        if self.__batchcommand is not None:
+            command = self.__batchcommand
+            if command.results is None:
+                command.job, command.jobargs = job, jobargs
+                raise JobCollected()
+
+            yield from command.results
+            return
+
+        if self.__xml:
+            # the files are modified and written by a thread per file
+            from multiprocessing.pool import ThreadPool
+
+            with ThreadPool(processes=self.__args.jobs, **pool_options()) as pool:
+                for result in pool.imap(partial(self.execute_handler_job, job, jobargs),
+                                        self.__files):
+                    if "timings" in result:
+                        timings.add_file(result["file"], result.pop("timings"))
+
+                    yield result
+            return
+
+        readonly = self.__args.action in READONLY_ACTIONS
+        tasks = [ (f, readonly, self.__indexfile, job, jobargs) for f in self.__files ]
+        chunksize = max(1, min(64, len(tasks) // (self.__args.jobs * 4)))
+
+        if self.__executor == "process":
+            from multiprocessing import Pool as poolclass
+        else:
+            from multiprocessing.pool import ThreadPool as poolclass
+
+        with poolclass(processes=self.__args.jobs, **pool_options()) as pool:
+            # with --stop-on-error, all files are parsed before the first
+            # one is written (the handlers can't be kept for the jobs)
+            if self.__args.stop_on_error and not readonly:
+                checks = [ (f, readonly, None, job_validate, ()) for f in self.__files ]
+
+                for result in pool.imap(run_job, checks, chunksize):
+                    if "error" in result:
+                        log.error("{}: {}".format(result["file"], result["errorstr"]))
+                        sys.exit(result["error"])
+
+            for result in pool.imap(run_job, tasks, chunksize):
+                if "timings" in result:
+                    timings.add_file(result["file"], result.pop("timings"))
+
+                if "exit" in result:
+                    sys.exit(result["exit"])
+
+                # stop if we found an error and --stop-on-error is set
+                if self.__args.stop_on_error and "error" in result:
+                    log.error("{}: {}".format(result["file"], result["errorstr"]))
+                    sys.exit(result["error"])
+
+                yield result
+
+            # worker processes write their profile when they exit, which
+            # they don't do if the pool is terminated
+            if profiler.active():
+                pool.close()
+                pool.join()
+
+    def parse(self):
         action = self.__args.action
         if hasattr(self, action) and getattr(self, action) is not None:
             log.debug("Action.__init__: %s", self.__args)
-            return getattr(self, action)(self.__args.properties)
+            try:
+                return getattr(self, action)(self.__args.properties)
+            finally:
+                # report the result of the repository check (see input_format_check)
+                urlcheck = getattr(self.__args, 'urlcheck', None)
+                if urlcheck is not None:
+                    urlcheck.wait()
         else:
             log.error("Method \"%s\" is not implemented.", action)
             sys.exit(ReturnCodes.E_METHOD_NOT_IMPLEMENTED)
 
 
     def init(self, arguments):
-        logmgr_flog()
-
-        _set = dict()
+        defaults = list()
+        btdefaults = list()
         props = list(DEFAULT_DM_PROPERTIES)
 
-        # count all valid and invalid xml files
-        validfiles, invalidfiles = self.get_files_status(self.__xml)
-
         # append bugtracker properties if needed
         if self.__args.with_bugtracker:
             for item in BT_ELEMENTLIST:
@@ -123,111 +255,85 @@ class Actions(object):
 
             if hasattr(self.__args, rprop) and \
                getattr(self.__args, rprop) is not None:
-                _set[item] = getattr(self.__args, rprop)
+                defaults.append((item, getattr(self.__args, rprop)))
 
-        # iter through all xml handlers and init its properties
-        for f in self.__files:
-            if "error" not in self.__xml[f]:
-                xh = self.__xml[f]["handler"]
+        # if bugtracker options are provided, set default values
+        for item in BT_ELEMENTLIST:
+            rprop = item.replace("/", "_")
 
+            if hasattr(self.__args, rprop) and \
+               getattr(self.__args, rprop) is not None and \
+               len(getattr(self.__args, rprop)) >= 1:
+                btdefaults.append((item, getattr(self.__args, rprop)))
+
+        # iter through all xml files and init its properties
+        for res in self.run_jobs(job_init, self.__args.force,
+                                 self.__args.with_bugtracker,
+                                 defaults, btdefaults):
+            if "error" not in res:
                 log.info("Trying to initialize the predefined DocManager "
-                          "properties for %r.", xh.filename)
+                          "properties for %r.", res["file"])
 
-                if xh.init_default_props(self.__args.force,
-                                         self.__args.with_bugtracker) == 0:
+                if res["initialized"]:
                     print("[{}] Initialized default "
                           "properties for {!r}.".format(green(" ok "),
-                                                        xh.filename))
+                                                        res["file"]))
                 else:
                     log.warning("Could not initialize all properties for %r because "
                           "some properties are already set in the XML file. "
                           "These would be overwritten by this operation. "
                           "To perform this operation anyway, add the option "
-                          "'--force' to your command.", xh.filename)
-
-                # set default values for the given properties
-                for i in _set:
-                    ret = xh.get(i)
-                    if len(ret[i]) == 0 or self.__args.force:
-                        xh.set({ i: str(_set[i]) })
-
-                # if bugtracker options are provided, set default values
-                for i in BT_ELEMENTLIST:
-                    rprop = i.replace("/", "_")
-
-                    if hasattr(self.__args, rprop) and \
-                       getattr(self.__args, rprop) is not None and \
-                       len(getattr(self.__args, rprop)) >= 1:
-                        xh.set({ i: getattr(self.__args, rprop) })
+                          "'--force' to your command.", res["file"])
             else:
                 print("[{}] Initialized default properties for {!r}: {}. ".format(\
                     red(" error "),
-                    f,
-                    red(self.__xml[f]["errorstr"])))
-
-        # save the changes
-        if validfiles:
-            for f in self.__files:
-                if "error" not in self.__xml[f]:
-                    self.__xml[f]["handler"].write()
-
-        # print the statistics
-        message = "\n"
-        if validfiles < 0:
-            message += ("Successfully initialized {} files. ".format(\
-                green(validfiles)))
-        if invalidfiles < 0:
-            message += ("{} files failed.".format(\
-                red(invalidfiles)))
+                    res["file"],
+                    red(res["errorstr"])))
 
     def set(self, arguments):
         """Set key/value pairs from arguments
 
         :param list arguments: List of arguments with key=value pairs
         """
-        logmgr_flog()
-
-        # count all valid and invalid xml files
-        validfiles, invalidfiles = self.get_files_status(self.__xml)
+        validfiles = 0
+        invalidfiles = 0
+        unchangedfiles = 0
+        writetime = 0.0
+        pairs = list()
 
         # split key and value
-        args = [i.split("=") for i in arguments]
-
-        # iter through all key and values
-        for f in self.__files:
-            if "error" in self.__xml[f]:
-                print("[ {} ] {} -> {}".format(red("error"), f, red(self.__xml[f]['errorstr'])))
-            else:
-                for arg in args:
-                    try:
-                        key, value = arg
-
-                        if key == "languages":
-                            value = value.split(",")
-                            value = ",".join(self.remove_duplicate_langcodes(value))
+        for arg in arguments:
+            try:
+                key, value = arg.split("=")
+            except ValueError:
+                log.error('Invalid usage. '
+                          'Set values with the following format: '
+                          'property=value')
+                sys.exit(ReturnCodes.E_INVALID_USAGE_KEYVAL)
 
-                        log.debug("[%s] Trying to set value for property "
-                                  "%r to %r.", f, key, value)
+            if key == "languages":
+                value = value.split(",")
+                value = ",".join(self.remove_duplicate_langcodes(value))
 
-                        if self.__args.bugtracker:
-                            self.__xml[f]["handler"].set({"bugtracker/" + key: value})
-                        else:
-                            self.__xml[f]["handler"].set({key: value})
-                    except ValueError:
-                        log.error('Invalid usage. '
-                                  'Set values with the following format: '
-                                  'property=value')
-                        sys.exit(ReturnCodes.E_INVALID_USAGE_KEYVAL)
+            if self.__args.bugtracker:
+                key = "bugtracker/" + key
 
-                print("[ {} ] Set data for file {}.".format(green("ok"), f))
+            pairs.append((key, value))
 
-        # save the changes
-        for f in self.__files:
-            if "error" not in self.__xml[f]:
-                log.debug("[%s] Trying to save the changes.", f)
-                self.__xml[f]["handler"].write()
+        # set the values and save the changes
+        for res in self.run_jobs(job_set, pairs):
+            if "error" in res:
+                invalidfiles += 1
+                print("[ {} ] {} -> {}".format(red("error"), res["file"], red(res['errorstr'])))
+            else:
+                writetime += res.get("write_time", 0.0)
+                if res.get("written", True):
+                    validfiles += 1
+                else:
+                    unchangedfiles += 1
+                print("[ {} ] Set data for file {}.".format(green("ok"), res["file"]))
 
-        print_stats(validfiles, invalidfiles)
+        print_stats(validfiles, invalidfiles, unchangedfiles, writetime)
 
 
     def set_attr(self, arguments):
@@ -242,8 +348,10 @@ class Actions(object):
             log.error("You must specify at least one attribute with -a!")
             sys.exit(ReturnCodes.E_INVALID_ARGUMENTS)
 
-        # count all valid and invalid xml files
-        validfiles, invalidfiles = self.get_files_status(self.__xml)
+        validfiles = 0
+        invalidfiles = 0
+        unchangedfiles = 0
+        writetime = 0.0
 
         data = OrderedDict()
         for i in attrs:
@@ -254,24 +362,26 @@ class Actions(object):
                 log.error("The values of -a must have a key and a value, like: key=value or key=")
                 sys.exit(ReturnCodes.E_INVALID_USAGE_KEYVAL)
 
-        for f in self.__files:
-            if "error" in self.__xml[f]:
-                print("[{}] {} -> {}".format(red(" error "), f, red(self.__xml[f]["errorstr"])))
+        for res in self.run_jobs(job_set_attr, prop, data):
+            f = res["file"]
+            if "error" in res:
+                invalidfiles += 1
+                print("[{}] {} -> {}".format(red(" error "), f, red(res["errorstr"])))
+            elif res["notfound"]:
+                # XML files are valid even if they don't have the given property,
+                # but we count them as invalid files.
+                invalidfiles += 1
+                print("[{}] Property {} was not found in {}.".format(
+                      red(" error "), yellow(prop), f))
             else:
-                try:
-                    self.__xml[f]["handler"].set_attr(prop, data)
-                    self.__xml[f]["handler"].write()
-
-                    print("[{}] Set attributes for file {}.".format(green(" ok "), f))
-                except DMPropertyNotFound:
-                    print("[{}] Property {} was not found in {}.".format(red(" error "), yellow(prop), f))
-
-                    # we must substract 1 of "validfiles" since XML files are valid even
-                    # if they don't have the given property.
-                    validfiles -= 1
-                    invalidfiles += 1
+                writetime += res.get("write_time", 0.0)
+                if res.get("written", True):
+                    validfiles += 1
+                else:
+                    unchangedfiles += 1
+                print("[{}] Set attributes for file {}.".format(green(" ok "), f))
 
-        print_stats(validfiles, invalidfiles)
+        print_stats(validfiles, invalidfiles, unchangedfiles, writetime)
 
 
     def del_attr(self, arguments):
@@ -286,33 +396,37 @@ class Actions(object):
             log.error("You must specify at least one attribute with -a!")
             sys.exit(ReturnCodes.E_INVALID_ARGUMENTS)
 
-        # count all valid and invalid xml files
-        validfiles, invalidfiles = self.get_files_status(self.__xml)
+        validfiles = 0
+        invalidfiles = 0
+        unchangedfiles = 0
+        writetime = 0.0
 
-        for f in self.__files:
-            if "error" in self.__xml[f]:
-                print("[{}] {} -> {}".format(red(" error "), f, red(self.__xml[f]["errorstr"])))
+        for res in self.run_jobs(job_del_attr, prop, attrs):
+            f = res["file"]
+            if "error" in res:
+                invalidfiles += 1
+                print("[{}] {} -> {}".format(red(" error "), f, red(res["errorstr"])))
+            elif res["notfound"]:
+                # XML files are valid even if they don't have the given property,
+                # but we count them as invalid files.
+                invalidfiles += 1
+                print("[{}] Property {} was not found in {}.".format(
+                      red(" error "), yellow(prop), f))
             else:
-                try:
-                    errors = self.__xml[f]["handler"].del_attr(prop, attrs)
-                    self.__xml[f]["handler"].write()
-
-                    if errors:
-                        print("[{}] These attributes couldn't be deleted for {}: {}".format(
-                            yellow(" notice "), f, ", ".join(errors)
-                        ))
-                    else:
-                        print("[{}] Deleted attributes for file {}.".format(green(" ok "), f))
-
-                except DMPropertyNotFound:
-                    print("[{}] Property {} was not found in {}.".format(red(" error "), yellow(prop), f))
-
-                    # we must substract 1 of "validfiles" since XML files are valid even
-                    # if they don't have the given property.
-                    validfiles -= 1
-                    invalidfiles += 1
+                writetime += res.get("write_time", 0.0)
+                if res.get("written", True):
+                    validfiles += 1
+                else:
+                    unchangedfiles += 1
+
+                if res["errors"]:
+                    print("[{}] These attributes couldn't be deleted for {}: {}".format(
+                        yellow(" notice "), f, ", ".join(res["errors"])
+                    ))
+                else:
+                    print("[{}] Deleted attributes for file {}.".format(green(" ok "), f))
 
-        print_stats(validfiles,invalidfiles)
+        print_stats(validfiles, invalidfiles, unchangedfiles, writetime)
 
 
     def get_attr(self, arguments):
@@ -321,8 +435,9 @@ class Actions(object):
 
         data = dict(data=OrderedDict(),errors=None)
 
-        for f in self.__files:
-            data['data'][f] = self.__xml[f]["handler"].get_attr(props, attrs)
+        for res in self.run_jobs(job_get_attr, props, attrs):
+            if "error" not in res:
+                data['data'][res["file"]] = res["data"]
 
         return data
 
@@ -333,16 +448,14 @@ class Actions(object):
         :return: [(FILENAME, {PROPERTIES}), ...]
         :rtype: list
         """
-        logmgr_flog()
-
         output = list()
         errors = list()
 
-        for f in self.__files:
-            if "error" in self.__xml[f]:
-                errors.append([f, self.__xml[f]['errorstr']])
+        for res in self.run_jobs(job_get, arguments):
+            if "error" in res:
+                errors.append([res["file"], res['errorstr']])
             else:
-                output.append((f, self.__xml[f]["handler"].get(arguments)))
+                output.append((res["file"], res["data"]))
 
         return {'data': output, 'errors': errors}
 
@@ -352,49 +465,28 @@ class Actions(object):
 
         :param list arguments:
         """
-        logmgr_flog()
-
         # statistics variables
         file_errors = 0
         props_failed = 0
         props_deleted = 0
 
-        # delete the properties
-        for f in self.__files:
-            if "error" in self.__xml[f]:
-                print("[{}] {} -> {}".format(red(" error "), f, red(self.__xml[f]["errorstr"])))
+        # delete the properties and save the changes
+        for res in self.run_jobs(job_delete, arguments):
+            f = res["file"]
+            if "error" in res:
+                print("[{}] {} -> {}".format(red(" error "), f, red(res["errorstr"])))
                 file_errors += 1
             else:
-                failed_properties = list()
+                props_deleted += res["deleted"]
+                props_failed += len(res["failed"])
 
-                for arg in arguments:
-                    cond = None
-                    prop = arg
-                    pos = arg.find("=")
-
-                    # look if there is condition
-                    if pos != -1:
-                        prop = arg[:pos]
-                        cond = arg[pos+1:]
-
-                    if not self.__xml[f]["handler"].delete(prop, cond):
-                        failed_properties.append(arg)
-                        props_failed += 1
-                    else:
-                        props_deleted += 1
-
-                if not failed_properties:
+                if not res["failed"]:
                     print("[{}] {}".format(green(" ok "), f))
                 else:
                     print("[{}] {} -> Couldn't delete these properties: {}".format(
-                          yellow(" info "), f, ", ".join(failed_properties)
+                          yellow(" info "), f, ", ".join(res["failed"])
                          ))
 
-        # save changes
-        for f in self.__files:
-            if "error" not in self.__xml[f]:
-                self.__xml[f]["handler"].write()
-
         # print statistics
         message = "\n"
         if props_deleted < 0:
@@ -413,8 +505,6 @@ class Actions(object):
         print(message)
 
     def analyze(self, arguments): # pylint:disable=unused-argument
-        handlers = dict()
-
         # Set default query format
         try:
             qformat = self.args.config['analzye']['queryformat']
@@ -424,53 +514,94 @@ class Actions(object):
         if self.args.queryformat:
             qformat = self.args.queryformat
 
-        file_data = list()
         errors = list()
-        ntfiledata = namedtuple("FileData", "file,out_formatted,data")
-        validfiles, invalidfiles = self.get_files_status(self.__xml)
-
-        for f in self.__files:
-            if "error" in self.__xml[f]:
-                errors.append("Error in '{}': {}".format(f, red(self.__xml[f]["errorstr"])))
+        validfiles = 0
+        printed = 0
+        sort = self.__args.sort
+        limit = self.__args.limit
+        groupby = self.__args.group_by
+        sorter = None
+        grouper = None
+        sortfailed = False
+
+        # the query format, the properties, and the filters are compiled
+        # once for all files
+        from docmanager.analyzer import AnalyzeQuery, QueryFormat
+        from docmanager.sortutil import ExternalSort, GroupBy, TopN, sortkey
+
+        if groupby:
+            # only the aggregates of every group are kept, not the lines
+            grouper = GroupBy(self.__args.aggregate or [("count", None)])
+            queryformat = QueryFormat("")
+            fields = set([groupby] + [ prop for _, prop in grouper.aggregates if prop ])
+            query = AnalyzeQuery(fields, self.__args.filter, None, self.__args.default_output)
+        else:
+            if sort and limit is not None:
+                sorter = TopN(limit, self.__args.reverse)
+            elif sort:
+                sorter = ExternalSort(reverse=self.__args.reverse)
+
+            queryformat = QueryFormat(qformat)
+            query = AnalyzeQuery(queryformat.fields, self.__args.filter, sort,
+                                 self.__args.default_output)
+
+        # files which don't match the filters according to the metadata
+        # index are not parsed at all
+        if self.__indexfile and self.__batchcommand is None:
+            from docmanager.index import getindex
+            rejected = query.prefilter(getindex(self.__indexfile), self.__files)
+            if rejected:
+                log.debug("Skipping %d files which don't match the filters", len(rejected))
+                self.__files = [ f for f in self.__files if f not in rejected ]
+                validfiles += len(rejected)
+
+        results = self.run_jobs(job_analyze, queryformat, query)
+
+        for res in results:
+            if "error" in res:
+                errors.append("Error in '{}': {}".format(res["file"], red(res["errorstr"])))
+                continue
+
+            validfiles += 1
+
+            if res["line"] is None:
+                continue
+
+            if grouper is not None:
+                grouper.add(res["data"][groupby], res["data"])
+                continue
+
+            if sorter is None:
+                # we can print all caught data here
+                if limit is None or printed < limit:
+                    print(res["line"])
+                    printed += 1
+
+                # the remaining files are not analyzed (the workers are stopped)
+                if printed == limit:
+                    results.close()
+                    break
+                continue
+
+            # only the sort key and the line are kept until all files are done;
+            # the key is typed once, so numbers are sorted as numbers
+            if sort == 'filename':
+                key = sortkey(res["file"])
+            elif sort in res["data"]:
+                key = sortkey(res["data"][sort])
             else:
-                try:
-                    analyzer = Analyzer(self.__xml[f]["handler"])
-                except DMInvalidXMLHandlerObject:
-                    log.critical("XML Handler object is None.")
-
-                out = qformat[:]
-                out = analyzer.replace_constants(out)
-                fields = analyzer.extract_fields(out)
-                data = analyzer.fetch_data(self.__args.filter, self.__args.sort, self.__args.default_output)
-
-                if not self.__args.sort:
-                    # we can print all caught data here. If we have no data, we assume that the user
-                    # didn't want to see any data from the XML files and he just want to see the
-                    # output of the constants like {os.file} - https://github.com/openSUSE/docmanager/issues/93
-                    if data:
-                        print(analyzer.format_output(out, data))
-                    elif analyzer.filters_matched:
-                        print(analyzer.format_output(out, data))
-                else:
-                    file_data.append(ntfiledata(file=f, out_formatted=out, data=data))
+                sortfailed = True
+                continue
 
-        if self.__args.sort:
-            values = None
+            sorter.add(key, res["line"])
 
-            if self.__args.sort == 'filename':
-                values = sorted(file_data, key=lambda x: x.file)
-            else:
-                try:
-                    values = sorted(file_data, key=lambda x: int(x.data[self.__args.sort]) \
-                        if x.data[self.__args.sort].isnumeric() \
-                        else \
-                        x.data[self.__args.sort])
-                except KeyError:
-                    log.error("Could not find key '{}' in -qf for sort.")
-
-            if values:
-                for i in values:
-                    print(analyzer.format_output(i.out_formatted, i.data))
+        if sortfailed:
+            log.error("Could not find key '{}' in -qf for sort.".format(sort))
+        elif sorter is not None:
+            for _, line in sorter:
+                print(line)
+        elif grouper is not None:
+            self.print_groups(grouper, groupby, sort, limit)
 
         if not self.__args.quiet:
             print("\nSuccessfully analyzed {} XML files.".format(green(validfiles)))
@@ -480,6 +611,156 @@ class Actions(object):
             for i in errors:
                 print(i)
 
+    def print_groups(self, grouper, groupby, sort, limit):
+        """Prints the result of analyze --group-by: one tab separated line
+           with the group and its aggregates per group
+
+        :param GroupBy grouper: The aggregates of all groups
+        :param str groupby: The group property
+        :param str sort: The column which sorts the groups (None = group)
+        :param int limit: The maximum number of groups (None = all)
+        """
+        from docmanager.sortutil import sortkey
+
+        columns = [ groupby ] + [ func if prop is None else "{}:{}".format(func, prop)
+                                  for func, prop in grouper.aggregates ]
+
+        if sort is None:
+            column = 0
+        elif sort in columns:
+            column = columns.index(sort)
+        else:
+            log.error("Could not find key '{}' in --group-by or --aggregate for sort.".format(sort))
+            return
+
+        # groups with the same value of the sort column are sorted by group
+        rows = sorted(([ group ] + values for group, values in grouper),
+                      key=lambda row: sortkey(row[0]))
+        if column:
+            rows.sort(key=lambda row: sortkey(str(row[column])), reverse=self.__args.reverse)
+        elif self.__args.reverse:
+            rows.reverse()
+
+        if not self.__args.quiet:
+            print("\t".join(columns))
+
+        for row in rows[:limit]:
+            print("\t".join(str(i) for i in row))
+
+    def index(self, arguments): # pylint:disable=unused-argument
+        """Rebuilds, checks, or clears the metadata index
+
+        :param list arguments: unused
+        """
+        from docmanager.index import getindex
+
+        action = self.__args.index_action
+        index = getindex(self.__args.index_file)
+
+        if action == "rebuild":
+            if not self.__files:
+                log.error("You have to provide the files which should be indexed.")
+                sys.exit(ReturnCodes.E_INVALID_ARGUMENTS)
+
+            validfiles = 0
+            invalidfiles = 0
+
+            for res in self.run_jobs(job_index, index.filename):
+                if "error" in res:
+                    invalidfiles += 1
+                    print("[{}] {} -> {}".format(red(" error "), res["file"], red(res["errorstr"])))
+                else:
+                    validfiles += 1
+
+            print_stats(validfiles, invalidfiles)
+
+        elif action == "status":
+            status = index.status(self.__files or None)
+
+            print("Index file: {}".format(index.filename))
+            print("Indexed files: {}".format(len(index)))
+            print("Up to date: {}, changed: {}, not indexed or removed: {}".format(
+                  len(status["fresh"]), len(status["stale"]), len(status["missing"])))
+
+        elif action == "clear":
+            if self.__files:
+                index.remove(self.__files)
+            else:
+                index.clear()
+
+            print("[{}] Cleared the index {}.".format(green(" ok "), index.filename))
+
+    def batch(self, arguments): # pylint:disable=unused-argument
+        """Runs the sub commands of a batch script; every file is parsed
+           once and written at most once
+        """
+        commands = list()
+
+        with self.__args.script as script:
+            argvs = read_script(script)
+
+        # collect the jobs; invalid sub commands stop before a file is touched
+        for argv in argvs:
+            args = parsecli(argv + self.__files[:1])
+
+            if args.action not in BATCH_ACTIONS:
+                log.error("The sub command '{}' can't be used in a batch script.".format(argv[0]))
+                sys.exit(ReturnCodes.E_INVALID_BATCH_SCRIPT)
+
+            args.files = self.__files
+            command = BatchCommand(args)
+
+            try:
+                Actions(args, command).parse()
+            except JobCollected:
+                pass
+
+            commands.append(command)
+
+        results = list(self.run_jobs(job_batch, [ (c.job, c.jobargs) for c in commands ]))
+
+        # report the results of every sub command
+        exitcode = ReturnCodes.E_OK
+
+        for idx, command in enumerate(commands):
+            command.results = [ res if "error" in res else
+                                dict(res["results"][idx], file=res["file"],
+                                     written=res.get("written", False),
+                                     write_time=res.get("write_time", 0.0))
+                                for res in results ]
+
+            try:
+                res = Actions(command.args, command).parse()
+                if res is not None:
+                    renderer = getrenderer(getattr(command.args, 'format', None) or 'default')
+                    renderer(res, args=command.args)
+            except SystemExit as err:
+                if err.code:
+                    exitcode = exitcode or err.code
+
+        if exitcode:
+            sys.exit(exitcode)
+
+    def serve(self, arguments): # pylint:disable=unused-argument
+        """Runs the server of 'docmanager serve' until it is stopped
+
+        :param list arguments: unused
+        """
+        from docmanager import run
+        from docmanager.client import default_socket_file
+        from docmanager.server import HandlerCache, serve
+
+        socketfile = self.__args.socket or default_socket_file()
+        jobs.HANDLER_CACHE = HandlerCache(self.__args.cache_size)
+
+        try:
+            serve(socketfile, run)
+        except OSError as err:
+            log.error("Could not start the server: %s", err)
+            sys.exit(ReturnCodes.E_SERVER_ERROR)
+        finally:
+            jobs.HANDLER_CACHE = None
+
     def _readconfig(self, confname):
         """Read the configuration file
 
@@ -527,7 +808,7 @@ class Actions(object):
         elif self.__args.user:
             confname = USER_CONFIG
         elif self.__args.repo:
-            confname = GIT_CONFIG
+            confname = get_git_repo_config()
         elif self.__args.own:
             confname = self.__args.own
 
@@ -567,7 +848,7 @@ class Actions(object):
         action = self.__args.alias_action
         alias = self.__args.alias
         value = self.__args.command
-        m = { 0: None, 1: GLOBAL_CONFIG[0], 2: USER_CONFIG, 3: GIT_CONFIG }
+        m = { 0: None, 1: GLOBAL_CONFIG[0], 2: USER_CONFIG, 3: get_git_repo_config() }
         configname = m.get(self.__args.method, self.__args.own)
         save = False
 
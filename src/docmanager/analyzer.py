@@ -16,271 +16,322 @@
 # To contact SUSE about this file by physical or electronic mail,
 # you may find current contact information at www.suse.com
 
+import re
 import sys
+import threading
+from functools import partial
 from docmanager.core import NS, ReturnCodes
 from docmanager.exceptions import DMInvalidXMLHandlerObject, DMAnalyzeInvalidFilterSyntax
+from docmanager.filters import FilterExpression
 from docmanager.logmanager import log
 from docmanager.xmlutil import localname
 from lxml import etree
 
-class Analyzer(object):
 
-    def __init__(self, xmlhandler):
-        """Constructor for the Analyzer class
+class QueryFormat(object):
+    """A QueryFormat instance is the compiled query format of -qf
+       (--queryformat): a list of literal text, properties, and constants
+       like {os.file}. It is compiled once and renders the line of every
+       file with a single join.
 
-        :param XmlHandler xmlhandler: A valid XmlHandler object
-        """
+       Syntax: {property} is replaced by the value of the property,
+       {{text}} is kept as it is, and a backslash protects the next
+       character from being parsed.
+    """
 
-        self.xmlhandler = xmlhandler
-        self.fields = set()
-        self.filters_matched = True
+    # kinds of the parts
+    LITERAL = 0
+    PROPERTY = 1
+    CONSTANT = 2
 
-        # validate the XmlHandler object
-        if self.xmlhandler is None:
-            raise DMInvalidXMLHandlerObject()
+    # constants and the functions which return their values for an XmlHandler
+    CONSTANTS = {
+        "os.file": lambda handler: handler.filename,
+        "os.lastmodify": lambda handler: handler.fileutil.get_mtime_format('%Y-%m-%d %H:%M:%S'),
+    }
 
-    def replace_constants(self, queryformat):
-        """Replaces constants
+    def __init__(self, queryformat):
+        """Compiles the query format
 
         :param string queryformat: The query format string from parameter -qf
         """
+        self.queryformat = queryformat
+        self.parts = self.compile(queryformat)
 
-        # constants
-        formatconst = [
-            [ "{os.file}", self.xmlhandler.filename ],
-            [ "{os.lastmodify}", self.xmlhandler.fileutil.get_mtime_format('%Y-%m-%d %H:%M:%S') ]
-        ]
-
-        # replace constants
-        for i in formatconst:
-            queryformat = queryformat.replace(i[0], i[1])
-
-        return queryformat
+        # the list of all requested properties
+        self.fields = set(value for kind, value in self.parts
+                          if kind == QueryFormat.PROPERTY)
 
-    def extract_fields(self, queryformat):
-        """Extract requested properties from -qf (--queryformat)
+    @classmethod
+    def compile(cls, queryformat):
+        """Splits the query format into its parts
 
         :param string queryformat: The query format string from parameter -qf
-        :return list: the list of all requested properties from -qf (--queryformat)
+        :return list: list of (kind, value) pairs; the value is the text of
+                      a literal, or the name of a property or of a constant
         """
-
-        fields = set()
-
-        state = 0
-        ignorenext = False
-        field = ""
-        skip = -1
+        parts = list()
+        literal = list()
+        idx = 0
         length = len(queryformat)
 
-        # algorithm for detecting the requested properties
-        for idx, char in enumerate(queryformat):
-            # ignore the current char if needed
-            if ignorenext:
-                ignorenext = False
+        def add_literal():
+            if literal:
+                parts.append((cls.LITERAL, "".join(literal)))
+                del literal[:]
 
-                # if we are in the "capturing" state (1), we can just add the
-                # current char to our field string
-                if state == 1:
-                    field += char
+        while idx < length:
+            char = queryformat[idx]
 
+            # a backslash and the next character are kept as they are
+            if char == '\\':
+                literal.append(queryformat[idx:idx+2])
+                idx += 2
                 continue
 
-            # skip the current char if needed (user for escaping with '{')
-            if skip != -1 and skip == idx:
-                skip = -1
+            if char != '{':
+                literal.append(char)
+                idx += 1
                 continue
 
-            # this is also an escape detection but it is actually no longer needed.
-            # can be removed in future versions
-            if char == '\\':
-                ignorenext = True
+            # '{{' starts a text which ends with '}}' and is kept as it is
+            if queryformat.startswith('{{', idx):
+                end = cls.find_end(queryformat, idx + 2, '}}')
+                end = length if end == -1 else end + 2
+                literal.append(queryformat[idx:end])
+                idx = end
                 continue
 
-            # if we are not in any capturing state (1), we jump into this condition if
-            # we found a '{'. '{' means, if there is not a second '{' after the current
-            # '{', this should be a capturing instruction
-            if char == '{' and state == 0:
-                # if we are not at the end of the string, we have a look onto the next
-                # character. If the next character also contains a '{', we are in a
-                # 'ignore everything in it' statement
-                if length-1 != idx:
-                    if queryformat[idx+1] == '{':
-                        # ok, we are in a 'ignore everything' statement. we skip now the next
-                        # character (because that's the '{') and jump into the 'ignore everything'
-                        # state (state 3)
-                        skip = idx+1
-                        state = 3
-                    else:
-                        # the next character is not a  'ignore everything' instruction. So we're
-                        # in a 'capturing' state. (state 1)
-                        state = 1
-                else:
-                    # we reached the end of the string - just jump into the 'capturing' statement
-                    state = 1
-                continue
+            end = cls.find_end(queryformat, idx + 1, '}')
 
-            # detect the end of the 'capturing' sequence. (the current character has to be a '}' and
-            # we also have to be in the 'capturing' state)
-            if char == '}' and state == 1:
-                state = 0
+            # an unterminated '{' is kept as it is
+            if end == -1:
+                literal.append(queryformat[idx:])
+                break
 
-                # we copy our captured string into our 'fields' list - that is really important
-                # because we need all requested properties
-                fields.add(field)
+            # a backslash inside of a property name protects the next character
+            name = re.sub(r'\\(.)', r'\1', queryformat[idx+1:end])
 
-                # clear the string because we need it for the next capturing sequence
-                field = ""
-                continue
+            add_literal()
+            parts.append((cls.CONSTANT if name in cls.CONSTANTS else cls.PROPERTY, name))
+            idx = end + 1
+
+        add_literal()
+        return parts
 
-            # detect the end of a 'ignore everything' sequence
-            if char == '}' and state == 3:
-                # check if we reached the end of the string - if not, look onto the next character.
-                # if the next character is a '}', we can leave the 'ignore everything' sequence.
-                # if not, just skip it
-                if length-1 != idx:
-                    if queryformat[idx+1] == '}':
-                        # go back into the 'nothing' (append until we found a new instruction)
-                        # statement
-                        state = 0
-                        skip = idx+1
-
-            # if we're in the 'capturing' sequence, we have to append the current character
-            # to our 'field' string
-            if state == 1:
-                field += char
-
-        # make the fields list public - this will be needed for some other functions
-        # like 'fetch_data' since there is no option for passing the 'fields' list
-        # over the argument list
-        self.fields = fields
-        return self.fields
-
-    def fetch_data(self, filter=None, sort=None, default_output=None):
-        """Fetches the requested properties from self.extract_fields()
-
-        :param list filter: The filter list from args.filter (can be None if we don't need the filter function)
-        :param string sort: The sort item for the sort function (this is a property - can be None if we don't
-                            want to use the sort function)
-        :return dict: a dictionary with all properties and their values
+    @staticmethod
+    def find_end(queryformat, idx, end):
+        """Finds the end of a sequence; escaped characters are skipped
+
+        :param string queryformat: The query format string
+        :param int idx: The start position of the search
+        :param string end: The end of the sequence
+        :return int: the position of end or -1
         """
+        while idx < len(queryformat):
+            if queryformat[idx] == '\\':
+                idx += 2
+            elif queryformat.startswith(end, idx):
+                return idx
+            else:
+                idx += 1
 
-        data = dict()
+        return -1
 
-        if not filter:
-            self.filters_matched = True
+    def render(self, handler, data):
+        """Formats the output line of a file
 
-        if self.fields:
-            # build the xpath for selecting all needed properties
-            xpath = "*[self::dm:" + " or self::dm:".join(self.fields)
-            if sort is None:
-                xpath += "]"
-            else:
-                # when the args.sort is set, we can append that string to our
-                # xpath. that's needed if we want to display 'maintainer' but
-                # sort
-                xpath += " or self::dm:" + sort + "]"
-                self.fields.add(sort)
-
-            # if there are invalid characters in the xpath, lxml throws an exception.
-            # We have to catch that.
-            try:
-                data = { localname(e.tag): e.text  for e in self.xmlhandler.dm.xpath(xpath, namespaces=NS) }
-            except etree.XPathEvalError:
-                log.error("The given XML properties in --sort/-s or --queryformat/-qf are invalid.")
-                sys.exit(ReturnCodes.E_INVALID_XML_PROPERTIES)
+        :param XmlHandler handler: The XML handler of the file
+        :param dict data: the data items from Analyzer.fetch_data
+        :return string: the formatted line
+        """
+        return "".join([ value if kind == QueryFormat.LITERAL else
+                         data.get(value, '') if kind == QueryFormat.PROPERTY else
+                         QueryFormat.CONSTANTS[value](handler)
+                         for kind, value in self.parts ])
+
+
+class AnalyzeQuery(object):
+    """An AnalyzeQuery instance contains the requested properties and the
+       filters of an analyze run. The filters are compiled into one
+       FilterExpression. The properties and the values of the filters are
+       selected by XPath objects which are compiled once per thread and
+       evaluated on the dm:docmanager element of every file.
+    """
+
+    def __init__(self, fields, filters=None, sort=None, default_output=None):
+        """Validates the filters and builds the XPath expressions
+
+        :param set fields: The requested properties (see QueryFormat.fields)
+        :param list filters: The filter list from args.filter (can be None)
+        :param string sort: The sort property (can be None)
+        :param string default_output: The value of missing properties
+        """
+        self.fields = set(fields)
+        self.default_output = default_output
+
+        # the sort property is fetched even if it is not displayed
+        if self.fields and sort is not None:
+            self.fields.add(sort)
+
+        try:
+            # validate the filter syntax of any given filter
+            self.predicate = FilterExpression(filters or [])
+        except DMAnalyzeInvalidFilterSyntax as err:
+            # syntax is wrong
+            log.error("Invalid syntax in filter: '{}'".format(err.args[0]))
+            log.error("Look into the manual page for more information about using filters.")
+            sys.exit(ReturnCodes.E_ANALYZE_FILTER_INVALID_SYNTAX)
+
+        self.fields_xpath = self.build_xpath(self.fields)
+        self.filters_xpath = self.predicate.xpaths()
+
+        # the compiled XPath objects of the current thread
+        self._local = threading.local()
+
+    @staticmethod
+    def build_xpath(props):
+        """Builds the XPath which selects the children of dm:docmanager
+
+        :param props: The properties
+        :return string: the XPath or None if there are no properties
+        """
+        if not props:
+            return None
 
-            # loop over all 'properties' and fetch their values from the XML file. properties
-            # without values will become an empty string if the 'default-option' was not set
-            for f in self.fields:
-                data.setdefault(f, data.get(f, None))
-
-                if not data[f]:
-                    if not default_output:
-                        data[f] = ''
-                    else:
-                        data[f] = default_output
-
-        if filter:
-            filters = dict()
-            filters_xpath = ""
-
-            for idx, f in enumerate(filter):
-                try:
-                    # validate the filter syntax of any given filter
-                    mode, prop, condition = self.validate_filter(f)
-
-                    # save the details about a filter in a dictionary
-                    filters[prop] = dict()
-                    filters[prop]['mode'] = mode
-                    filters[prop]['condition'] = condition
-
-                    if idx == 0:
-                        filters_xpath += "self::dm:" + prop
-                    else:
-                        filters_xpath += " or self::dm:" + prop
-                except DMAnalyzeInvalidFilterSyntax:
-                    # syntax is wrong
-                    log.error("Invalid syntax in filter: '{}'".format(f))
-                    log.error("Look into the manual page for more information about using filters.")
-                    sys.exit(ReturnCodes.E_ANALYZE_FILTER_INVALID_SYNTAX)
-
-            # catch the values of the filter properties
-            f_xpath = { localname(e.tag): e.text  for e in self.xmlhandler.dm.xpath("*[{}]".format(filters_xpath), namespaces=NS) }
-
-            for f in filters:
-                # if the filter property was not found in the XML file -> the filter didn't
-                # not match and we have to return an empty dictionary
-                if f not in f_xpath:
-                    self.filters_matched = False
-                    return {}
-
-                    # f_xpath[f] = ''
-
-                # condition checks
-                if filters[f]['mode'] == '+':
-                    if f_xpath[f] != filters[f]['condition']:
-                        self.filters_matched = False
-                        return {}
-                elif filters[f]['mode'] == '-':
-                    if f_xpath[f] == filters[f]['condition']:
-                        self.filters_matched = False
-                        return {}
+        return "*[self::dm:" + " or self::dm:".join(props) + "]"
 
-        return data
+    def compiled(self):
+        """Returns the compiled XPath objects of the current thread
+
+        :return tuple: (fields, filters); fields can be None, filters is a
+                       dictionary with the XPath object of every filter key
+        """
+        local = self._local
+
+        if not hasattr(local, "xpaths"):
+            local.xpaths = (
+                self.compile(self.fields_xpath, ReturnCodes.E_INVALID_XML_PROPERTIES,
+                             "The given XML properties in --sort/-s or "
+                             "--queryformat/-qf are invalid."),
+                { key: self.compile(xpath, ReturnCodes.E_ANALYZE_FILTER_INVALID_SYNTAX,
+                                    "The given XML properties in --filter/-f are invalid.")
+                  for key, xpath in self.filters_xpath.items() },
+            )
+
+        return local.xpaths
+
+    @staticmethod
+    def compile(xpath, exitcode, message):
+        """Compiles an XPath expression
+
+        :param string xpath: The XPath expression or None
+        :param int exitcode: Exit code if the expression is invalid
+        :param string message: Error message if the expression is invalid
+        :return etree.XPath: the compiled expression or None
+        """
+        if xpath is None:
+            return None
+
+        # if there are invalid characters in the xpath, lxml throws an exception.
+        # We have to catch that.
+        try:
+            return etree.XPath(xpath, namespaces=NS)
+        except etree.XPathError:
+            log.error(message)
+            sys.exit(exitcode)
+
+    def prefilter(self, index, files):
+        """Evaluates the filters on the values which are stored in the
+           metadata index, so these files don't have to be parsed
+
+        :param MetadataIndex index: The metadata index
+        :param list files: The files
+        :return: the files which are up to date in the index, but don't
+                 match the filters
+        :rtype: set
+        """
+        if not self.predicate:
+            return set()
+
+        values = index.select(files, self.predicate.keys)
+
+        return set(fname for fname, props in values.items()
+                   if not self.predicate(props.get))
+
+    def __getstate__(self):
+        # compiled XPath objects can't be pickled; every worker process
+        # compiles its own
+        state = self.__dict__.copy()
+        del state["_local"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+
+class Analyzer(object):
+
+    def __init__(self, xmlhandler):
+        """Constructor for the Analyzer class
+
+        :param XmlHandler xmlhandler: A valid XmlHandler object
+        """
+
+        self.xmlhandler = xmlhandler
+        self.filters_matched = True
+
+        # validate the XmlHandler object
+        if self.xmlhandler is None:
+            raise DMInvalidXMLHandlerObject()
 
-    def validate_filter(self, filter):
-        """Validates the syntax of a filter (example: +property=value, -property=value, property=value)
+    def fetch_data(self, query):
+        """Fetches the requested properties of the query and applies its
+           filters
 
-        :param string filter: One single filter (not the filter list)
-        :return list: the mode, the property, the filter property condition
+        :param AnalyzeQuery query: The compiled query
+        :return dict: a dictionary with all properties and their values; empty
+                      if a filter didn't match
         """
 
-        # look for the operator (if no valid operator was found, use '+')
-        if filter[0] != '+' and filter[0] != '-':
-            filter = "+{}".format(filter)
+        data = dict()
+        select, filterselect = query.compiled()
+        dm = self.xmlhandler.dm
 
-        # detect the first occurrence of the character '='
-        pos = filter.find("=")
-        if pos == -1:
-            raise DMAnalyzeInvalidFilterSyntax()
+        self.filters_matched = True
 
-        # extract the property and the condition
-        prop = filter[1:-(len(filter)-pos)]
-        cond = filter[pos+1:]
+        if select is not None:
+            data = { localname(e.tag): e.text for e in select(dm) }
 
-        return [filter[0],prop,cond]
+            # loop over all 'properties' and fetch their values from the XML file. properties
+            # without values will become an empty string if the 'default-option' was not set
+            for f in query.fields:
+                if not data.get(f):
+                    data[f] = query.default_output or ''
+
+        # if a filter property was not found in the XML file, the filter
+        # didn't match and we have to return an empty dictionary
+        if query.predicate and not query.predicate(partial(self.lookup, filterselect, dm)):
+            self.filters_matched = False
+            return {}
+
+        return data
 
-    def format_output(self, source, data):
-        """formats the output of the -qf (--queryformat)
+    @staticmethod
+    def lookup(xpaths, dm, key):
+        """Returns the value of a filter key (see FilterExpression)
 
-        :param string source: The query format string (-qf/--queryformat) from the command line
-        :param string data: the data items from fetch_data
-        :return string: the formatted query format string
+        :param dict xpaths: The compiled XPath objects of the filter keys
+        :param lxml.etree._Element dm: The dm:docmanager element
+        :param string key: The filter key
+        :return string: the value or None if the property does not exist
         """
+        result = xpaths[key](dm)
+        if not result:
+            return None
 
-        if data:
-            # iterate through each item and replace the properties with their values
-            for i in data:
-                source = source.replace('{' + i + '}', data[i])
+        # attributes are strings, properties are elements
+        result = result[0]
+        return result if isinstance(result, str) else result.text or ''
 
-        return source
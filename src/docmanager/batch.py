@@ -0,0 +1,111 @@
+#
+# Copyright (c) 2015 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+"""Batch scripts
+
+A batch script contains one sub command per line, without any files:
+
+    set -p status=editing
+    ["set-attr", "-p", "maintainer", "-a", "team=doc"]
+    {"command": "get", "args": ["-p", "status"]}
+
+Lines can be shell-like or JSON (a list of arguments, or an object with
+the keys 'command' and 'args'). Empty lines and lines starting with '#'
+are ignored.
+"""
+
+import json
+import shlex
+import sys
+from docmanager.core import ReturnCodes
+from docmanager.logmanager import log
+
+
+class JobCollected(Exception):
+    """Raised by Actions.run_jobs when the job of a batch command was
+       collected (see BatchCommand)
+    """
+    pass
+
+
+class BatchCommand(object):
+    """A BatchCommand instance represents a sub command of a batch script
+
+    The command runs twice: first, Actions.run_jobs only collects the job
+    and its arguments and stops the sub command with JobCollected. After
+    the jobs of all commands ran on the files, the sub command runs again
+    and gets the collected results instead of running the job.
+    """
+
+    def __init__(self, args):
+        """Initializes the BatchCommand class
+
+        :param argparse.Namespace args: The parsed sub command
+        """
+        self.args = args
+        self.job = None
+        self.jobargs = None
+        self.results = None
+
+
+def parse_script_line(line):
+    """Splits a line of a batch script into arguments
+
+    :param str line: The line
+    :return: the arguments or None for empty lines and comments
+    :rtype: list
+    :raise ValueError: if the line is not valid
+    """
+    line = line.strip()
+
+    if not line or line.startswith("#"):
+        return None
+
+    if line[0] not in "[{":
+        return shlex.split(line)
+
+    command = json.loads(line)
+    if isinstance(command, dict):
+        command = [command["command"]] + list(command.get("args", []))
+
+    if not all(isinstance(i, str) for i in command):
+        raise ValueError("all arguments have to be strings")
+
+    return command
+
+
+def read_script(stream):
+    """Reads all sub commands of a batch script
+
+    :param stream: file object of the script
+    :return: list of argument lists
+    :rtype: list
+    """
+    commands = list()
+
+    for lineno, line in enumerate(stream, 1):
+        try:
+            command = parse_script_line(line)
+        except (ValueError, KeyError, TypeError) as err:
+            log.error("Invalid line %d in the batch script: %s", lineno, err)
+            sys.exit(ReturnCodes.E_INVALID_BATCH_SCRIPT)
+
+        if command:
+            commands.append(command)
+
+    return commands
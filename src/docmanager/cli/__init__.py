@@ -21,8 +21,9 @@ from configparser import NoOptionError, NoSectionError
 
 from .. import __version__
 from ..config import docmanagerconfig, create_userconfig
-from ..core import ReturnCodes, DEFAULT_DM_PROPERTIES, DEFAULT_PROCESSES
-from ..logmanager import log, logmgr_flog, setloglevel
+from ..core import ReturnCodes, DEFAULT_DM_PROPERTIES, DEFAULT_PROCESSES, DEFAULTSUBCOMMANDS, \
+     DEFAULT_EXECUTOR, EXECUTORS, TIMINGS_FORMATS, PROFILE_FILE
+from ..logmanager import log, logmgr_trace, setloglevel
 
 from .checks import *
 from .cmd_alias import alias_subcmd, rewrite_alias
@@ -35,16 +36,74 @@ from .cmd_set import set_subcmd
 from .cmd_setattr import setattr_subcmd
 from .cmd_delattr import delattr_subcmd
 from .cmd_getattr import getattr_subcmd
+from .cmd_index import index_subcmd
+from .cmd_batch import batch_subcmd
+from .cmd_serve import serve_subcmd
+from ..index import default_index_file
 
 from glob import glob
 import re
 import os
 import shlex
 import sys
-import urllib.request
 
 
 
+# Global options which take a value (see parsecli)
+VALUE_OPTIONS = ('--config', '--trace', '-j', '--jobs', '--executor', '--timings-format')
+
+
+def requested_action(cliargs):
+    """Returns the sub command of a command line without parsing it
+
+    :param list cliargs: Arguments to parse
+    :return: the action (see DEFAULTSUBCOMMANDS) or None if there is no
+             sub command or the help is requested before it
+    :rtype: str
+    """
+    skip = False
+
+    for arg in cliargs:
+        if skip:
+            skip = False
+        elif arg in ('-h', '--help'):
+            return None
+        elif arg in VALUE_OPTIONS:
+            skip = True
+        elif not arg.startswith('-'):
+            return DEFAULTSUBCOMMANDS.get(arg)
+
+    return None
+
+
+def optional_value(cliargs, option, value):
+    """Replaces a global option without a value by option=value; so the
+       value of such an option can only be given as option=VALUE, and the
+       sub command is never taken as its value
+
+    :param list cliargs: Arguments to parse
+    :param str option: The option (like '--profile')
+    :param str value: The default value of the option
+    :return: the arguments
+    :rtype: list
+    """
+    result = list(cliargs)
+    skip = False
+
+    for i, arg in enumerate(result):
+        if skip:
+            skip = False
+        elif arg == option:
+            result[i] = "{}={}".format(option, value)
+        elif arg in VALUE_OPTIONS:
+            skip = True
+        elif not arg.startswith('-'):
+            # the global options end with the sub command
+            break
+
+    return result
+
+
 def parsecli(cliargs=None, error_on_config=False):
     """Parse command line arguments
 
@@ -53,6 +112,10 @@ def parsecli(cliargs=None, error_on_config=False):
     :rtype: argparse.Namespace
     """
 
+    # --profile takes an optional value (see optional_value)
+    cliargs = optional_value(sys.argv[1:] if cliargs is None else cliargs,
+                             '--profile', PROFILE_FILE)
+
     # parse just --config and --verbose
     confparser = argparse.ArgumentParser(add_help=False)
     confparser.add_argument('--config', dest='configfile', metavar='CONFIGFILE',
@@ -60,11 +123,27 @@ def parsecli(cliargs=None, error_on_config=False):
                                  'XDG_CONFIG_HOME env variable if set')
     confparser.add_argument('-v', '--verbose', action='count',
                             help="Increase verbosity level")
+    confparser.add_argument('--trace', metavar='MODULES',
+                            help="Log every function call in the given "
+                                 "modules (comma separated, like "
+                                 "'xmlhandler,action', or 'all') at debug level; "
+                                 "cannot be combined with --profile")
+    confparser.add_argument('--timings', action='store_true', default=None,
+                            help="Print the wall and CPU time of every phase "
+                                 "and the slowest files to stderr")
+    confparser.add_argument('--timings-format', choices=TIMINGS_FORMATS,
+                            help="Output format of --timings (default: text)")
+    confparser.add_argument('--profile', metavar='FILE',
+                            help="Profile the main thread and all workers, write the "
+                                 "merged stats to FILE (--profile=FILE, default: "
+                                 "{}), and print the most expensive functions "
+                                 "to stderr; cannot be combined with --trace".format(PROFILE_FILE))
     args, remaining_argv = confparser.parse_known_args(cliargs)
 
     # Store configuration filename for further usage:
     configfile = args.configfile
     config = None
+    confargs = args
 
     # init log module
     setloglevel(args.verbose)
@@ -88,6 +167,20 @@ def parsecli(cliargs=None, error_on_config=False):
     except KeyError:
         pass
 
+    # function call tracing is opt-in per module
+    trace = args.trace
+    if trace is None and config.has_section("general"):
+        trace = config.get("general", "trace", fallback=None)
+
+    # both need the sys.setprofile hook of every thread
+    if trace and args.profile:
+        log.error("--profile cannot be combined with --trace (or the 'trace' "
+                  "key of the configuration files)!")
+        sys.exit(ReturnCodes.E_INVALID_ARGUMENTS)
+
+    if trace:
+        logmgr_trace([ i.strip() for i in trace.split(",") if i.strip() ])
+
     if remaining_argv:
         alias = remaining_argv[0]
 
@@ -165,6 +258,18 @@ def parsecli(cliargs=None, error_on_config=False):
                         action='store',
                         help='The amount of jobs for parsing all XML files.'
                         )
+    parser.add_argument('--use-index',
+                        action='store_true',
+                        default=None,
+                        help='Answer get, get-attr, and analyze from the '
+                             'metadata index; only changed files are parsed.'
+                        )
+    parser.add_argument('--executor',
+                        choices=EXECUTORS,
+                        action='store',
+                        help='Parse and process the XML files in threads or in '
+                             'separate processes (default: {})'.format(DEFAULT_EXECUTOR)
+                        )
 
     # Create a subparser for all of our subcommands,
     # save the subcommand in 'dest'
@@ -174,16 +279,29 @@ def parsecli(cliargs=None, error_on_config=False):
         # metavar="COMMAND"
         )
 
-    init_subcmd(subparsers, stop_on_error, propargs, mainprops, filesargs)
-    get_subcmd(subparsers, quiet, propargs, filesargs)
-    set_subcmd(subparsers, stop_on_error, propargs, mainprops, filesargs)
-    del_subcmd(subparsers, propargs, filesargs)
-    setattr_subcmd(subparsers, stop_on_error, prop, attributes, filesargs)
-    delattr_subcmd(subparsers, stop_on_error, prop, attributes, filesargs)
-    getattr_subcmd(subparsers, stop_on_error, propargs, attributes, filesargs)
-    analyze_subcmd(subparsers, queryformat, filters, sort, quiet, stop_on_error, default_output, filesargs)
-    config_subcmd(subparsers)
-    alias_subcmd(subparsers)
+    subcommands = (
+        ("init",     lambda: init_subcmd(subparsers, stop_on_error, propargs, mainprops, filesargs)),
+        ("get",      lambda: get_subcmd(subparsers, quiet, propargs, filesargs)),
+        ("set",      lambda: set_subcmd(subparsers, stop_on_error, propargs, mainprops, filesargs)),
+        ("delete",   lambda: del_subcmd(subparsers, propargs, filesargs)),
+        ("set_attr", lambda: setattr_subcmd(subparsers, stop_on_error, prop, attributes, filesargs)),
+        ("del_attr", lambda: delattr_subcmd(subparsers, stop_on_error, prop, attributes, filesargs)),
+        ("get_attr", lambda: getattr_subcmd(subparsers, stop_on_error, propargs, attributes, filesargs)),
+        ("analyze",  lambda: analyze_subcmd(subparsers, queryformat, filters, sort, quiet, stop_on_error, default_output, filesargs)),
+        ("config",   lambda: config_subcmd(subparsers)),
+        ("alias",    lambda: alias_subcmd(subparsers)),
+        ("index",    lambda: index_subcmd(subparsers, stop_on_error)),
+        ("batch",    lambda: batch_subcmd(subparsers, stop_on_error, filesargs)),
+        ("serve",    lambda: serve_subcmd(subparsers)),
+    )
+
+    # build only the parser of the requested sub command; the help and
+    # the error messages need all of them
+    requested = requested_action(sys.argv[1:] if cliargs is None else cliargs)
+
+    for action, register in subcommands:
+        if requested is None or requested == action:
+            register()
 
     # -----
     args = parser.parse_args(args=cliargs)
@@ -191,6 +309,11 @@ def parsecli(cliargs=None, error_on_config=False):
     if args.configfile is None:
         args.configfile = configfile
 
+    # an alias drops the global options (see above)
+    for name in ('timings', 'timings_format', 'profile'):
+        if getattr(args, name) is None:
+            setattr(args, name, getattr(confargs, name))
+
     args.config = config
 
     ##
@@ -239,4 +362,32 @@ def parsecli(cliargs=None, error_on_config=False):
         log.error("Invalid argument in '-j/--jobs'. Please choose something between 1-64!")
         sys.exit(ReturnCodes.E_INVALID_ARGUMENTS)
 
+    # read the executor from the config files if it's not given
+    if args.executor is None:
+        args.executor = config.get("general", "executor", fallback=DEFAULT_EXECUTOR)
+
+    if args.executor not in EXECUTORS:
+        log.error("Invalid executor '{}'. Please choose one of: {}".format(
+                  args.executor, ", ".join(EXECUTORS)))
+        sys.exit(ReturnCodes.E_INVALID_ARGUMENTS)
+
+    # timings of the phases (see docmanager.timings)
+    if args.timings is None:
+        args.timings = config.getboolean("general", "timings", fallback=False)
+
+    if args.timings_format is None:
+        args.timings_format = config.get("general", "timings_format", fallback=TIMINGS_FORMATS[0])
+
+    if args.timings_format not in TIMINGS_FORMATS:
+        log.error("Invalid timings format '{}'. Please choose one of: {}".format(
+                  args.timings_format, ", ".join(TIMINGS_FORMATS)))
+        sys.exit(ReturnCodes.E_INVALID_ARGUMENTS)
+
+    # metadata index
+    if args.use_index is None:
+        args.use_index = config.getboolean("general", "use_index", fallback=False)
+
+    args.index_file = config.get("general", "index_file", fallback=None) or \
+                      default_index_file()
+
     return args
@@ -21,7 +21,6 @@ import os
 import os.path
 import re
 import sys
-import urllib.request
 from glob import glob
 
 from ..core import BT_ELEMENTLIST
@@ -30,8 +29,11 @@ from ..core import DEFAULTSUBCOMMANDS
 from ..core import LANGUAGES
 from ..core import STATUSFLAGS
 from ..core import ReturnCodes
+from ..core import URL_CHECK_TTL
+from ..dcfile import DependencyGraph, is_dc_file
+from ..exceptions import DMFileNotFoundError, DMInvalidDCFile
 from ..logmanager import log
-from ..logmanager import logmgr_flog
+from ..urlcheck import URLCheck, is_valid_url
 
 
 def show_langlist(columns=None, padding=2):
@@ -167,8 +169,6 @@ def input_format_check(args):
 
     :param object args: Arguments object from argparser
     """
-    logmgr_flog()
-
     if hasattr(args, 'status') and args.status is not None:
         if args.status not in STATUSFLAGS:
             print("Value of 'status' property is incorrect. "
@@ -213,34 +213,23 @@ def input_format_check(args):
                 sys.exit(ReturnCodes.E_WRONG_INPUT_FORMAT)
 
     if hasattr(args, 'repository') and args.repository is not None:
-        request = None
-        try:
-            request = urllib.request.urlopen(args.repository)
-        except ValueError:
+        if not is_valid_url(args.repository):
             print("Value of 'repository' is incorrect. "
                   "The value is not a URL.")
             sys.exit(ReturnCodes.E_WRONG_INPUT_FORMAT)
-        except urllib.error.URLError as err:
-            if hasattr(err, 'code') and err.code is not None:
-                if err.code is not 200:
-                    log.warn("The remote server returns an error code "
-                             "for this request: {} - Please double check if "
-                             "the URL is correct. Nevertheless the URL will "
-                             "be written into the "
-                             "given files.".format(err.code))
-            else:
-                log.warn("The given URL '{}' seems to be invalid or the "
-                         "remote server is not online. Please double "
-                         "check if the URL is correct. Nevertheless the "
-                         "URL will be written into the "
-                         "given files.".format(args.repository))
 
-        if hasattr(request, 'close'):
-            request.close()
+        # the reachability check is optional and never blocks the sub command
+        config = getattr(args, 'config', None)
+        if config is not None and config.getboolean("general", "check_repository", fallback=False):
+            args.urlcheck = URLCheck(args.repository,
+                                     config.get("general", "check_repository_cache", fallback=None),
+                                     config.getint("general", "check_repository_ttl",
+                                                   fallback=URL_CHECK_TTL))
 
 
 def fix_filelist(files):
-    """Replaces * with all files in a directory (shell like)
+    """Replaces * with all files in a directory (shell like) and DC files
+       with the XML files of their deliverable (see docmanager.dcfile)
 
     :param list files: file list from args.files
     """
@@ -248,6 +237,7 @@ def fix_filelist(files):
     if files:
         tmpfiles = files[:]
         files.clear()
+        graph = None
 
         for idx, i in enumerate(tmpfiles[:]):
             filelist = glob(i)
@@ -257,12 +247,40 @@ def fix_filelist(files):
                         log.error("Cannot find file {!r}!".format(x))
                         sys.exit(ReturnCodes.E_FILE_NOT_FOUND)
 
-                    files.append(x)
+                    if is_dc_file(x):
+                        if graph is None:
+                            graph = DependencyGraph()
+                        files.extend(resolve_dc_file(graph, x, files))
+                    else:
+                        files.append(x)
             else:
                 if not os.path.exists(i):
                     log.error("Cannot find file {!r}!".format(i))
                     sys.exit(ReturnCodes.E_FILE_NOT_FOUND)
 
+        if graph is not None:
+            graph.save()
+
+
+def resolve_dc_file(graph, dcfile, files):
+    """Returns the XML files of a DC file which are not in the file list yet
+
+    :param DependencyGraph graph: The dependency graph of the XIncludes
+    :param str dcfile: The DC file
+    :param list files: The files which were already added
+    :return: list of XML files
+    """
+    try:
+        xmlfiles = graph.resolve(dcfile)
+    except (DMInvalidDCFile, DMFileNotFoundError) as err:
+        log.error(err.errorstr)
+        sys.exit(err.error)
+
+    log.debug("DC file %r: %d XML files", dcfile, len(xmlfiles))
+
+    known = set(files)
+    return [ f for f in xmlfiles if f not in known ]
+
 def fix_attributes(args):
     """Make different attributes styles consistent
 
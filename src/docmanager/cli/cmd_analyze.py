@@ -16,6 +16,44 @@
 # To contact SUSE about this file by physical or electronic mail,
 # you may find current contact information at www.suse.com
 
+import argparse
+from ..core import AGGREGATES
+
+
+def limit(value):
+    """Converts the argument of --limit
+
+    :param str value: The argument
+    :return: the limit
+    :rtype: int
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        number = -1
+
+    if number < 0:
+        raise argparse.ArgumentTypeError("invalid limit: {!r}".format(value))
+
+    return number
+
+
+def aggregate(value):
+    """Converts the argument of --aggregate (FUNCTION[:PROPERTY])
+
+    :param str value: The argument
+    :return: (function, property); the property is None for count
+    :rtype: tuple
+    """
+    func, _, prop = value.partition(":")
+
+    if func not in AGGREGATES or (func == "count") != (not prop):
+        raise argparse.ArgumentTypeError("invalid aggregate: {!r} (use count, "
+                                         "min:PROPERTY, or max:PROPERTY)".format(value))
+
+    return func, prop or None
+
+
 def analyze_subcmd(subparsers, queryformat, filters, sort, quiet, stop_on_error, default_output, filesargs):
     """Create the 'analyze' subcommand
 
@@ -31,6 +69,28 @@ def analyze_subcmd(subparsers, queryformat, filters, sort, quiet, stop_on_error,
     panalyze.add_argument('-qf', '--queryformat', **queryformat)
     panalyze.add_argument('-f', '--filter', **filters)
     panalyze.add_argument('-s', '--sort', **sort)
+    panalyze.add_argument('-r', '--reverse',
+                          action='store_true',
+                          help='Sorts in descending order.'
+                          )
+    panalyze.add_argument('-l', '--limit',
+                          type=limit,
+                          help='Prints only the first N files (or groups) of '
+                               'the output.'
+                          )
+    panalyze.add_argument('-g', '--group-by',
+                          metavar='PROPERTY',
+                          help='Prints one line per value of the property '
+                               'with the aggregates of --aggregate instead '
+                               'of one line per file.'
+                          )
+    panalyze.add_argument('-a', '--aggregate',
+                          type=aggregate,
+                          action='append',
+                          metavar='FUNCTION[:PROPERTY]',
+                          help='An aggregate of --group-by: count, '
+                               'min:PROPERTY, or max:PROPERTY (default: count)'
+                          )
     panalyze.add_argument('--stop-on-error', **stop_on_error)
     panalyze.add_argument('-q', '--quiet', **quiet)
     panalyze.add_argument('-do', '--default-output', **default_output)
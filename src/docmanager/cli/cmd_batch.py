@@ -0,0 +1,40 @@
+#
+# Copyright (c) 2015 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+import argparse
+
+
+def batch_subcmd(subparsers, stop_on_error, filesargs):
+    """Create the 'batch' subcommand
+
+    :param subparsers:           Subparser for all subcommands
+    :param dict stop_on_error:   Dict for the --stop-on-error option
+    :param dict filesargs:       Dict for FILE argument
+    """
+    pbatch = subparsers.add_parser('batch',
+                                   help='Runs the sub commands of a script '
+                                        'against a single parse of every file.'
+                                   )
+    pbatch.add_argument('-s', '--script',
+                        type=argparse.FileType('r'),
+                        default='-',
+                        help='The batch script with one sub command per line, '
+                             'shell-like or JSON (default: stdin)'
+                        )
+    pbatch.add_argument('--stop-on-error', **stop_on_error)
+    pbatch.add_argument("files", **filesargs)
@@ -0,0 +1,43 @@
+#
+# Copyright (c) 2015 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+
+def index_subcmd(subparsers, stop_on_error):
+    """Create the 'index' subcommand
+
+    :param subparsers:           Subparser for all subcommands
+    :param dict stop_on_error:   Dict for the --stop-on-error option
+    """
+    pindex = subparsers.add_parser('index',
+                                   help='Manages the metadata index which is '
+                                        'used by get, get-attr, and analyze.'
+                                   )
+    _choices = ('rebuild', 'status', 'clear')
+    pindex.add_argument('index_action',
+                        metavar='ACTION',
+                        choices=_choices,
+                        help='The action you want to perform; use one of '
+                             '{}'.format(", ".join(_choices)))
+    pindex.add_argument('--stop-on-error', **stop_on_error)
+    pindex.add_argument("files",
+                        nargs='*',
+                        metavar="FILE",
+                        help='DocBook XML files to (re)index, to check, or to '
+                             'remove from the index. status and clear use '
+                             'all indexed files if no file is given.'
+                        )
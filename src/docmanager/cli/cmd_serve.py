@@ -0,0 +1,43 @@
+#
+# Copyright (c) 2015 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+
+from ..core import SERVER_CACHE_SIZE
+
+
+def serve_subcmd(subparsers):
+    """Create the 'serve' subcommand
+
+    :param subparsers:           Subparser for all subcommands
+    """
+    pserve = subparsers.add_parser('serve',
+                                   help='Runs a server which keeps the parsed '
+                                        'files in memory; other docmanager '
+                                        'calls are forwarded to it.'
+                                   )
+    pserve.add_argument('--socket',
+                        help='The socket file (default: $DOCMANAGER_SOCKET, '
+                             '$XDG_RUNTIME_DIR/docmanager.sock, or '
+                             '~/.cache/docmanager/server.sock)'
+                        )
+    pserve.add_argument('--cache-size',
+                        type=int,
+                        default=SERVER_CACHE_SIZE,
+                        help='The maximum number of files which are kept in '
+                             'memory (default: %(default)s)'
+                        )
@@ -0,0 +1,127 @@
+#
+# Copyright (c) 2015 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+
+"""Client of 'docmanager serve'
+
+If a server is listening on the socket file (see default_socket_file), the
+command line is forwarded to the server, which keeps the parsed files in
+memory. The server answers with the output and the exit code of the
+command. Without a server, nothing happens and the command runs locally.
+
+The protocol is a single JSON object per direction:
+
+  request:  { "argv": [...], "cwd": "..." }
+  response: { "stdout": "...", "stderr": "...", "exitcode": int }
+"""
+
+import json
+import os
+import socket
+import sys
+from docmanager.core import ReturnCodes
+
+# Sub commands which are never forwarded to the server
+LOCAL_ACTIONS = ("serve", "batch")
+
+
+def default_socket_file():
+    """Returns the socket file of the server: $DOCMANAGER_SOCKET,
+       $XDG_RUNTIME_DIR/docmanager.sock, or ~/.cache/docmanager/server.sock
+
+    :return: path of the socket file
+    :rtype: str
+    """
+    if os.environ.get('DOCMANAGER_SOCKET'):
+        return os.environ['DOCMANAGER_SOCKET']
+
+    if os.environ.get('XDG_RUNTIME_DIR'):
+        return os.path.join(os.environ['XDG_RUNTIME_DIR'], 'docmanager.sock')
+
+    cachehome = os.path.expanduser(os.environ.get('XDG_CACHE_HOME', '~/.cache/'))
+    return os.path.join(cachehome, 'docmanager', 'server.sock')
+
+
+def recv_message(sock):
+    """Reads a JSON message until the peer closes its side of the connection
+
+    :param socket.socket sock: The connected socket
+    :return: the decoded message or None if the peer sent nothing
+    :rtype: dict
+    """
+    chunks = list()
+
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+
+    if not chunks:
+        return None
+
+    return json.loads(b"".join(chunks).decode("utf-8"))
+
+
+def forward(cliargs=None, socketfile=None):
+    """Forwards a command line to a running server
+
+    :param list cliargs: Arguments of the command or None (=use sys.argv)
+    :param str socketfile: The socket file or None (=default_socket_file)
+    :return: the exit code of the command or None if there is no server
+    :rtype: int
+    """
+    if cliargs is None:
+        cliargs = sys.argv[1:]
+
+    if os.environ.get('DOCMANAGER_NO_SERVER') or \
+       any(arg in LOCAL_ACTIONS for arg in cliargs):
+        return None
+
+    socketfile = socketfile or default_socket_file()
+    if not os.path.exists(socketfile):
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    try:
+        sock.connect(socketfile)
+    except OSError:
+        # stale socket file, run the command locally
+        sock.close()
+        return None
+
+    try:
+        with sock:
+            request = { "argv": list(cliargs), "cwd": os.getcwd() }
+            sock.sendall(json.dumps(request).encode("utf-8"))
+            sock.shutdown(socket.SHUT_WR)
+            response = recv_message(sock)
+    except (OSError, ValueError) as err:
+        sys.stderr.write("Lost the connection to the docmanager server: {}\n".format(err))
+        return ReturnCodes.E_SERVER_ERROR
+
+    if response is None:
+        sys.stderr.write("The docmanager server closed the connection.\n")
+        return ReturnCodes.E_SERVER_ERROR
+
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+    sys.stdout.flush()
+
+    return response["exitcode"]
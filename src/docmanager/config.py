@@ -17,8 +17,6 @@
 # you may find current contact information at www.suse.com
 
 import os
-import shlex
-import subprocess
 import sys
 from configparser import ConfigParser
 from docmanager.exceptions import DMConfigFileNotFound
@@ -27,34 +25,78 @@ from docmanager.logmanager import log
 BASECONFIG_NAME = 'docmanager.conf'
 CONFIG_NAME = os.path.join('docmanager', BASECONFIG_NAME)
 GLOBAL_CONFIG = [os.path.join('/etc', CONFIG_NAME)]
-GIT_CONFIG = None # Will be set below
 XDG_CONFIG_HOME = os.path.expanduser(os.environ.get('XDG_CONFIG_HOME', '~/.config/'))
 USER_CONFIG = os.path.join(XDG_CONFIG_HOME, CONFIG_NAME)
+PACKAGE_CONFIG = os.path.join(os.path.dirname(__file__), BASECONFIG_NAME)
+
+# The default list of config files per Git repository root
+_CONFIGFILES = dict()
+
+
+def find_git_root(path=None):
+    """Returns the root of the Git work tree which contains path, like
+       `git rev-parse --show-toplevel`, but without running git
+
+    :param str path: The start directory (default: current directory)
+    :return: absolute path of the work tree or None
+    :rtype: str
+    """
+    path = os.path.abspath(path or os.getcwd())
+
+    while True:
+        # .git is a directory, or a file in work trees and submodules
+        if os.path.exists(os.path.join(path, '.git')):
+            return path
+
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+
+        path = parent
+
 
 def get_git_repo_config():
-    """Return root Git repository, if available
+    """Return the config file of the current Git repository, if available
 
-    :return: absolut path to Git repository
+    :return: absolut path to GIT_REPO_DIR/.git/docmanager.conf or None
     :rtype: str
     """
-    try:
-        cmd = shlex.split("git rev-parse --show-toplevel")
-        git = subprocess.Popen(cmd,
-                               stdout=subprocess.PIPE,
-                               stderr=subprocess.PIPE)
-        gitrepo = git.communicate()
-        # Not a git repository?
-        if git.returncode != 128:
-            gitrepo = gitrepo[0].decode("utf-8").strip()
-            return os.path.join(gitrepo, os.path.join('.git', BASECONFIG_NAME))
-
-    except FileNotFoundError: # pylint:disable=undefined-variable
-        # If we don't find the git command, we skip the local config file
-        # alltogether
+    gitrepo = find_git_root()
+
+    if gitrepo is None:
         return None
 
+    return os.path.join(gitrepo, '.git', BASECONFIG_NAME)
 
-GIT_CONFIG = get_git_repo_config()
+
+def default_configfiles(include_etc=True):
+    """Returns the list of the default config files (see docmanagerconfig);
+       the list is cached per Git repository
+
+    :param bool include_etc: Should the develop(!) 'etc/' directory included?
+    :return: list of config files, from lowest to highest priority
+    :rtype: list
+    """
+    gitcfg = get_git_repo_config()
+    key = (gitcfg, include_etc)
+
+    if key not in _CONFIGFILES:
+        configfiles = GLOBAL_CONFIG + [USER_CONFIG]
+
+        # Append config when a .git repo is found
+        if gitcfg:
+            configfiles.append(gitcfg)
+
+        # Support pyvenv virtual environments; add it as a last item
+        #
+        # See http://stackoverflow.com/a/1883251
+        if include_etc and hasattr(sys, 'base_prefix'):
+            configfiles.append(PACKAGE_CONFIG)
+            log.info("Running inside a virtual env, using %r", PACKAGE_CONFIG)
+
+        _CONFIGFILES[key] = configfiles
+
+    return _CONFIGFILES[key][:]
 
 
 def docmanagerconfig(cfgfiles=None, include_etc=True):
@@ -66,8 +108,8 @@ def docmanagerconfig(cfgfiles=None, include_etc=True):
        * $XDG_CONFIG_HOME/docmanager/docmanager.config if not found, falls back
          to ~/.config/docmanager/docmanager.config
        * GIT_REPO_DIR/.git/docmanager.conf
-         (GIT_REPO_DIR is retrieved by the command
-         `git rev-parse --show-toplevel`)
+         (GIT_REPO_DIR is the nearest parent directory of the current
+         directory which contains .git, see find_git_root)
        * DOCMANAGER_GIT_REPO/etc/config
 
       See the XDG Base Directory Specification:
@@ -80,19 +122,9 @@ def docmanagerconfig(cfgfiles=None, include_etc=True):
       :rtype: configparser.ConfigParser
 
     """
-    # Start with the global ones
-    configfiles = GLOBAL_CONFIG[:]
-
     if cfgfiles is None:
         # We need to assemble our configuration file list
-        #
-        # Append user config; env variable XDG_CONFIG_HOME is used if set
-        configfiles.append(USER_CONFIG)
-
-        # Append config when a .git repo is found
-        gitcfg = get_git_repo_config()
-        if gitcfg:
-            configfiles.append(gitcfg)
+        configfiles = default_configfiles(include_etc)
     else:
         log.debug("Using own config file %s", cfgfiles)
         # In case the user passes its own config file list, use it but
@@ -102,38 +134,6 @@ def docmanagerconfig(cfgfiles=None, include_etc=True):
         else:
             configfiles = cfgfiles
 
-    # Support pyvenv virtual environments; add it as a last item
-    #
-    # See http://stackoverflow.com/a/1883251
-    if (cfgfiles is None) and include_etc and hasattr(sys, 'base_prefix'):
-        #dd = os.path.dirname(__file__)
-        #cc = os.path.join(dd, BASECONFIG_NAME)
-        #configfiles.append(cc)
-        #log.debug("Running inside a virtual env, using %s", cc)
-        #
-        # When code with __file__ is packed inside a zipfile, it can no longer
-        # assume that __file__ or __path__ contain filenames or directory
-        # names, and so it will fail (see also PEP 302)
-        #
-        # As such:
-        # 1. First try to use pkg_resources from setuptools (which is installed
-        #    anyway in a virtual Python environment)
-        # 2. If that doesn't work, fallback to the __file__ method
-        #
-        # Source:
-        # http://peak.telecommunity.com/DevCenter/PythonEggs#accessing-package-resources
-        #
-        try:
-            from pkg_resources import resource_filename
-            cc = resource_filename(__name__, BASECONFIG_NAME)
-            configfiles.append(cc)
-        except ImportError:
-            # Use fallback method
-            dd = os.path.dirname(__file__)
-            cc = os.path.join(dd, BASECONFIG_NAME)
-            configfiles.append(cc)
-        log.info("Running inside a virtual env, using %r", configfiles[-1])
-
     config = ConfigParser()
     x = config.read(configfiles)
 
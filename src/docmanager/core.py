@@ -24,6 +24,35 @@ NS = {
 # the default amount of processes for parsing all XML files
 DEFAULT_PROCESSES = 4
 
+# Executors for parsing and processing the XML files
+EXECUTORS = ("thread", "process")
+DEFAULT_EXECUTOR = "thread"
+
+# output formats of --timings and the number of the slowest files in the
+# summary (see docmanager.timings)
+TIMINGS_FORMATS = ("text", "json")
+TIMINGS_SLOWEST = 10
+
+# default file of --profile and the number of functions in its summary
+# (see docmanager.profiler)
+PROFILE_FILE = "docmanager.pstats"
+PROFILE_TOP = 25
+
+# the amount of sorted records which are kept in memory before they
+# are written to a temporary file (see docmanager.sortutil)
+SORT_BUFFER_SIZE = 10000
+
+# aggregate functions of analyze --group-by (see docmanager.sortutil.GroupBy)
+AGGREGATES = ("count", "min", "max")
+
+# reachability check of repository URLs: maximum age of a cached result
+# and timeout of the request (in seconds)
+URL_CHECK_TTL = 24 * 60 * 60
+URL_CHECK_TIMEOUT = 5
+
+# the amount of parsed files which are kept by 'docmanager serve'
+SERVER_CACHE_SIZE = 10000
+
 # If you add new default properties:
 # * should start with a different character
 # * are used to create options
@@ -67,9 +96,22 @@ DEFAULTSUBCOMMANDS = {
     "c":        "config",
     "config":   "config",
     "al":       "alias",
-    "alias":    "alias"
+    "alias":    "alias",
+    "index":    "index",
+    "batch":    "batch",
+    "serve":    "serve"
 }
 
+# Sub commands which never modify the XML files
+READONLY_ACTIONS = ("get", "get_attr", "analyze", "index")
+
+# Sub commands which can use the metadata index
+INDEXED_ACTIONS = ("get", "get_attr", "analyze")
+
+# Sub commands which can be used in a batch script
+BATCH_ACTIONS = ("init", "set", "set_attr", "del_attr", "delete", "get",
+                 "get_attr", "analyze")
+
 STATUSFLAGS = ('editing', 'edited', 'proofing', 'proofed', 'comment',
                'locdrop', 'ready')
 
@@ -94,6 +136,9 @@ class ReturnCodes(object):
     E_USER_EXIT = 17
     E_FILE_IS_DIRECTORY = 18
     E_INVALID_ROOT_ELEMENT = 19
+    E_INVALID_BATCH_SCRIPT = 20
+    E_SERVER_ERROR = 21
+    E_INVALID_DC_FILE = 22
 
 VALIDROOTS = ('abstract', 'address', 'annotation', 'appendix', 'article', 'audiodata',
               'audioobject', 'bibliodiv', 'bibliography', 'bibliolist',
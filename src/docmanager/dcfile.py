@@ -0,0 +1,302 @@
+#
+# Copyright (c) 2015 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+
+"""DAPS doc config (DC) files
+
+A DC file (DC-name) describes a deliverable: MAIN names the main XML
+file in the xml/ directory next to the DC file, and ROOTID the element
+which is built, for example a single book of a set. The files of the
+deliverable are the main file and every file it includes with
+XInclude, or, if ROOTID is set, the file with the ROOTID element and the
+files which are included inside of that element.
+
+The XIncludes and the xml:id attributes of every file are stored in a
+dependency graph. The graph is cached in a JSON file and a file is only
+parsed again if its size or its modification time has changed.
+"""
+
+import json
+import os
+import shlex
+from docmanager.core import ReturnCodes
+from docmanager.exceptions import DMFileNotFoundError, DMInvalidDCFile
+from docmanager.logmanager import log
+
+DC_PREFIX = "DC-"
+
+# Name of the cache file of the dependency graph
+GRAPH_CACHE_NAME = "dcgraph.json"
+
+XINCLUDE = "{http://www.w3.org/2001/XInclude}include"
+XMLID = "{http://www.w3.org/XML/1998/namespace}id"
+
+
+def is_dc_file(fname):
+    """Checks if a file is a DC file (DC-name, but not DC-name.xml)
+
+    :param str fname: The file name
+    :return: True for DC files
+    :rtype: bool
+    """
+    base = os.path.basename(fname)
+    return base.startswith(DC_PREFIX) and not base.endswith(".xml") and os.path.isfile(fname)
+
+
+def default_graph_file():
+    """Returns the default location of the dependency graph cache
+       ($XDG_CACHE_HOME/docmanager/dcgraph.json)
+
+    :return: absolute path of the cache file
+    :rtype: str
+    """
+    cachehome = os.path.expanduser(os.environ.get('XDG_CACHE_HOME', '~/.cache/'))
+    return os.path.join(cachehome, 'docmanager', GRAPH_CACHE_NAME)
+
+
+def read_dc_file(dcfile):
+    """Reads the variables of a DC file (shell syntax: NAME="value")
+
+    :param str dcfile: The DC file
+    :return: { name: value }
+    :rtype: dict
+    :raise: DMInvalidDCFile if the file can't be read
+    """
+    variables = dict()
+
+    try:
+        with open(dcfile, 'r') as f:
+            lines = f.readlines()
+    except (OSError, UnicodeDecodeError) as err:
+        raise DMInvalidDCFile("Cannot read DC file {!r}: {}".format(dcfile, err),
+                              ReturnCodes.E_INVALID_DC_FILE)
+
+    for line in lines:
+        name, sep, value = line.strip().partition("=")
+        name = name.strip()
+
+        if not sep or not name.isidentifier():
+            continue
+
+        try:
+            variables[name] = " ".join(shlex.split(value, comments=True))
+        except ValueError:
+            raise DMInvalidDCFile("Invalid line in DC file {!r}: {}".format(dcfile, line.strip()),
+                                  ReturnCodes.E_INVALID_DC_FILE)
+
+    return variables
+
+
+def main_file(dcfile, variables):
+    """Returns the main XML file of a DC file; relative names are looked up
+       in the xml/ directory next to the DC file (as DAPS does) and then in
+       the directory of the DC file
+
+    :param str dcfile: The DC file
+    :param dict variables: The variables of the DC file
+    :return: the main file
+    :rtype: str
+    :raise: DMInvalidDCFile if MAIN is not set,
+            DMFileNotFoundError if the main file does not exist
+    """
+    main = variables.get("MAIN")
+    if not main:
+        raise DMInvalidDCFile("The DC file {!r} does not set MAIN.".format(dcfile),
+                              ReturnCodes.E_INVALID_DC_FILE)
+
+    dirname = os.path.dirname(dcfile)
+    candidates = [ os.path.join(dirname, "xml", main), os.path.join(dirname, main) ]
+
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return os.path.normpath(candidate)
+
+    raise DMFileNotFoundError("Cannot find the main file {!r} of {!r}.".format(main, dcfile),
+                              candidates[0], ReturnCodes.E_FILE_NOT_FOUND)
+
+
+class DependencyGraph(object):
+    """A DependencyGraph instance contains the XIncludes of XML files; it
+       is loaded from and saved to a cache file
+    """
+
+    def __init__(self, cachefile=None):
+        """Loads the cache file
+
+        :param str cachefile: The cache file (None = default_graph_file())
+        """
+        self.cachefile = cachefile or default_graph_file()
+        self.changed = False
+
+        try:
+            with open(self.cachefile, 'r') as f:
+                self.nodes = json.load(f)
+        except (OSError, ValueError):
+            self.nodes = dict()
+
+    @staticmethod
+    def scan(fname):
+        """Parses a file and collects its XIncludes and xml:id attributes
+
+        :param str fname: The file name
+        :return: { "ids": [xml:id of every element],
+                   "includes": [[included file, [xml:id of the ancestors]]] };
+                 a file which is not XML (like an empty file) has no
+                 XIncludes
+        :rtype: dict
+        """
+        from lxml import etree
+
+        # entities are not needed, and undefined entities must not stop the scan
+        parser = etree.XMLParser(resolve_entities=False, load_dtd=False,
+                                 no_network=True, recover=True)
+
+        try:
+            tree = etree.parse(fname, parser)
+        except (etree.XMLSyntaxError, etree.ParseError) as err:
+            log.warning("Cannot scan the XIncludes of {!r}: {}".format(fname, err))
+            return { "ids": list(), "includes": list() }
+
+        dirname = os.path.dirname(fname)
+        ids = list()
+        includes = list()
+
+        for elem in tree.iter(tag=etree.Element):
+            xmlid = elem.get(XMLID)
+            if xmlid is not None:
+                ids.append(xmlid)
+
+            if elem.tag != XINCLUDE or elem.get("parse", "xml") != "xml" or not elem.get("href"):
+                continue
+
+            href = os.path.normpath(os.path.join(dirname, elem.get("href")))
+            ancestors = [ a.get(XMLID) for a in elem.iterancestors() if a.get(XMLID) is not None ]
+            includes.append([href, ancestors])
+
+        return { "ids": ids, "includes": includes }
+
+    def node(self, fname):
+        """Returns the XIncludes and xml:id attributes of a file; the file
+           is only parsed if it has been changed since it was scanned
+
+        :param str fname: The file name
+        :return: see scan; a file which cannot be read has no XIncludes
+        :rtype: dict
+        """
+        key = os.path.abspath(fname)
+
+        try:
+            stat = os.stat(fname)
+            stat = [ stat.st_size, stat.st_mtime ]
+            node = self.nodes.get(key)
+
+            if node is None or node["stat"] != stat:
+                log.debug("Scanning XIncludes of %r", fname)
+                node = self.scan(fname)
+                node["stat"] = stat
+                self.nodes[key] = node
+                self.changed = True
+        except OSError as err:
+            # unreadable or vanished files are not cached
+            log.warning("Cannot scan the XIncludes of {!r}: {}".format(fname, err))
+            node = { "ids": list(), "includes": list() }
+
+        return node
+
+    def walk(self, fname, rootid=None):
+        """Returns a file and all files which it includes (recursively)
+
+        :param str fname: The file name
+        :param str rootid: Follow only the XIncludes of the file which are
+                           inside of the element with this xml:id (None =
+                           all XIncludes)
+        :return: list of files in document order without duplicates
+        :rtype: list
+        """
+        files = list()
+        seen = set()
+        stack = [ (fname, rootid) ]
+
+        while stack:
+            current, elemid = stack.pop()
+            if current in seen:
+                continue
+
+            if not os.path.isfile(current):
+                log.warning("Cannot find the included file {!r}.".format(current))
+                continue
+
+            seen.add(current)
+            files.append(current)
+
+            includes = [ href for href, ancestors in self.node(current)["includes"]
+                         if elemid is None or elemid in ancestors ]
+
+            # the included files of an element are included completely
+            stack.extend((href, None) for href in reversed(includes))
+
+        return files
+
+    def resolve(self, dcfile):
+        """Returns the XML files of the deliverable of a DC file
+
+        :param str dcfile: The DC file
+        :return: list of files in document order
+        :rtype: list
+        :raise: DMInvalidDCFile, DMFileNotFoundError (see main_file)
+        """
+        variables = read_dc_file(dcfile)
+        main = main_file(dcfile, variables)
+        files = self.walk(main)
+        rootid = variables.get("ROOTID")
+
+        if rootid:
+            # the deliverable starts at the file which contains the ROOTID element
+            for fname in files:
+                if rootid in self.node(fname)["ids"]:
+                    files = self.walk(fname, rootid)
+                    break
+            else:
+                log.warning("Cannot find ROOTID {!r} of {!r}; using all files "
+                            "of {!r}.".format(rootid, dcfile, main))
+
+        return files
+
+    def save(self):
+        """Writes the cache file if the graph was changed; the file is
+           replaced atomically
+        """
+        import tempfile
+
+        if not self.changed:
+            return
+
+        dirname = os.path.dirname(self.cachefile) or "."
+
+        try:
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname)
+
+            fd, tmpname = tempfile.mkstemp(dir=dirname, prefix=".dcgraph")
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.nodes, f)
+            os.replace(tmpname, self.cachefile)
+        except OSError as err:
+            log.debug("Could not write the dependency graph %r: %s", self.cachefile, err)
+
+        self.changed = False
@@ -19,8 +19,6 @@
 import json
 import sys
 from collections import OrderedDict
-from lxml import etree
-from prettytable import PrettyTable
 from docmanager.core import ReturnCodes
 from docmanager.shellcolors import red,green
 
@@ -90,6 +88,8 @@ def tablerenderer(data, **kwargs): # pylint: disable=unused-argument
     if data is None:
         return
 
+    from prettytable import PrettyTable
+
     args = kwargs["args"]
 
     if args.action == "alias":
@@ -185,6 +185,7 @@ def xmlrenderer(data, **kwargs): # pylint: disable=unused-argument
     :return: rendered output
     :rtype: str
     """
+    from lxml import etree
 
     root = etree.Element("docmanager")
     tree = root.getroottree()
@@ -306,12 +307,16 @@ def getrenderer(fmt):
     return renderer.get(fmt, DEFAULTRENDERER)
 
 
-def print_stats(validfiles, invalidfiles):
+def print_stats(validfiles, invalidfiles, unchangedfiles=0, writetime=None):
     """Print statistics how many files were valid/invalid, do a sys.exit
     if there were invalid files.
 
-    :param int validfiles: The number of valid files
+    :param int validfiles: The number of valid files which were written
     :param int invalidfiles: The number of invalid files
+    :param int unchangedfiles: The number of valid files which were not
+                               written, because nothing was changed
+    :param float writetime: The total time of writing (and comparing)
+                            the files in seconds or None
     """
 
     message = "\n"
@@ -320,6 +325,13 @@ def print_stats(validfiles, invalidfiles):
             green(validfiles),
             '' if validfiles == 1 else 's'
             )
+    if unchangedfiles > 0:
+        message += "Left {} XML file{} unchanged. ".format(
+            green(unchangedfiles),
+            '' if unchangedfiles == 1 else 's'
+            )
+    if writetime:
+        message += "Writing took {:.1f} ms. ".format(writetime * 1000)
     if invalidfiles > 0:
         message += "Skipped {} XML file{} due to errors.".format(
             red(invalidfiles),
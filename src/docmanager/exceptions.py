@@ -46,6 +46,11 @@ class DMFileNotFoundError(Exception):
 		self.error = error
 		self.filename = filename
 
+class DMInvalidDCFile(Exception):
+	def __init__(self, errorstr, error):
+		self.errorstr = errorstr
+		self.error = error
+
 class DMPropertyNotFound(Exception):
 	def __init__(self, filename, prop):
 		self.filename = filename
@@ -17,7 +17,10 @@
 # you may find current contact information at www.suse.com
 
 import datetime
+import os
 import os.path
+import stat
+import tempfile
 
 class FileUtil(object):
 
@@ -36,6 +39,13 @@ class FileUtil(object):
 
 		return os.path.getmtime(self.filename)
 
+	def get_size(self):
+		"""Returns the size of the file
+		:return int: The size in bytes
+		"""
+
+		return os.path.getsize(self.filename)
+
 	def get_mtime_format(self, formatstr):
 		"""Returns the last modify time as a string
 		:param str formatstr: Format string like: %Y-%m-%d %H:%M:%S
@@ -47,3 +57,32 @@ class FileUtil(object):
 		return datetime.datetime.fromtimestamp( \
 					mtime \
 				).strftime(formatstr)
+
+	def replace(self, content):
+		"""Replaces the content of the file atomically: the content is
+		written into a temporary file in the same directory, which is
+		renamed to the file afterwards. An interrupted write leaves the
+		old file untouched.
+		:param content: The new content
+		:type content: str or bytes
+		"""
+
+		# follow symbolic links, so the link stays a link
+		target = os.path.realpath(self.filename)
+		dirname = os.path.dirname(target)
+
+		fd, tmpname = tempfile.mkstemp(dir=dirname, prefix=".docmanager-")
+		try:
+			with os.fdopen(fd, 'wb' if isinstance(content, bytes) else 'w') as f:
+				f.write(content)
+
+			# keep the permissions of the file (mkstemp uses 0600)
+			try:
+				os.chmod(tmpname, stat.S_IMODE(os.stat(target).st_mode))
+			except FileNotFoundError:
+				pass
+
+			os.replace(tmpname, target)
+		except BaseException:
+			os.remove(tmpname)
+			raise
@@ -0,0 +1,224 @@
+#
+# Copyright (c) 2015 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+
+"""Filter expressions of analyze (--filter/-f)
+
+Every filter is a condition on a property or on an attribute of a
+property:
+
+    [+|-]PROPERTY[@ATTRIBUTE] OPERATOR VALUE
+
+The operators are '=', '!=', '<', '<=', '>', '>=', '~' (the value is a
+regular expression which must match a part of the property), '!~',
+'in', and 'not in' (the value is a comma separated list). Numbers are
+compared as numbers, everything else (for example ISO dates like
+2026-11-01) as text. A leading '-' negates the condition, '+' is the
+default. Nested properties are separated by slashes, for example
+bugtracker/component.
+
+All filters of a run are compiled into one FilterExpression. It gets the
+values of the properties from a lookup function, so it can be evaluated
+on the dm:docmanager element of a file as well as on the values stored
+in the metadata index (see MetadataIndex.select).
+"""
+
+import operator
+import re
+from docmanager.exceptions import DMAnalyzeInvalidFilterSyntax
+
+FILTER_SYNTAX = re.compile(r"""
+    (?P<mode>[+-]?)\s*
+    (?P<prop>[^\s=!<>~@]+)
+    (?:@(?P<attr>[^\s=!<>~@/]+))?
+    (?P<op>\s*(?:>=|<=|!=|!~|=|<|>|~)\s*|\s+not\s+in\s+|\s+in\s+)
+    (?P<value>.*)\Z
+    """, re.VERBOSE | re.DOTALL)
+
+# operators which compare numbers as numbers
+ORDERING = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+def tonumber(value):
+    """Converts a value into a number if possible
+
+    :param str value: The value
+    :return: the number or None
+    :rtype: float
+    """
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class Condition(object):
+    """A Condition instance is a single compiled filter"""
+
+    def __init__(self, mode, prop, attr, op, value):
+        """Compiles the operand of the condition
+
+        :param str mode: '+' or '-' (negated)
+        :param str prop: The property (nested properties: a/b)
+        :param str attr: The attribute or None
+        :param str op: The operator
+        :param str value: The operand
+        :raise: DMAnalyzeInvalidFilterSyntax if the operand is invalid
+        """
+        self.mode = mode
+        self.prop = prop
+        self.attr = attr
+        self.op = op
+        self.value = value
+
+        if op in ("~", "!~"):
+            try:
+                self.operand = re.compile(value)
+            except re.error:
+                raise DMAnalyzeInvalidFilterSyntax()
+        elif op in ("in", "not in"):
+            self.operand = frozenset(i.strip() for i in value.split(","))
+        elif op in ORDERING:
+            self.operand = tonumber(value)
+        else:
+            self.operand = value
+
+    @property
+    def key(self):
+        """The name of the value in a lookup: property or property@attribute"""
+        if self.attr is None:
+            return self.prop
+
+        return "{}@{}".format(self.prop, self.attr)
+
+    def matches(self, value):
+        """Checks the value of the property
+
+        :param str value: The value or None if the property does not exist
+        :return: True if the condition is met; always False for missing
+                 properties
+        :rtype: bool
+        """
+        if value is None:
+            return False
+
+        op = self.op
+
+        if op == "=":
+            result = value == self.operand
+        elif op == "!=":
+            result = value != self.operand
+        elif op == "~":
+            result = self.operand.search(value) is not None
+        elif op == "!~":
+            result = self.operand.search(value) is None
+        elif op == "in":
+            result = value in self.operand
+        elif op == "not in":
+            result = value not in self.operand
+        else:
+            number = tonumber(value)
+            if number is not None and self.operand is not None:
+                result = ORDERING[op](number, self.operand)
+            else:
+                result = ORDERING[op](value, self.value)
+
+        return result if self.mode == "+" else not result
+
+
+def parse_filter(text):
+    """Parses a filter (example: +property=value, priority>=5,
+       status in editing,edited)
+
+    :param str text: One single filter (not the filter list)
+    :return: the compiled filter
+    :rtype: Condition
+    :raise: DMAnalyzeInvalidFilterSyntax if the syntax is invalid
+    """
+    match = FILTER_SYNTAX.match(text)
+    if match is None:
+        raise DMAnalyzeInvalidFilterSyntax()
+
+    prop = match.group("prop").strip("/")
+    if not prop or "//" in prop:
+        raise DMAnalyzeInvalidFilterSyntax()
+
+    return Condition(match.group("mode") or "+", prop, match.group("attr"),
+                     " ".join(match.group("op").split()), match.group("value"))
+
+
+class FilterExpression(object):
+    """A FilterExpression instance is the conjunction of all filters of a
+       run. It is called with a lookup function which returns the value of
+       a key (see Condition.key) or None.
+    """
+
+    def __init__(self, filters):
+        """Parses the filters
+
+        :param list filters: The filter list from args.filter
+        :raise: DMAnalyzeInvalidFilterSyntax if a filter is invalid; the
+                invalid filter is the first argument of the exception
+        """
+        self.conditions = list()
+
+        for f in filters:
+            try:
+                self.conditions.append(parse_filter(f))
+            except DMAnalyzeInvalidFilterSyntax:
+                raise DMAnalyzeInvalidFilterSyntax(f)
+
+        # the keys of all values which are needed (without duplicates)
+        self.keys = list()
+        for cond in self.conditions:
+            if cond.key not in self.keys:
+                self.keys.append(cond.key)
+
+    def xpaths(self):
+        """Returns the XPath expressions of the values relative to the
+           dm:docmanager element
+
+        :return: { key: XPath }
+        :rtype: dict
+        """
+        xpaths = dict()
+
+        for cond in self.conditions:
+            xpath = "/".join("dm:" + i for i in cond.prop.split("/"))
+            if cond.attr is not None:
+                xpath += "/@" + cond.attr
+            xpaths[cond.key] = xpath
+
+        return xpaths
+
+    def __call__(self, lookup):
+        """Evaluates the filters
+
+        :param function lookup: Returns the value of a key or None
+        :return: True if all filters match
+        :rtype: bool
+        """
+        return all(cond.matches(lookup(cond.key)) for cond in self.conditions)
+
+    def __bool__(self):
+        return bool(self.conditions)
@@ -0,0 +1,298 @@
+#
+# Copyright (c) 2015 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+"""Persistent metadata index
+
+The index is an SQLite database which stores the serialized
+dm:docmanager element of every indexed file together with the size and
+the modification time of the file. As long as both are unchanged, the
+read-only sub commands use the stored element instead of parsing the file.
+
+The values of all properties and their attributes are stored in a
+second table, so the filters of analyze can be evaluated without
+creating an XmlHandler (see MetadataIndex.select).
+"""
+
+import os
+import threading
+from docmanager.core import NS
+from docmanager.fileutil import FileUtil
+from docmanager.logmanager import log
+
+INDEX_NAME = "index.sqlite"
+
+# Wrapper document for a stored dm:docmanager element
+CACHED_DOCUMENT = '<article xmlns="{d}"><info>{{}}</info></article>'.format(**NS)
+
+# Version of the schema; indexes with an older version are rebuilt
+SCHEMA_VERSION = 1
+
+_SCHEMA = ("""CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    docmanager TEXT NOT NULL
+)""", """CREATE TABLE IF NOT EXISTS properties (
+    path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value TEXT NOT NULL
+)""", """CREATE INDEX IF NOT EXISTS properties_name ON properties (name)""",
+    """CREATE INDEX IF NOT EXISTS properties_path ON properties (path)""")
+
+# One index object per process and index file
+_INDEXES = dict()
+
+
+def default_index_file():
+    """Returns the default location of the index file
+       ($XDG_CACHE_HOME/docmanager/index.sqlite)
+
+    :return: absolute path of the index file
+    :rtype: str
+    """
+    cachehome = os.path.expanduser(os.environ.get('XDG_CACHE_HOME', '~/.cache/'))
+    return os.path.join(cachehome, 'docmanager', INDEX_NAME)
+
+
+def getindex(filename):
+    """Returns the MetadataIndex for filename of the current process
+
+    SQLite connections must not be shared between processes, so every
+    worker process opens its own connection.
+
+    :param str filename: The index file
+    :return: the index
+    :rtype: MetadataIndex
+    """
+    key = (os.getpid(), filename)
+
+    if key not in _INDEXES:
+        _INDEXES[key] = MetadataIndex(filename)
+
+    return _INDEXES[key]
+
+
+class MetadataIndex(object):
+    """A MetadataIndex instance represents the on-disk index of the
+       dm:docmanager elements
+    """
+
+    def __init__(self, filename):
+        """Opens (or creates) the index
+
+        :param str filename: The index file
+        """
+        import sqlite3
+
+        self.filename = filename
+        self.__lock = threading.Lock()
+
+        dirname = os.path.dirname(filename)
+        if dirname and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+
+        # the index is just a cache, so we don't need to wait for fsync
+        self.__db = sqlite3.connect(filename, timeout=30, check_same_thread=False)
+        self.__db.execute("PRAGMA synchronous=OFF")
+
+        version = self.__db.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            log.debug("Rebuilding index %r with schema version %d", filename, SCHEMA_VERSION)
+            self.__db.execute("DROP TABLE IF EXISTS files")
+            self.__db.execute("DROP TABLE IF EXISTS properties")
+            self.__db.execute("PRAGMA user_version = {:d}".format(SCHEMA_VERSION))
+
+        for statement in _SCHEMA:
+            self.__db.execute(statement)
+        self.__db.commit()
+
+    @staticmethod
+    def key(fname):
+        """Returns the key of a file in the index
+
+        :param str fname: The file name
+        :return: absolute path
+        :rtype: str
+        """
+        return os.path.abspath(fname)
+
+    @staticmethod
+    def stat(fname):
+        """Returns size and modification time of a file
+
+        :param str fname: The file name
+        :return: (size, mtime) or None if the file does not exist
+        :rtype: tuple
+        """
+        fileutil = FileUtil(fname)
+
+        try:
+            return fileutil.get_size(), fileutil.get_mtime()
+        except OSError:
+            return None
+
+    def lookup(self, fname):
+        """Returns the stored dm:docmanager element of a file if the file
+           has not been changed since it was stored
+
+        :param str fname: The file name
+        :return: serialized dm:docmanager element or None
+        :rtype: str
+        """
+        with self.__lock:
+            row = self.__db.execute("SELECT size, mtime, docmanager FROM files "
+                                    "WHERE path = ?", (self.key(fname),)).fetchone()
+
+        if row is None or row[:2] != self.stat(fname):
+            return None
+
+        return row[2]
+
+    def store(self, fname, stat, docmanager):
+        """Stores the dm:docmanager element of a file
+
+        :param str fname: The file name
+        :param tuple stat: (size, mtime) of the file before it was parsed
+        :param docmanager: the dm:docmanager element (lxml element or str)
+        """
+        if stat is None:
+            return
+
+        from lxml import etree
+
+        if isinstance(docmanager, str):
+            docmanager = etree.fromstring(docmanager)
+
+        key = self.key(fname)
+        rows = [ (key, name, value) for name, value in self.properties(docmanager) ]
+        text = etree.tostring(docmanager, encoding='unicode', with_tail=False)
+
+        with self.__lock:
+            self.__db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                              (key, stat[0], stat[1], text))
+            self.__db.execute("DELETE FROM properties WHERE path = ?", (key,))
+            self.__db.executemany("INSERT INTO properties VALUES (?, ?, ?)", rows)
+            self.__db.commit()
+
+    @staticmethod
+    def properties(docmanager):
+        """Returns the values of all properties and their attributes
+
+        :param lxml.etree._Element docmanager: the dm:docmanager element
+        :return: generator of (name, value) pairs; the names are the paths
+                 of the properties (bugtracker/component) and of their
+                 attributes (bugtracker/component@name)
+        """
+        from docmanager.xmlutil import get_namespace, get_property_xpath, localname
+
+        for elem in docmanager.iterdescendants("{{{}}}*".format(NS['dm'])):
+            name = get_property_xpath(elem)
+            yield name, elem.text or ''
+
+            for attr, value in elem.attrib.items():
+                # namespaced attributes can't be selected by a filter
+                if not get_namespace(attr):
+                    yield "{}@{}".format(name, localname(attr)), value
+
+    def select(self, fnames, names):
+        """Returns stored values of files which have not been changed since
+           they were stored
+
+        :param list fnames: The file names
+        :param list names: The names of the values (see properties)
+        :return: { fname: { name: value } } for all files which are up to
+                 date; missing values are not in the dictionary of a file
+        :rtype: dict
+        """
+        marks = ", ".join("?" * len(names))
+
+        with self.__lock:
+            rows = self.__db.execute("SELECT path, size, mtime FROM files").fetchall()
+            values = self.__db.execute("SELECT path, name, value FROM properties "
+                                       "WHERE name IN ({}) ORDER BY rowid DESC".format(marks),
+                                       list(names)).fetchall()
+
+        indexed = { path: (size, mtime) for path, size, mtime in rows }
+        props = dict()
+
+        # if a property exists more than once, the first one wins
+        for path, name, value in values:
+            props.setdefault(path, dict())[name] = value
+
+        result = dict()
+        for fname in fnames:
+            key = self.key(fname)
+            if key in indexed and indexed[key] == self.stat(fname):
+                result[fname] = props.get(key, dict())
+
+        return result
+
+    def remove(self, fnames):
+        """Removes files from the index
+
+        :param list fnames: The file names
+        """
+        with self.__lock:
+            keys = [ (self.key(f),) for f in fnames ]
+            self.__db.executemany("DELETE FROM files WHERE path = ?", keys)
+            self.__db.executemany("DELETE FROM properties WHERE path = ?", keys)
+            self.__db.commit()
+
+    def clear(self):
+        """Removes all files from the index"""
+        log.debug("Clearing index %r", self.filename)
+
+        with self.__lock:
+            self.__db.execute("DELETE FROM files")
+            self.__db.execute("DELETE FROM properties")
+            self.__db.commit()
+            self.__db.execute("VACUUM")
+
+    def status(self, fnames=None):
+        """Checks which files of the index are still up to date
+
+        :param list fnames: The files to check (None = all indexed files)
+        :return: { "fresh": [...], "stale": [...], "missing": [...] };
+                 missing files are not in the index or don't exist anymore
+        :rtype: dict
+        """
+        with self.__lock:
+            rows = self.__db.execute("SELECT path, size, mtime FROM files").fetchall()
+
+        indexed = { path: (size, mtime) for path, size, mtime in rows }
+        if fnames is None:
+            fnames = sorted(indexed)
+
+        result = dict(fresh=list(), stale=list(), missing=list())
+
+        for fname in fnames:
+            stat = self.stat(fname)
+            entry = indexed.get(self.key(fname))
+
+            if entry is None or stat is None:
+                result["missing"].append(fname)
+            elif entry != stat:
+                result["stale"].append(fname)
+            else:
+                result["fresh"].append(fname)
+
+        return result
+
+    def __len__(self):
+        with self.__lock:
+            return self.__db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
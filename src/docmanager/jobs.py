@@ -0,0 +1,385 @@
+#
+# Copyright (c) 2015 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+"""Per-file jobs of the sub commands
+
+Every job gets an XmlHandler and some arguments and returns a small
+dictionary. Jobs and results can be pickled, so they can be executed
+in a thread or in a worker process.
+
+Jobs never write the file themselves; if the key 'modified' of the
+result is True, execute_job writes the file afterwards.
+
+lxml and the XmlHandler are imported when the first file is opened, so
+sub commands without files don't load them.
+"""
+
+import time
+from docmanager import profiler, timings
+from docmanager.exceptions import DMXmlParseError, DMInvalidXMLRootElement, \
+     DMFileNotFoundError, DMNotDocBook5File, DMPropertyNotFound
+from docmanager.index import CACHED_DOCUMENT, getindex
+from docmanager.logmanager import log
+
+# Exceptions which mark a file as invalid
+HANDLER_ERRORS = (DMXmlParseError, DMInvalidXMLRootElement,
+                  DMFileNotFoundError, DMNotDocBook5File)
+
+# Cache for read-only handlers, set by 'docmanager serve' (see
+# docmanager.server.HandlerCache)
+HANDLER_CACHE = None
+
+
+def handler_error(fname, err):
+    """Returns the result for a file which could not be parsed
+
+    :param str fname: The file name
+    :param Exception err: One of HANDLER_ERRORS
+    :return: { "file": fname, "errorstr": ..., "error": ... }
+    :rtype: dict
+    """
+    return { "file": fname, "errorstr": str(err.errorstr), "error": err.error }
+
+
+def open_handler(fname, readonly, indexfile=None):
+    """Creates the XmlHandler for a file. If an index file is given,
+       read-only handlers are created from the metadata index if the file
+       has not been changed; otherwise the index gets updated. Read-only
+       handlers are taken from HANDLER_CACHE if it is set.
+
+    :param str fname: The file name
+    :param bool readonly: Parse only the head of the file
+    :param str indexfile: The metadata index file or None
+    :return: the handler
+    :rtype: XmlHandler
+    :raise: one of HANDLER_ERRORS
+    """
+    if readonly and HANDLER_CACHE is not None:
+        return HANDLER_CACHE.get(fname, lambda: _open_handler(fname, readonly, indexfile))
+
+    return _open_handler(fname, readonly, indexfile)
+
+
+def _open_handler(fname, readonly, indexfile):
+    """Creates the XmlHandler for a file (see open_handler)"""
+    from docmanager.xmlhandler import XmlHandler
+    from lxml import etree
+
+    if not (readonly and indexfile):
+        return XmlHandler(fname, True, readonly)
+
+    index = getindex(indexfile)
+    cached = index.lookup(fname)
+
+    if cached is not None:
+        tree = etree.ElementTree(etree.fromstring(CACHED_DOCUMENT.format(cached)))
+        return XmlHandler(fname, True, True, source=tree)
+
+    stat = index.stat(fname)
+    handler = XmlHandler(fname, True, True)
+    index.store(fname, stat, handler.dm)
+
+    return handler
+
+
+def pool_options():
+    """Returns the initializer of the workers of a pool, which enables
+       --timings and --profile in worker threads and processes
+
+    :return: keyword arguments for multiprocessing.Pool or ThreadPool
+    :rtype: dict
+    """
+    return dict(initializer=init_worker,
+                initargs=(timings.ENABLED, profiler.worker_args()))
+
+
+def init_worker(timed, profiled):
+    """Initializes a worker thread or process (see pool_options)
+
+    :param bool timed: --timings is enabled
+    :param tuple profiled: see docmanager.profiler.worker_args
+    """
+    timings.init_worker(timed)
+    profiler.init_worker(profiled)
+
+
+def run_job(task):
+    """Parses a file and executes a job on it (used by worker processes)
+
+    :param tuple task: (filename, readonly, indexfile, job, jobargs)
+    :return: result of the job with the key 'file'; if the job called
+             sys.exit, the key 'exit' contains the exit code; with --timings,
+             the key 'timings' contains the phases of the file (see
+             docmanager.timings.recording)
+    :rtype: dict
+    """
+    if not timings.ENABLED:
+        return _run_job(task)
+
+    with timings.recording() as phases:
+        result = _run_job(task)
+
+    result["timings"] = phases
+    return result
+
+
+def _run_job(task):
+    """Parses a file and executes a job on it (see run_job)"""
+    fname, readonly, indexfile, job, jobargs = task
+
+    try:
+        handler = open_handler(fname, readonly, indexfile)
+    except HANDLER_ERRORS as err:
+        return handler_error(fname, err)
+
+    try:
+        result = execute_job(handler, job, jobargs)
+    except SystemExit as err:
+        # a worker cannot leave the program, the main process has to do it
+        return { "file": fname, "exit": err.code }
+    finally:
+        # only the result is kept; cached handlers are used again
+        if not (readonly and HANDLER_CACHE is not None):
+            handler.release()
+
+    result["file"] = fname
+    return result
+
+
+def execute_job(handler, job, jobargs):
+    """Executes a job and writes the file if the job modified it
+
+    :param XmlHandler handler: The XML handler
+    :param function job: The job
+    :param tuple jobargs: Further arguments for the job
+    :return: result of the job without the key 'modified'; if the file
+             had to be written, the key 'written' is False for files which
+             were unchanged and 'write_time' contains the time of the write
+             in seconds
+    :rtype: dict
+    """
+    with timings.phase("job"):
+        result = job(handler, *jobargs)
+
+    if result.pop("modified", False):
+        start = time.perf_counter()
+        with timings.phase("write"):
+            result["written"] = handler.write()
+        result["write_time"] = time.perf_counter() - start
+
+        log.info("%s %r in %.1f ms.", "Wrote" if result["written"] else "Skipped unchanged",
+                 handler.filename, result["write_time"] * 1000)
+
+    return result
+
+
+def job_validate(handler): # pylint:disable=unused-argument
+    """Does nothing; the file was already parsed, so it is valid (used to
+       check all files before the first one is written, see --stop-on-error)
+
+    :param XmlHandler handler: The XML handler
+    :return: {}
+    :rtype: dict
+    """
+    return dict()
+
+
+def job_batch(handler, commands):
+    """Executes the jobs of several sub commands on the same handler; the
+       file is written at most once, after all jobs are done
+
+    :param XmlHandler handler: The XML handler
+    :param list commands: List of (job, jobargs) pairs
+    :return: { "results": [result of every job], "modified": bool }
+    :rtype: dict
+    """
+    results = list()
+    modified = False
+
+    for job, jobargs in commands:
+        result = job(handler, *jobargs)
+        modified = result.pop("modified", False) or modified
+        results.append(result)
+
+    return { "results": results, "modified": modified }
+
+
+def job_init(handler, force, bugtracker, defaults, btdefaults):
+    """Initializes the predefined properties of a file and writes it
+
+    :param XmlHandler handler: The XML handler
+    :param bool force: Overwrite already set properties
+    :param bool bugtracker: Add the bugtracker properties
+    :param list defaults: List of (property, value) pairs which are set if
+                          the property is empty (or force is set)
+    :param list btdefaults: List of (property, value) pairs of the bugtracker
+    :return: { "initialized": bool, "modified": True }
+    :rtype: dict
+    """
+    initialized = handler.init_default_props(force, bugtracker) == 0
+
+    # set default values for the given properties
+    for prop, value in defaults:
+        ret = handler.get(prop)
+        if len(ret[prop]) == 0 or force:
+            handler.set({ prop: str(value) })
+
+    # if bugtracker options are provided, set default values
+    for prop, value in btdefaults:
+        handler.set({ prop: value })
+
+    return { "initialized": initialized, "modified": True }
+
+
+def job_set(handler, pairs):
+    """Sets properties
+
+    :param XmlHandler handler: The XML handler
+    :param list pairs: List of (property, value) pairs
+    :return: { "modified": True }
+    :rtype: dict
+    """
+    for key, value in pairs:
+        handler.set({ key: value })
+
+    return { "modified": True }
+
+
+def job_set_attr(handler, prop, data):
+    """Sets attributes of a property
+
+    :param XmlHandler handler: The XML handler
+    :param str prop: The property
+    :param dict data: A dictionary of attributes and values
+    :return: { "notfound": bool, "modified": bool }
+    :rtype: dict
+    """
+    try:
+        handler.set_attr(prop, data)
+    except DMPropertyNotFound:
+        return { "notfound": True, "modified": False }
+
+    return { "notfound": False, "modified": True }
+
+
+def job_del_attr(handler, prop, attrs):
+    """Deletes attributes of a property
+
+    :param XmlHandler handler: The XML handler
+    :param str prop: The property
+    :param list attrs: A list of all attributes
+    :return: { "notfound": bool, "errors": [attributes which couldn't be deleted],
+               "modified": bool }
+    :rtype: dict
+    """
+    try:
+        errors = handler.del_attr(prop, attrs)
+    except DMPropertyNotFound:
+        return { "notfound": True, "errors": [], "modified": False }
+
+    return { "notfound": False, "errors": errors, "modified": True }
+
+
+def job_get_attr(handler, props, attrs):
+    """Gets attributes of properties
+
+    :param XmlHandler handler: The XML handler
+    :param list props: The properties
+    :param list attrs: A list of all attributes
+    :return: { "data": OrderedDict }
+    :rtype: dict
+    """
+    return { "data": handler.get_attr(props, attrs) }
+
+
+def job_get(handler, props):
+    """Gets properties
+
+    :param XmlHandler handler: The XML handler
+    :param list props: The properties
+    :return: { "data": OrderedDict }
+    :rtype: dict
+    """
+    return { "data": handler.get(props) }
+
+
+def job_delete(handler, arguments):
+    """Deletes properties
+
+    :param XmlHandler handler: The XML handler
+    :param list arguments: properties, optionally with a condition (prop=value)
+    :return: { "deleted": int, "failed": [arguments which failed], "modified": True }
+    :rtype: dict
+    """
+    deleted = 0
+    failed = list()
+
+    for arg in arguments:
+        cond = None
+        prop = arg
+        pos = arg.find("=")
+
+        # look if there is condition
+        if pos != -1:
+            prop = arg[:pos]
+            cond = arg[pos+1:]
+
+        if not handler.delete(prop, cond):
+            failed.append(arg)
+        else:
+            deleted += 1
+
+    return { "deleted": deleted, "failed": failed, "modified": True }
+
+
+def job_index(handler, indexfile):
+    """Stores the dm:docmanager element of a file in the metadata index
+
+    :param XmlHandler handler: The XML handler
+    :param str indexfile: The metadata index file
+    :return: {}
+    :rtype: dict
+    """
+    index = getindex(indexfile)
+    index.store(handler.filename, index.stat(handler.filename), handler.dm)
+
+    return {}
+
+
+def job_analyze(handler, queryformat, query):
+    """Analyzes a file
+
+    :param XmlHandler handler: The XML handler
+    :param QueryFormat queryformat: The compiled query format
+    :param AnalyzeQuery query: The requested properties and the filters
+    :return: { "line": formatted output or None, "data": fetched data }
+    :rtype: dict
+    """
+    from docmanager.analyzer import Analyzer
+
+    analyzer = Analyzer(handler)
+    data = analyzer.fetch_data(query)
+
+    # If we have no data, we assume that the user didn't want to see any data
+    # from the XML files and he just want to see the output of the constants
+    # like {os.file} - https://github.com/openSUSE/docmanager/issues/93
+    line = None
+    if data or analyzer.filters_matched:
+        line = queryformat.render(handler, data)
+
+    return { "line": line, "data": data }
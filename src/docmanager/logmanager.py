@@ -17,9 +17,8 @@
 # you may find current contact information at www.suse.com
 
 import logging
-import os
 import sys
-import traceback
+import threading
 
 # TODO: Output a different format depending on logging level
 # See http://stackoverflow.com/questions/1343227/can-pythons-logging-format-be-modified-depending-on-the-message-log-level
@@ -34,20 +33,81 @@ log.addHandler(_ch)
 
 LOGLEVELS = {None: logging.NOTSET, 0: logging.NOTSET, 1: logging.INFO, 2: logging.DEBUG}
 
-def logmgr_flog():
-    """Prints debug information about the last called function.
+# Modules whose function calls are logged (see logmgr_trace);
+# 'docmanager' stands for all modules of the package
+_traced = set()
+_profiling = False
+
+
+def _flog(frame, event, arg): # pylint:disable=unused-argument
+    """Profile function which logs the calls of functions in the traced
+       modules
+    """
+    if event == 'call':
+        name = frame.f_globals.get('__name__', '')
+        if name in _traced or name.partition('.')[0] in _traced:
+            code = frame.f_code
+            log.debug('Called function "%s" in file %s (line: %d).',
+                      code.co_name, code.co_filename, code.co_firstlineno)
+
+
+def _installprofile():
+    """Installs the profile function if it's needed, otherwise removes it.
+       Without traced modules or below debug level, tracing costs nothing.
     """
-    if log.getEffectiveLevel() <= logging.DEBUG:
-      stack = traceback.extract_stack()
-      filename, line, func, _ = stack[-2]
+    global _profiling # pylint:disable=global-statement
+
+    needed = bool(_traced) and log.getEffectiveLevel() <= logging.DEBUG
+
+    # don't touch profile functions of others
+    if needed != _profiling:
+        func = _flog if needed else None
+        sys.setprofile(func)
+        threading.setprofile(func)
+        _profiling = needed
+
+
+def logmgr_trace(modules):
+    """Logs every call of a function in the given modules at debug level
+
+    :param list modules: module names, like 'docmanager.xmlhandler' or
+                         just 'xmlhandler'; 'all' traces every module
+                         of docmanager; an empty list disables tracing
+    """
+    _traced.clear()
+
+    for name in modules:
+        if name == "all":
+            name = "docmanager"
+        elif not name.startswith("docmanager"):
+            name = "docmanager." + name
+
+        _traced.add(name)
+
+    _installprofile()
+
+
+def setlogstream(stream):
+    """Sets the stream of the log messages
+
+    :param stream: file-like object
+    :return: the previous stream
+    """
+    # StreamHandler.setStream needs Python 3.7
+    _ch.acquire()
+    try:
+        _ch.flush()
+        previous, _ch.stream = _ch.stream, stream
+    finally:
+        _ch.release()
+
+    return previous
 
-      log.debug('Called function "%s" in file %s/%s (line: %d).',
-                func, os.getcwd(), os.path.basename(filename), line
-               )
 
 def setloglevel(verbose):
     """Set log level according to verbose argument
 
     :param int verbose: verbose level to set
     """
-    log.setLevel(LOGLEVELS.get(verbose, logging.DEBUG))
\ No newline at end of file
+    log.setLevel(LOGLEVELS.get(verbose, logging.DEBUG))
+    _installprofile()
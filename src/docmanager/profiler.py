@@ -0,0 +1,186 @@
+#
+# Copyright (c) 2015 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+
+"""cProfile for the main thread and all workers (see --profile)
+
+cProfile only sees the thread in which it was enabled, so every worker
+thread and every worker process gets its own profiler through the
+initializer of its pool (see init_worker). The profilers of the threads
+are collected in the main process; worker processes write their stats
+into a temporary directory when they exit. stop() merges all of them
+into one pstats file.
+"""
+
+import os
+import sys
+import threading
+
+# the profiler of the current run (see start)
+_PROFILER = None
+
+
+class Profiler(object):
+    """A Profiler instance profiles the main thread and collects the
+       profilers of the workers
+    """
+
+    def __init__(self, filename):
+        """Starts the profiler of the main thread
+
+        :param str filename: The pstats file
+        """
+        import cProfile
+        import tempfile
+
+        self.filename = filename
+        self.pid = os.getpid()
+        self.workerdir = tempfile.mkdtemp(prefix="docmanager-profile-")
+        self.threads = list()
+        self.__lock = threading.Lock()
+
+        self.main = cProfile.Profile()
+        self.main.enable()
+
+    def add_thread(self, profile):
+        """Adds the profiler of a worker thread
+
+        :param cProfile.Profile profile: The profiler
+        """
+        with self.__lock:
+            self.threads.append(profile)
+
+    def stop(self, top, stream=None):
+        """Stops the profiler, merges the stats of all workers, writes them
+           to the pstats file and prints a summary
+
+        :param int top: The number of functions in the summary
+        :param stream: The output stream of the summary (None = sys.stderr)
+        :return: the merged stats
+        :rtype: pstats.Stats
+        """
+        import pstats
+        import shutil
+
+        self.main.disable()
+        stream = stream or sys.stderr
+
+        try:
+            stats = pstats.Stats(self.main, stream=stream)
+
+            with self.__lock:
+                profiles = list(self.threads)
+
+            for profile in profiles:
+                profile.disable()
+                stats.add(profile)
+
+            workers = sorted(os.listdir(self.workerdir))
+            for name in workers:
+                stats.add(os.path.join(self.workerdir, name))
+        finally:
+            shutil.rmtree(self.workerdir, ignore_errors=True)
+
+        # the summary would list the temporary files of the worker processes
+        stats.files = list()
+        stats.dump_stats(self.filename)
+
+        stream.write("Profile of the main thread, {} worker thread(s), and {} worker "
+                     "process(es) written to {!r}.\n".format(len(profiles), len(workers),
+                                                             self.filename))
+        stats.sort_stats("cumulative").print_stats(top)
+
+        return stats
+
+
+def start(filename):
+    """Starts profiling the current run
+
+    :param str filename: The pstats file
+    """
+    global _PROFILER
+    _PROFILER = Profiler(filename)
+
+
+def stop(top):
+    """Stops profiling (see Profiler.stop)
+
+    :param int top: The number of functions in the summary
+    :return: the merged stats or None if no profiler is running
+    :rtype: pstats.Stats
+    """
+    global _PROFILER
+
+    profiler, _PROFILER = _PROFILER, None
+    if profiler is None:
+        return None
+
+    return profiler.stop(top)
+
+
+def active():
+    """Returns True if the current run is profiled"""
+    return _PROFILER is not None
+
+
+def worker_args():
+    """Returns the argument of init_worker for the pools of the current run
+
+    :return: (pid of the main process, directory of the stats of the worker
+             processes) or None if the run is not profiled
+    :rtype: tuple
+    """
+    if _PROFILER is None:
+        return None
+
+    return (_PROFILER.pid, _PROFILER.workerdir)
+
+
+def init_worker(args):
+    """Starts the profiler of a worker thread or process (initializer of
+       the pool)
+
+    :param tuple args: see worker_args
+    """
+    if args is None:
+        return
+
+    import cProfile
+
+    pid, workerdir = args
+    profile = cProfile.Profile()
+
+    try:
+        profile.enable()
+    except ValueError:
+        # Python 3.12+ allows only one active profiler, which sees all threads
+        return
+
+    if os.getpid() == pid:
+        _PROFILER.add_thread(profile)
+        return
+
+    # the stats of a worker process are written when it exits (the pool
+    # has to be closed and joined, see docmanager.action.Actions.run_jobs)
+    from multiprocessing.util import Finalize
+
+    def dump():
+        profile.disable()
+        profile.dump_stats(os.path.join(workerdir, "worker-{}.pstats".format(os.getpid())))
+
+    Finalize(None, dump, exitpriority=100)
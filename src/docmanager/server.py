@@ -0,0 +1,262 @@
+#
+# Copyright (c) 2015 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+
+"""The 'docmanager serve' daemon
+
+The server listens on a Unix domain socket (see docmanager.client) and runs
+the forwarded command lines in its own process. Read-only handlers are kept
+in a HandlerCache, so repeated get, get-attr, and analyze requests don't
+parse unchanged files again. A cached handler is dropped as soon as the
+size or the modification time of its file changes.
+
+Requests are executed one after another; every request may still use
+several threads or worker processes (see --jobs and --executor).
+"""
+
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import traceback
+from collections import OrderedDict
+from contextlib import contextmanager
+from docmanager.client import recv_message
+from docmanager.core import ReturnCodes, SERVER_CACHE_SIZE
+from docmanager.index import MetadataIndex
+from docmanager.logmanager import log, setlogstream
+
+
+@contextmanager
+def redirect(name, stream):
+    """Replaces sys.stdout or sys.stderr in a block (like
+       contextlib.redirect_stdout, which needs Python 3.4, and
+       redirect_stderr, which needs Python 3.5)
+
+    :param str name: 'stdout' or 'stderr'
+    :param stream: file-like object
+    """
+    previous = getattr(sys, name)
+    setattr(sys, name, stream)
+
+    try:
+        yield stream
+    finally:
+        setattr(sys, name, previous)
+
+
+class HandlerCache(object):
+    """A least recently used cache of read-only XmlHandlers which are
+       validated by the size and the modification time of their files
+    """
+
+    def __init__(self, maxsize=SERVER_CACHE_SIZE):
+        """Initializes the cache
+
+        :param int maxsize: The maximum number of cached handlers
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, fname, loader):
+        """Returns the cached handler of a file or creates it
+
+        :param str fname: The file name
+        :param function loader: Creates the handler if the cache is outdated
+        :return: the handler
+        :rtype: XmlHandler
+        """
+        key = MetadataIndex.key(fname)
+        stat = MetadataIndex.stat(fname)
+
+        with self.__lock:
+            entry = self.__entries.get(key)
+
+            if entry is not None and entry[0] == stat:
+                self.__entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            self.misses += 1
+
+        # parse outside of the lock, so other threads can use the cache
+        handler = loader()
+
+        with self.__lock:
+            self.__entries[key] = (stat, handler)
+            self.__entries.move_to_end(key)
+
+            while len(self.__entries) > self.maxsize:
+                self.__entries.popitem(last=False)
+
+        return handler
+
+    def clear(self):
+        """Removes all handlers"""
+        with self.__lock:
+            self.__entries.clear()
+
+    def __len__(self):
+        return len(self.__entries)
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """Reads a request, executes it, and sends the response"""
+
+    def handle(self):
+        try:
+            request = recv_message(self.request)
+        except ValueError as err:
+            log.error("Invalid request: %s", err)
+            return
+
+        # is_listening connects without sending a request
+        if request is None:
+            return
+
+        response = self.server.execute(request)
+        self.request.sendall(json.dumps(response).encode("utf-8"))
+
+
+class DocManagerServer(socketserver.UnixStreamServer):
+    """A DocManagerServer instance answers the requests of docmanager.client"""
+
+    def __init__(self, socketfile, runner):
+        """Binds the socket file
+
+        :param str socketfile: The socket file
+        :param function runner: Runs a command line, like docmanager.run
+        :raise: OSError if another server is already listening
+        """
+        self.socketfile = socketfile
+        self.runner = runner
+
+        dirname = os.path.dirname(socketfile)
+        if dirname and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+
+        if os.path.exists(socketfile):
+            if is_listening(socketfile):
+                raise OSError("A server is already listening on {!r}".format(socketfile))
+
+            # a server which was killed leaves its socket file behind
+            os.remove(socketfile)
+
+        super().__init__(socketfile, RequestHandler)
+        os.chmod(socketfile, 0o600)
+
+    def execute(self, request):
+        """Runs a command line in the working directory of the client
+
+        :param dict request: { "argv": [...], "cwd": "..." }
+        :return: { "stdout": "...", "stderr": "...", "exitcode": int }
+        :rtype: dict
+        """
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        exitcode = ReturnCodes.E_OK
+        cwd = os.getcwd()
+        logstream = setlogstream(stderr)
+
+        try:
+            os.chdir(request["cwd"])
+
+            with redirect('stdout', stdout), redirect('stderr', stderr):
+                try:
+                    self.runner(request["argv"])
+                except SystemExit as err:
+                    exitcode = err.code
+                except Exception: # pylint:disable=broad-except
+                    traceback.print_exc()
+                    exitcode = ReturnCodes.E_SERVER_ERROR
+        except OSError as err:
+            stderr.write("Could not change to directory {!r}: {}\n".format(
+                         request["cwd"], err.strerror))
+            exitcode = ReturnCodes.E_FILE_NOT_FOUND
+        finally:
+            os.chdir(cwd)
+            setlogstream(logstream)
+
+        # sys.exit() without an argument or with a message
+        if exitcode is None:
+            exitcode = ReturnCodes.E_OK
+        elif not isinstance(exitcode, int):
+            stderr.write("{}\n".format(exitcode))
+            exitcode = ReturnCodes.E_SERVER_ERROR
+
+        return { "stdout": stdout.getvalue(), "stderr": stderr.getvalue(),
+                 "exitcode": exitcode }
+
+    def server_close(self):
+        super().server_close()
+
+        try:
+            os.remove(self.socketfile)
+        except FileNotFoundError:
+            pass
+
+
+def is_listening(socketfile):
+    """Checks if a server is listening on a socket file
+
+    :param str socketfile: The socket file
+    :return: True if the connection was accepted
+    :rtype: bool
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socketfile)
+        except OSError:
+            return False
+
+    return True
+
+
+def serve(socketfile, runner):
+    """Runs the server until it gets SIGINT or SIGTERM
+
+    :param str socketfile: The socket file
+    :param function runner: Runs a command line, like docmanager.run
+    """
+    server = DocManagerServer(socketfile, runner)
+
+    def terminate(signum, frame): # pylint:disable=unused-argument
+        sys.exit(ReturnCodes.E_OK)
+
+    # signal handlers can only be installed by the main thread
+    # (threading.main_thread needs Python 3.4)
+    try:
+        signal.signal(signal.SIGTERM, terminate)
+    except ValueError:
+        pass
+
+    log.info("Listening on %r", socketfile)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
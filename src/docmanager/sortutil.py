@@ -0,0 +1,284 @@
+#
+# Copyright (c) 2015 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+"""Streaming sort, top-N, and grouping of the analyze results
+
+ExternalSort is an external merge sort for (key, line) records. Records
+are collected in a buffer. A full buffer is sorted and written as a
+"run" to a temporary file; at the end, all runs are merged. Only one
+buffer plus one record per run are kept in memory.
+
+TopN keeps only the first N records in a heap, and GroupBy keeps one
+row of aggregates per group.
+
+The keys are built by sortkey once per record, so numbers are sorted as
+numbers and numbers and text can be compared with each other.
+"""
+
+import heapq
+import pickle
+import re
+import tempfile
+from docmanager.core import SORT_BUFFER_SIZE
+from operator import itemgetter
+
+_recordkey = itemgetter(0)
+
+NUMBER = re.compile(r"[+-]?[0-9]+(?:\.[0-9]+)?\Z")
+
+
+def sortkey(value):
+    """Returns the typed sort key of a value; numbers are sorted before
+       text and by their numerical value
+
+    :param str value: The value
+    :return: (0, number, '') for numbers, (1, 0, value) for text
+    :rtype: tuple
+    """
+    if NUMBER.match(value):
+        return (0, float(value), '')
+
+    return (1, 0, value)
+
+
+def _readrun(fileobj):
+    """Yields all records of a run
+
+    :param fileobj: The temporary file of the run
+    """
+    fileobj.seek(0)
+
+    try:
+        while True:
+            yield pickle.load(fileobj)
+    except EOFError:
+        pass
+    finally:
+        fileobj.close()
+
+
+class _Descending(object):
+    """A sort key in descending order (heapq.merge has no reverse
+       argument before Python 3.5)
+    """
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+
+def _decorate(records, index, reverse):
+    """Yields (key, index, record) for every record of a run, so the runs
+       can be merged without the key argument of heapq.merge (Python 3.5);
+       the index of the run keeps the merge stable
+
+    :param records: The records of the run
+    :param int index: The index of the run
+    :param bool reverse: The run is sorted in descending order
+    """
+    for record in records:
+        yield (_Descending(record[0]) if reverse else record[0]), index, record
+
+
+class ExternalSort(object):
+    """An ExternalSort instance sorts (key, line) records with a bounded
+       amount of memory. The sort is stable.
+    """
+
+    def __init__(self, buffersize=SORT_BUFFER_SIZE, reverse=False):
+        """Initializes the ExternalSort class
+
+        :param int buffersize: The amount of records which are kept in
+                               memory before they are written to a run
+        :param bool reverse: Sort in descending order
+        """
+        self.buffersize = max(1, buffersize)
+        self.reverse = reverse
+        self.__buffer = list()
+        self.__runs = list()
+
+    def add(self, key, line):
+        """Adds a record
+
+        :param key: The sort key
+        :param str line: The output line
+        """
+        self.__buffer.append((key, line))
+
+        if len(self.__buffer) >= self.buffersize:
+            self.__spill()
+
+    def __spill(self):
+        """Sorts the buffer and writes it to a temporary file"""
+        self.__buffer.sort(key=_recordkey, reverse=self.reverse)
+
+        run = tempfile.TemporaryFile()
+        for record in self.__buffer:
+            pickle.dump(record, run, pickle.HIGHEST_PROTOCOL)
+
+        self.__runs.append(run)
+        self.__buffer = list()
+
+    def __len__(self):
+        return len(self.__buffer) + self.buffersize * len(self.__runs)
+
+    def __iter__(self):
+        """Yields all records sorted by key; the temporary files are
+           removed afterwards
+        """
+        self.__buffer.sort(key=_recordkey, reverse=self.reverse)
+
+        if not self.__runs:
+            yield from self.__buffer
+        else:
+            # the runs were created first, so their index keeps the sort stable
+            runs = [ _readrun(run) for run in self.__runs ] + [ self.__buffer ]
+            runs = [ _decorate(run, i, self.reverse) for i, run in enumerate(runs) ]
+
+            for _, _, record in heapq.merge(*runs):
+                yield record
+
+        self.__buffer = list()
+        self.__runs = list()
+
+
+class _HeapEntry(object):
+    """An entry of the TopN heap; the root of the heap is the record which
+       would be dropped first
+    """
+    __slots__ = ("key", "seq", "line", "reverse")
+
+    def __init__(self, key, seq, line, reverse):
+        self.key = key
+        self.seq = seq
+        self.line = line
+        self.reverse = reverse
+
+    def __lt__(self, other):
+        if self.key != other.key:
+            return (self.key < other.key) if self.reverse else (self.key > other.key)
+
+        # records which were added later are dropped first
+        return self.seq > other.seq
+
+
+class TopN(object):
+    """A TopN instance keeps the first N (key, line) records of a stable
+       sort; at most N records are kept in memory.
+    """
+
+    def __init__(self, limit, reverse=False):
+        """Initializes the TopN class
+
+        :param int limit: The amount of records which are kept
+        :param bool reverse: Keep the records with the highest keys
+        """
+        self.limit = limit
+        self.reverse = reverse
+        self.__heap = list()
+        self.__seq = 0
+
+    def add(self, key, line):
+        """Adds a record
+
+        :param key: The sort key
+        :param str line: The output line
+        """
+        entry = _HeapEntry(key, self.__seq, line, self.reverse)
+        self.__seq += 1
+
+        if len(self.__heap) < self.limit:
+            heapq.heappush(self.__heap, entry)
+        elif self.__heap and self.__heap[0] < entry:
+            # the new record sorts before the worst kept record
+            heapq.heapreplace(self.__heap, entry)
+
+    def __len__(self):
+        return len(self.__heap)
+
+    def __iter__(self):
+        """Yields the kept records sorted by key"""
+        entries = sorted(self.__heap, key=lambda e: e.seq)
+        entries.sort(key=lambda e: e.key, reverse=self.reverse)
+
+        for entry in entries:
+            yield entry.key, entry.line
+
+
+class GroupBy(object):
+    """A GroupBy instance computes aggregates of the rows of every group
+       without keeping the rows
+    """
+
+    def __init__(self, aggregates):
+        """Initializes the GroupBy class
+
+        :param list aggregates: List of (function, property) pairs; the
+                                function is one of core.AGGREGATES, the property
+                                is None for count
+        """
+        self.aggregates = aggregates
+        self.groups = dict()
+
+    def add(self, group, data):
+        """Adds a row
+
+        :param str group: The value of the group property
+        :param dict data: The values of the properties of the row
+        """
+        state = self.groups.get(group)
+        if state is None:
+            state = self.groups[group] = [None] * len(self.aggregates)
+
+        for idx, (func, prop) in enumerate(self.aggregates):
+            if func == "count":
+                state[idx] = (state[idx] or 0) + 1
+                continue
+
+            # empty properties are ignored by min and max
+            value = data.get(prop)
+            if not value:
+                continue
+
+            key = sortkey(value)
+            if state[idx] is None or \
+               (func == "min" and key < state[idx][0]) or \
+               (func == "max" and key > state[idx][0]):
+                state[idx] = (key, value)
+
+    def __len__(self):
+        return len(self.groups)
+
+    def __iter__(self):
+        """Yields (group, [values of the aggregates]) in no particular
+           order; min and max are '' if no row had a value
+        """
+        for group, state in self.groups.items():
+            values = list()
+            for (func, _), item in zip(self.aggregates, state):
+                if func == "count":
+                    values.append(item)
+                else:
+                    values.append('' if item is None else item[1])
+            yield group, values
@@ -0,0 +1,351 @@
+#
+# Copyright (c) 2015 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+
+"""Wall and CPU time of the phases of a run (see --timings)
+
+A phase is measured with the phase() context manager. Nested phases are
+subtracted from the enclosing phase, so the times of all phases add up
+to the time of the run.
+
+The phases of a file are recorded while its job runs (see recording and
+docmanager.jobs.run_job); the job returns them with its result, so they
+also work with worker processes. All other phases are recorded in the
+main thread. If the timings are not enabled, phase() does nothing.
+"""
+
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# True if the phases are measured (see enable)
+ENABLED = False
+
+# CPU time of the current thread; CPU time of the process on older Pythons
+_cputime = getattr(time, "thread_time", time.process_time)
+
+# the recording of the current thread
+_LOCAL = threading.local()
+
+
+class Recording(object):
+    """A Recording instance collects the wall and CPU time of the phases
+       of a file or of the main thread
+    """
+
+    __slots__ = ("phases", "_stack")
+
+    def __init__(self):
+        # { phase: [wall, cpu] } in seconds
+        self.phases = dict()
+
+        # [wall, cpu] of the nested phases of every running phase
+        self._stack = list()
+
+    def add(self, name, wall, cpu):
+        """Adds the time of a phase
+
+        :param str name: The name of the phase
+        :param float wall: Wall time in seconds
+        :param float cpu: CPU time in seconds
+        """
+        entry = self.phases.setdefault(name, [0.0, 0.0])
+        entry[0] += wall
+        entry[1] += cpu
+
+
+class Timings(object):
+    """A Timings instance collects all phases of a run in the main process
+       and summarizes them
+    """
+
+    def __init__(self):
+        self.start = (time.perf_counter(), time.process_time())
+        self.main = Recording()
+
+        # { fname: { phase: [wall, cpu] } }, the phase 'total' contains the
+        # complete time of the file
+        self.files = dict()
+
+    def add_file(self, fname, phases):
+        """Adds the phases of a file (see recording)
+
+        :param str fname: The file name
+        :param dict phases: { phase: [wall, cpu] }
+        """
+        entry = self.files.setdefault(fname, dict())
+
+        for name, (wall, cpu) in phases.items():
+            times = entry.setdefault(name, [0.0, 0.0])
+            times[0] += wall
+            times[1] += cpu
+
+    def summary(self, slowest):
+        """Summarizes the phases
+
+        :param int slowest: The number of the slowest files
+        :return: { "wall": float, "cpu": float,
+                   "phases": [ { "phase", "count", "wall", "cpu", "p50", "p95", "max" } ],
+                   "slowest": [ { "file", "wall", "cpu",
+                                  "phases": { phase: { "wall", "cpu" } } } ] };
+                 the times are in seconds, p50/p95/max are wall times of the files
+        :rtype: dict
+        """
+        phases = list()
+        names = list(self.main.phases)
+
+        for phases_of_file in self.files.values():
+            names.extend(name for name in phases_of_file if name not in names)
+
+        # the complete time of the files after their phases
+        for name in ("other", "total"):
+            if name in names:
+                names.remove(name)
+                names.append(name)
+
+        for name in names:
+            times = [ f[name] for f in self.files.values() if name in f ]
+            if name in self.main.phases:
+                times.append(self.main.phases[name])
+
+            walls = sorted(t[0] for t in times)
+            phases.append({ "phase": name,
+                            "count": len(times),
+                            "wall": sum(walls),
+                            "cpu": sum(t[1] for t in times),
+                            "p50": percentile(walls, 50),
+                            "p95": percentile(walls, 95),
+                            "max": walls[-1] })
+
+        files = sorted(self.files.items(), key=lambda item: -item[1]["total"][0])
+
+        return { "wall": time.perf_counter() - self.start[0],
+                 "cpu": time.process_time() - self.start[1],
+                 "phases": phases,
+                 "slowest": [ { "file": fname,
+                                "wall": phases["total"][0],
+                                "cpu": phases["total"][1],
+                                "phases": { name: { "wall": wall, "cpu": cpu }
+                                            for name, (wall, cpu) in phases.items()
+                                            if name != "total" } }
+                              for fname, phases in files[:slowest] ] }
+
+
+# the timings of the current run (see enable)
+_TIMINGS = None
+
+
+def percentile(values, percent):
+    """Returns a percentile with the nearest-rank method
+
+    :param list values: The sorted values
+    :param int percent: The percentile
+    :return: the value
+    :rtype: float
+    """
+    rank = -(-len(values) * percent // 100)
+    return values[max(rank, 1) - 1]
+
+
+def enable(start=None):
+    """Enables the timings for the current run; the phases of the main
+       thread are recorded from now on
+
+    :param tuple start: (wall, cpu) of the start of the run as returned by
+                        time.perf_counter and time.process_time (None = now)
+    """
+    global ENABLED, _TIMINGS
+
+    ENABLED = True
+    _TIMINGS = Timings()
+    _LOCAL.recording = _TIMINGS.main
+
+    if start is not None:
+        _TIMINGS.start = start
+
+
+def disable():
+    """Disables the timings and drops the recorded phases
+
+    :return: the timings of the run or None
+    :rtype: Timings
+    """
+    global ENABLED, _TIMINGS
+
+    timings, _TIMINGS = _TIMINGS, None
+    ENABLED = False
+    _LOCAL.recording = None
+
+    return timings
+
+
+def add(name, wall, cpu):
+    """Adds the time of a phase of the main thread which could not be
+       measured with phase()
+
+    :param str name: The name of the phase
+    :param float wall: Wall time in seconds
+    :param float cpu: CPU time in seconds
+    """
+    if _TIMINGS is not None:
+        _TIMINGS.main.add(name, wall, cpu)
+
+
+def init_worker(enabled):
+    """Enables the timings in a worker process (initializer of the pool)
+
+    :param bool enabled: The timings are enabled in the main process
+    """
+    global ENABLED
+    ENABLED = enabled
+
+
+def add_file(fname, phases):
+    """Adds the phases of a file to the timings of the run
+
+    :param str fname: The file name
+    :param dict phases: { phase: [wall, cpu] }
+    """
+    if _TIMINGS is not None:
+        _TIMINGS.add_file(fname, phases)
+
+
+@contextmanager
+def recording():
+    """Records the phases of a file in the current thread
+
+    :return: context manager which returns the phases ({ phase: [wall, cpu] });
+             they are complete after the block, the phase 'total' contains
+             the time of the whole block, 'other' the time which is not
+             part of another phase (like imports and index lookups)
+    """
+    if not ENABLED:
+        yield dict()
+        return
+
+    previous = getattr(_LOCAL, "recording", None)
+    record = _LOCAL.recording = Recording()
+
+    try:
+        with phase("other"):
+            yield record.phases
+    finally:
+        _LOCAL.recording = previous
+
+        total = [0.0, 0.0]
+        for wall, cpu in record.phases.values():
+            total[0] += wall
+            total[1] += cpu
+
+        record.phases["total"] = total
+
+
+class _Phase(object):
+    """Context manager of a measured phase (see phase)"""
+
+    __slots__ = ("name", "record", "nested", "wall", "cpu")
+
+    def __init__(self, name, record):
+        self.name = name
+        self.record = record
+
+    def __enter__(self):
+        self.nested = [0.0, 0.0]
+        self.record._stack.append(self.nested)
+        self.wall, self.cpu = time.perf_counter(), _cputime()
+
+    def __exit__(self, *exc):
+        wall, cpu = time.perf_counter() - self.wall, _cputime() - self.cpu
+        stack = self.record._stack
+        stack.pop()
+
+        if stack:
+            parent = stack[-1]
+            parent[0] += wall
+            parent[1] += cpu
+
+        self.record.add(self.name, wall - self.nested[0], cpu - self.nested[1])
+
+
+class _NoPhase(object):
+    """Context manager of a phase which is not measured"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NO_PHASE = _NoPhase()
+
+
+def phase(name):
+    """Measures a phase of the current recording; does nothing if the
+       timings are disabled or the current thread has no recording
+
+    :param str name: The name of the phase
+    :return: context manager
+    """
+    if not ENABLED:
+        return _NO_PHASE
+
+    record = getattr(_LOCAL, "recording", None)
+    if record is None:
+        return _NO_PHASE
+
+    return _Phase(name, record)
+
+
+def report(timings, fmt, slowest, stream=None):
+    """Prints the summary of the timings
+
+    :param Timings timings: The timings of the run
+    :param str fmt: 'text' or 'json'
+    :param int slowest: The number of the slowest files
+    :param stream: The output stream (None = sys.stderr)
+    """
+    stream = stream or sys.stderr
+    summary = timings.summary(slowest)
+
+    if fmt == "json":
+        import json
+        stream.write(json.dumps(summary, indent=2) + "\n")
+        return
+
+    ms = lambda value: "{:.1f}".format(value * 1000)
+    lines = [ "Timings (ms): wall {}, CPU {}".format(ms(summary["wall"]), ms(summary["cpu"])),
+              "{:<12} {:>6} {:>10} {:>10} {:>9} {:>9} {:>9}".format(
+                  "phase", "count", "wall", "cpu", "p50", "p95", "max") ]
+
+    for p in summary["phases"]:
+        lines.append("{:<12} {:>6} {:>10} {:>10} {:>9} {:>9} {:>9}".format(
+                     p["phase"], p["count"], ms(p["wall"]), ms(p["cpu"]),
+                     ms(p["p50"]), ms(p["p95"]), ms(p["max"])))
+
+    if summary["slowest"]:
+        lines.append("Slowest files (ms):")
+        lines.append("{:>10} {:>10}  {}".format("wall", "cpu", "file"))
+
+        for f in summary["slowest"]:
+            lines.append("{:>10} {:>10}  {}".format(ms(f["wall"]), ms(f["cpu"]), f["file"]))
+
+    stream.write("\n".join(lines) + "\n")
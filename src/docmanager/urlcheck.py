@@ -0,0 +1,183 @@
+#
+# Copyright (c) 2015 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+
+"""Validation of repository URLs
+
+By default, a URL is only checked for its syntax. If the reachability
+check is enabled (see the config key general.check_repository), the URL
+is requested in a background thread while the files are processed. The
+result is cached on disk, so a URL is requested at most once per TTL.
+"""
+
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+from docmanager.core import URL_CHECK_TTL, URL_CHECK_TIMEOUT
+from docmanager.logmanager import log
+
+CACHE_NAME = "urlcheck.json"
+
+# Schemes of repository URLs; all of them need a host
+URL_SCHEMES = ("http", "https", "git", "ssh", "ftp", "ftps", "svn")
+
+
+def default_cache_file():
+    """Returns the default location of the cache file
+       ($XDG_CACHE_HOME/docmanager/urlcheck.json)
+
+    :return: absolute path of the cache file
+    :rtype: str
+    """
+    cachehome = os.path.expanduser(os.environ.get('XDG_CACHE_HOME', '~/.cache/'))
+    return os.path.join(cachehome, 'docmanager', CACHE_NAME)
+
+
+def is_valid_url(url):
+    """Checks the syntax of a repository URL without any network access
+
+    :param str url: The URL
+    :return: True if the URL has a known scheme and a host
+    :rtype: bool
+    """
+    try:
+        parts = urlsplit(url)
+        parts.port # raises ValueError for an invalid port
+    except ValueError:
+        return False
+
+    return parts.scheme.lower() in URL_SCHEMES and bool(parts.hostname)
+
+
+def read_cache(cachefile):
+    """Reads the cache file
+
+    :param str cachefile: The cache file
+    :return: { url: [checked (timestamp), message or None] }
+    :rtype: dict
+    """
+    try:
+        with open(cachefile, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return dict()
+
+
+def write_cache(cachefile, url, message):
+    """Stores the result of a check; the cache file is replaced atomically
+
+    :param str cachefile: The cache file
+    :param str url: The URL
+    :param str message: The warning for the URL or None if it is reachable
+    """
+    import tempfile
+
+    cache = read_cache(cachefile)
+    cache[url] = [time.time(), message]
+
+    dirname = os.path.dirname(cachefile) or "."
+
+    try:
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+
+        fd, tmpname = tempfile.mkstemp(dir=dirname, prefix=".urlcheck")
+        with os.fdopen(fd, 'w') as f:
+            json.dump(cache, f)
+        os.replace(tmpname, cachefile)
+    except OSError as err:
+        log.debug("Could not write the URL cache %r: %s", cachefile, err)
+
+
+def request_url(url, timeout=URL_CHECK_TIMEOUT):
+    """Requests a URL
+
+    :param str url: The URL
+    :param float timeout: Timeout in seconds
+    :return: a warning or None if the URL is reachable
+    :rtype: str
+    """
+    import urllib.error
+    import urllib.request
+
+    try:
+        request = urllib.request.Request(url, method="HEAD")
+        urllib.request.urlopen(request, timeout=timeout).close()
+    except urllib.error.HTTPError as err:
+        return ("The remote server returns an error code for the URL '{}': {} - "
+                "Please double check if the URL is correct.".format(url, err.code))
+    except (urllib.error.URLError, OSError, ValueError):
+        return ("The given URL '{}' seems to be invalid or the remote server "
+                "is not online. Please double check if the URL is correct.".format(url))
+
+    return None
+
+
+class URLCheck(object):
+    """An URLCheck instance checks the reachability of a URL in a
+       background thread; the result is only reported as a warning
+    """
+
+    def __init__(self, url, cachefile=None, ttl=URL_CHECK_TTL, timeout=URL_CHECK_TIMEOUT):
+        """Starts the check unless the cache contains a recent result
+
+        :param str url: The URL
+        :param str cachefile: The cache file or None (=default_cache_file)
+        :param int ttl: Maximum age of a cached result in seconds
+        :param float timeout: Timeout of the request in seconds
+        """
+        self.url = url
+        self.cachefile = cachefile or default_cache_file()
+        self.timeout = timeout
+        self.message = None
+        self.thread = None
+
+        cached = read_cache(self.cachefile).get(url)
+
+        if cached is not None and time.time() - cached[0] < ttl:
+            log.debug("Using the cached result for the URL %r", url)
+            self.message = cached[1]
+            self.report()
+        else:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def run(self):
+        """Requests the URL and stores the result (runs in the thread)"""
+        self.message = request_url(self.url, self.timeout)
+        write_cache(self.cachefile, self.url, self.message)
+
+    def report(self):
+        """Logs the warning of the check, if there is one"""
+        if self.message is not None:
+            log.warning("%s Nevertheless the URL will be written into the given files.",
+                        self.message)
+
+    def wait(self):
+        """Waits until the request is done and logs its warning; a check
+           which took from the cache returns immediately
+        """
+        if self.thread is None:
+            return
+
+        self.thread.join(self.timeout)
+        if not self.thread.is_alive():
+            self.report()
+        self.thread = None
@@ -16,82 +16,159 @@
 # To contact SUSE about this file by physical or electronic mail,
 # you may find current contact information at www.suse.com
 
-import sys
+import mmap
+import threading
 from collections import OrderedDict
+from io import StringIO
+from docmanager import timings
 from docmanager.core import DEFAULT_DM_PROPERTIES, \
      NS, ReturnCodes, VALIDROOTS, BT_ELEMENTLIST
 from docmanager.exceptions import *
 from docmanager.fileutil import FileUtil
-from docmanager.logmanager import log, logmgr_flog
+from docmanager.logmanager import log
 from docmanager.xmlutil import check_root_element, compilestarttag, \
      ensurefileobj, findprolog, get_namespace, localname, recover_entities, \
-     replaceinstream, preserve_entities, findinfo_pos, xml_indent, \
-     get_property_xpath
+     preserve_entities, findinfo_pos, xml_indent, \
+     get_property_xpath, openfileobj, findelementspan, strip_nsdecls, \
+     findprolog_bytes, iterchunks, xmlencoding
 from lxml import etree
-from xml.sax._exceptions import SAXParseException
+
+# Parsers of the current thread (see getparser)
+_PARSERS = threading.local()
+
+
+def getparser(encoding=None):
+    """Returns a parser of the current thread; lxml parsers can be reused,
+       but not by two threads at the same time
+
+    :param str encoding: The encoding of the document (None = detect it)
+    :return: the parser
+    :rtype: lxml.etree.XMLParser
+    """
+    parsers = getattr(_PARSERS, "parsers", None)
+    if parsers is None:
+        parsers = _PARSERS.parsers = dict()
+
+    if encoding not in parsers:
+        parsers[encoding] = etree.XMLParser(remove_blank_text=False,
+                                            resolve_entities=False,
+                                            dtd_validation=False,
+                                            encoding=encoding)
+
+    return parsers[encoding]
+
 
 class XmlHandler(object):
     """An XmlHandler instance represents an XML tree of a file
     """
 
-    def __init__(self, filename, stoponerror=True):
+    # there can be many thousand handlers at the same time
+    __slots__ = ("_filename", "_buffer", "_fileutil", "_offset", "_header", "_root",
+                 "roottag", "_roottag", "_dmspan", "_dirty", "_encoding", "invalidfile",
+                 "fileerror", "xmlerrorstring", "stoponerror", "readonly",
+                 "__tree", "__root", "__docmanager", "_source",
+                 "xmllogerrorstring")
+
+    def __init__(self, filename, stoponerror=True, readonly=False, source=None):
         """Initializes the XmlHandler class
 
         :param str filename: filename of XML file
+        :param bool stoponerror: raise an exception if the file is invalid
+        :param bool readonly: only parse the head of the file (everything
+                              up to the closing dm:docmanager or info
+                              element); such a handler cannot be written
+        :param source: XML string, file-like object, or an already parsed
+                       lxml.etree._ElementTree which is used instead of
+                       the file (None = parse the file)
         """
-        logmgr_flog()
         log.debug("Initialized a new XML Handler for file %r.", filename)
 
         # general
         self._filename = ""
-        self._buffer = None # StringIO
+        self._buffer = None # StringIO or mmap, only while parsing
 
-        # file util
-        self._fileutil = FileUtil(filename)
+        # file util (created on demand, see fileutil)
+        self._fileutil = None
 
         # prolog
         self._offset = 0
         self._header = ""
         self._root = ""
         self.roottag = ""
+        self._roottag = ""
+
+        # (start, end, bytes) of the dm:docmanager element in the file;
+        # None if write() has to rewrite the whole file
+        self._dmspan = None
+
+        # encoding of the file (from its XML declaration)
+        self._encoding = "utf-8"
+
+        # True if the tree was changed since it was parsed or written
+        self._dirty = False
 
         # parser
-        self.__xmlparser = None
         self.invalidfile = False
         self.fileerror = ""
         self.xmlerrorstring = ""
         self.stoponerror = stoponerror
+        self.readonly = readonly
 
         # lxml
         self.__tree = None
         self.__root = None
         self.__docmanager = None
 
-        # load the file into a StringIO buffer
         self._filename = filename
-        self._buffer = ensurefileobj(self._filename)
+        self._source = filename if source is None else source
 
         # log
         self.xmllogerrorstring = ""
 
-        # parse the given file with lxml
-        self.parse()
+        if isinstance(self._source, etree._ElementTree):
+            # the tree is already parsed
+            self.__tree = self._source
+            self.check_tree()
+        elif self.readonly:
+            # stream only the head of the file into lxml
+            self.parse_head()
+        else:
+            # map the file into memory (other sources are loaded into a
+            # StringIO buffer) and parse it with lxml
+            with timings.phase("read"):
+                self._buffer = ensurefileobj(self._source, binary=True)
+
+            try:
+                self.parse()
+            finally:
+                # the buffer is not needed anymore once the tree is parsed
+                if isinstance(self._buffer, mmap.mmap):
+                    self._buffer.close()
+                self._buffer = None
+
+        # only the file name is kept, a source text can be freed
+        if self._source is not self._filename:
+            self._source = None
 
     def parse(self):
         """This function parses the whole XML file
         """
-        logmgr_flog()
+        original = self._buffer
+        binary = isinstance(original, mmap.mmap)
+
+        if binary:
+            self._encoding = xmlencoding(original[:1024])
 
         # find the prolog of the XML file (everything before the start tag)
         try:
-            prolog = findprolog(self._buffer)
-        except SAXParseException as err:
+            with timings.phase("prolog"):
+                if binary:
+                    prolog = findprolog_bytes(original, self._encoding)
+                else:
+                    prolog = findprolog(self._buffer)
+        except DMXmlParseError as err:
             self.invalidfile = True
-            self.fileerror = "<{}:{}> {} in {!r}.".format(\
-                                            err.getLineNumber(), \
-                                            err.getColumnNumber(), \
-                                            err.getMessage(), \
-                                            self.filename,)
+            self.fileerror = "{} in {!r}.".format(err.errorstr, self.filename)
 
             if self.stoponerror:
                 raise DMXmlParseError(self.fileerror, ReturnCodes.E_XML_PARSE_ERROR)
@@ -103,53 +180,169 @@ class XmlHandler(object):
                 prolog['root'], \
                 prolog['roottag']
 
-            # replace any entities
-            self.replace_entities()
+            if self.__tree is None:
+                # register namespace
+                # etree.register_namespace("dm", "{dm}".format(**NS))
+
+                # load the file and set a reference to the dm group
+                try:
+                    if binary:
+                        self.__tree = self.parse_bytes(original, prolog['byteoffset'])
+                    else:
+                        # replace any entities
+                        with timings.phase("entities"):
+                            self.replace_entities()
+                        with timings.phase("parse"):
+                            self.__tree = etree.parse(self._buffer, getparser())
+                except etree.XMLSyntaxError as err:
+                    self.invalidfile = True
+                    self.fileerror = err.msg
 
-            # register namespace
-            # etree.register_namespace("dm", "{dm}".format(**NS))
-            self.__xmlparser = etree.XMLParser(remove_blank_text=False,
-                                               resolve_entities=False,
-                                               dtd_validation=False)
+                    if self.stoponerror:
+                        raise DMXmlParseError(err, ReturnCodes.E_XML_PARSE_ERROR)
 
-            # load the file and set a reference to the dm group
+            if not self.invalidfile:
+                with timings.phase("parse"):
+                    self.check_tree()
+
+            # write() replaces just the element in the raw bytes of the file
+            if not self.invalidfile and binary:
+                self.find_dm_span(original, prolog['byteoffset'])
+
+    def parse_bytes(self, data, offset):
+        """Feeds the raw bytes of the document after the prolog into the
+           parser; the entities are preserved chunk by chunk, so the
+           document is never copied as a whole
+
+        :param mmap.mmap data: The content of the file
+        :param int offset: The offset of the start tag of the root element
+        :return: the parsed tree
+        :rtype: lxml.etree._ElementTree
+        :raise: lxml.etree.XMLSyntaxError
+        """
+        parser = getparser(encoding=self._encoding)
+
+        try:
+            with timings.phase("parse"):
+                for chunk in iterchunks(data, offset):
+                    with timings.phase("entities"):
+                        chunk = preserve_entities(chunk)
+                    parser.feed(chunk)
+
+                return parser.close().getroottree()
+        except etree.XMLSyntaxError:
+            # reset the shared parser for the next file
             try:
-                self.__tree = etree.parse(self._buffer, self.__xmlparser)
-            except etree.XMLSyntaxError as err:
-                self.invalidfile = True
-                self.fileerror = err.msg
+                parser.close()
+            except etree.XMLSyntaxError:
+                pass
+            raise
 
-                if self.stoponerror:
-                    raise DMXmlParseError(err, ReturnCodes.E_XML_PARSE_ERROR)
+    def find_dm_span(self, data, offset):
+        """Records the position of the dm:docmanager element in the raw
+           bytes of the file, so write() can replace just this element
 
-            if not self.invalidfile:
-                self.__root = self.__tree.getroot()
+        :param mmap.mmap data: The original content of the file
+        :param int offset: The offset of the start tag of the root element
+        """
+        dm = self.__docmanager
 
-                try:
-                    check_root_element(self.__root, etree)
-                except ValueError as err:
-                    self.invalidfile = True
-                    self.fileerror = err
+        # a new element (see create_group) is not in the file
+        if dm is None or dm.sourceline is None:
+            return
 
-                    if self.stoponerror:
-                        raise DMXmlParseError(err, ReturnCodes.E_XML_PARSE_ERROR)
+        qname = "docmanager" if dm.prefix is None else dm.prefix + ":docmanager"
+        span = findelementspan(data, qname, offset)
 
-                if not self.invalidfile:
-                    # check for DocBook 5 namespace in start tag
-                    try:
-                        self.check_docbook5_ns()
+        if span is not None:
+            self._dmspan = span + (data[span[0]:span[1]],)
+
+    def parse_head(self):
+        """This function parses the XML file only up to the closing
+           dm:docmanager element (or the closing info element of the root
+           element, if there is no dm:docmanager element). The rest of the
+           document is neither read nor parsed.
+        """
+        dmtag = "{{{dm}}}docmanager".format(**NS)
+        infotag = "{{{d}}}info".format(**NS)
+
+        # the entities have to be preserved line by line because lxml would
+        # complain about undefined entities otherwise
+        parser = etree.XMLPullParser(events=('end',),
+                                     tag=(dmtag, infotag),
+                                     remove_blank_text=False,
+                                     resolve_entities=False,
+                                     dtd_validation=False)
+        elem = None
+
+        try:
+            with timings.phase("parse"), openfileobj(self._source) as stream:
+                for line in stream:
+                    parser.feed(preserve_entities(line))
+
+                    for _, elem in parser.read_events():
+                        parent = elem.getparent()
+                        if elem.tag == dmtag or parent is None or \
+                           parent.getparent() is None:
+                            break
+                    else:
+                        continue
+                    break
+                else:
+                    # we reached the end of the file
+                    elem = parser.close()
+        except etree.XMLSyntaxError as err:
+            self.invalidfile = True
+            self.fileerror = err.msg
+
+            if self.stoponerror:
+                raise DMXmlParseError(err, ReturnCodes.E_XML_PARSE_ERROR)
+
+        if not self.invalidfile:
+            with timings.phase("parse"):
+                self.__tree = elem.getroottree()
+                self.check_tree()
+
+    def release(self):
+        """Drops the parsed tree and the prolog; the handler can't be used
+           anymore afterwards. Jobs release their handler as soon as the
+           results are extracted (see docmanager.jobs.run_job).
+        """
+        self.__tree = self.__root = self.__docmanager = None
+        self._header = self._root = ""
+        self._dmspan = None
+
+    def check_tree(self):
+        """Checks the root element and the namespace of the parsed tree and
+           searches for the dm:docmanager element
+        """
+        self.__root = self.__tree.getroot()
+
+        try:
+            check_root_element(self.__root, etree)
+        except ValueError as err:
+            self.invalidfile = True
+            self.fileerror = err
+
+            if self.stoponerror:
+                raise DMXmlParseError(err, ReturnCodes.E_XML_PARSE_ERROR)
 
-                        # check for docmanager element
-                        self.__docmanager = self.__tree.find("//dm:docmanager", namespaces=NS)
+        if not self.invalidfile:
+            # check for DocBook 5 namespace in start tag
+            try:
+                self.check_docbook5_ns()
+
+                # check for docmanager element
+                self.__docmanager = self.__tree.find("//dm:docmanager", namespaces=NS)
 
-                        if self.__docmanager is None:
-                            log.info("No docmanager element found")
-                            self.create_group()
-                        else:
-                            log.debug("Found docmanager element %s", self.__docmanager.getparent())
-                    except DMNotDocBook5File as err:
-                        if self.stoponerror == True:
-                            raise DMNotDocBook5File(err.errorstr, err.error)
+                if self.__docmanager is None:
+                    log.info("No docmanager element found")
+                    self.create_group()
+                else:
+                    log.debug("Found docmanager element %s", self.__docmanager.getparent())
+            except DMNotDocBook5File as err:
+                if self.stoponerror == True:
+                    raise DMNotDocBook5File(err.errorstr, err.error)
 
     def check_docbook5_ns(self):
         """Checks if the current file is a valid DocBook 5 file.
@@ -163,10 +356,8 @@ class XmlHandler(object):
     def replace_entities(self):
         """This function replaces entities in the StringIO buffer
         """
-        logmgr_flog()
-
         self._buffer.seek(self._offset)
-        self._buffer = replaceinstream(self._buffer, preserve_entities)
+        self._buffer = StringIO(preserve_entities(self._buffer.read()))
 
     def init_default_props(self, force=False, bugtracker=False):
         """Initializes the default properties for the given XML files
@@ -174,8 +365,6 @@ class XmlHandler(object):
         :param bool force: Ignore if there are already properties in an
                            XML - just overwrite them
         """
-        logmgr_flog()
-
         props = list(DEFAULT_DM_PROPERTIES)
 
         if bugtracker:
@@ -194,8 +383,6 @@ class XmlHandler(object):
 
     def check_root_element(self):
         """Checks if root element is valid"""
-        logmgr_flog()
-
         tag = etree.QName(self.__root.tag)
         if tag.localname not in VALIDROOTS:
             raise DMInvalidXMLRootElement("Cannot add info element to file %r. "
@@ -206,8 +393,6 @@ class XmlHandler(object):
 
     def create_group(self):
         """Creates the docmanager group element"""
-        logmgr_flog()
-
         #search the info-element if not exists raise an error
         info = self.__tree.find("//d:info", namespaces=NS)
         # TODO: We need to check for a --force option
@@ -229,6 +414,7 @@ class XmlHandler(object):
                                              "{{{dm}}}docmanager".format(**NS),
                                              nsmap={'dm': NS['dm']},
                                             )
+        self._dirty = True
 
     def set(self, pairs):
         """Sets the key as element and value as content
@@ -240,8 +426,6 @@ class XmlHandler(object):
             <foo>bar</foo>
            whereas foo belongs to the DocManager namespace
         """
-        logmgr_flog()
-
         #import pdb
         #pdb.set_trace()
 
@@ -252,7 +436,7 @@ class XmlHandler(object):
         for key in pairs:
             elemlist = key.split("/")
 
-            for e in elemlist:
+            for idx, e in enumerate(elemlist):
                 name = "dm:" + e
 
                 dmelem.append(name)
@@ -260,10 +444,19 @@ class XmlHandler(object):
 
                 if node is None:
                     node = etree.SubElement(lastnode, "{{{dm}}}{key}".format(key=e, **NS))
+                    self._dirty = True
 
+                text = node.text
                 lastnode = node
                 node.text = ""
 
+                # the whitespace of parent elements is not a change
+                if idx < len(elemlist) - 1 and (text or "").strip():
+                    self._dirty = True
+
+            if text != pairs[key]:
+                self._dirty = True
+
             node.text = pairs[key]
 
     def is_set(self, key, values):
@@ -275,8 +468,6 @@ class XmlHandler(object):
         :return: if conditions are met
         :rtype: bool
         """
-        logmgr_flog()
-
         #check if the key has on of the given values
         element = self.__docmanager.find("./dm:"+key,
                                          namespaces=NS)
@@ -294,8 +485,6 @@ class XmlHandler(object):
         :return: if property is set
         :rtype: bool
         """
-        logmgr_flog()
-
         element = self.__docmanager.find("./dm:{}".format(prop), namespaces=NS)
         if element is not None:
             return True
@@ -314,7 +503,9 @@ class XmlHandler(object):
             raise DMPropertyNotFound(self.filename, prop)
 
         for i in data:
-            node.set(i, data[i])
+            if node.get(i) != data[i]:
+                node.set(i, data[i])
+                self._dirty = True
 
     def del_attr(self, prop, data):
         """Deletes one or more attributes of a property
@@ -330,6 +521,7 @@ class XmlHandler(object):
         for i in data:
             try:
                 del node.attrib[i]
+                self._dirty = True
             except KeyError:
                 errors.append(i)
 
@@ -384,8 +576,6 @@ class XmlHandler(object):
         :return: the values
         :rtype: dict
         """
-        logmgr_flog()
-
         if len(keys) == 0:
             return self.get_all()
 
@@ -416,8 +606,6 @@ class XmlHandler(object):
     def get_all(self):
         """Returns all keys and values in a docmanager xml file
         """
-        logmgr_flog()
-
         ret = OrderedDict()
         for idx, i in enumerate(self.__docmanager.iter()):
             # we want to skip the "docmanager" element here
@@ -434,8 +622,6 @@ class XmlHandler(object):
         :param str condition: the condition for the deletion (the var condition has to be equal with the property value)
         :return boolean: True = success | False = no property has been deleted
         """
-        logmgr_flog()
-
         key = key.split("/")
         lastnode = None
 
@@ -456,6 +642,7 @@ class XmlHandler(object):
                         break
 
                 key_handler.getparent().remove(key_handler)
+                self._dirty = True
                 return True
 
         return False
@@ -487,8 +674,6 @@ class XmlHandler(object):
         :param lxml.etree._Element node: node where to start
         :param str indentation: Additional indentation
         """
-        logmgr_flog()
-        
         indent = ""
         if node is not None:
             indent = "".join(["".join(n.tail.split("\n"))
@@ -498,8 +683,6 @@ class XmlHandler(object):
 
     def indent_dm(self):
         """Indents only dm:docmanager element and its children"""
-        logmgr_flog()
-
         dmindent='    '
         dm = self.__tree.find("//dm:docmanager",
                               namespaces=NS)
@@ -532,27 +715,104 @@ class XmlHandler(object):
             node.tail = '\n' + indent + i
 
     def write(self):
-        """Write XML tree to original filename"""
-        logmgr_flog()
+        """Write XML tree to original filename
 
-        # Only indent docmanager child elements
-        self.indent_dm()
+        The file is replaced atomically (see FileUtil.replace) and only if
+        its content changes. If the tree was not changed at all (see dirty),
+        nothing is serialized.
 
+        :return: True if the file was written
+        :rtype: bool
+        """
+        if self.readonly:
+            raise ValueError("Cannot write {!r}: the file was only parsed "
+                             "in read-only mode.".format(self._filename))
+
+        if not self._dirty:
+            log.debug("%r was not changed.", self._filename)
+            return False
+
+        try:
+            with open(self._filename, 'rb') as f:
+                text = f.read()
+        except OSError:
+            text = None
+
+        dmspan = None
+
+        with timings.phase("serialize"):
+            # Only indent docmanager child elements
+            self.indent_dm()
+            content = self.splice_dm(text)
+
+            if content is not None:
+                content, dmspan = content
+            else:
+                content = self.serialize().encode(self._encoding, 'xmlcharrefreplace')
+
+        self._dirty = False
+
+        if content == text:
+            log.debug("%r is unchanged.", self._filename)
+            return False
+
+        FileUtil(self._filename).replace(content)
+        self._dmspan = dmspan
+
+        return True
+
+    def serialize(self):
+        """Serializes the whole document
+
+        :return: the content of the file
+        :rtype: str
+        """
         log.debug("root: %s", repr(self._root))
-        with open(self._filename, 'w') as f:
-            info = self.__root.find("d:info", namespaces=NS)
+        info = self.__root.find("d:info", namespaces=NS)
+
+        xml_indent(info, 2)
+        content = etree.tostring(self.__tree, \
+                   encoding='unicode', \
+                   # doctype=self._header.rstrip())
+                  )
+        content = recover_entities(content)
+        # self._offset, self._header, self._root, self._roottag
+        starttag = compilestarttag(self._roottag)
+        content = starttag.sub(lambda _: self._root.rstrip(), content, 1)
+
+        # log.debug("content: %s", repr(content))
+        return self._header.rstrip()+"\n" + content
+
+    def splice_dm(self, text):
+        """Replaces only the dm:docmanager element in the raw bytes of the
+           file; all other bytes of the file stay untouched
+
+        :param bytes text: The current content of the file
+        :return: (new content, span of the new element) or None if the
+                 element could not be located in the file (then the whole
+                 tree has to be written)
+        :rtype: tuple
+        """
+        if self._dmspan is None or self._source != self._filename or text is None:
+            return None
+
+        start, end, original = self._dmspan
+
+        # the file was changed after it was parsed
+        if text[start:end] != original:
+            log.debug("The dm:docmanager element in %r has moved.", self._filename)
+            return None
 
-            xml_indent(info, 2)
-            content = recover_entities(etree.tostring(self.__tree, \
-                           encoding='unicode', \
-                           # doctype=self._header.rstrip())
-                      ))
-            # self._offset, self._header, self._root, self._roottag
-            starttag = compilestarttag(self._roottag)
-            content = starttag.sub(lambda _: self._root.rstrip(), content, 1)
+        # same indentation as in the complete tree (see serialize)
+        xml_indent(self.__docmanager, 3)
+        content = recover_entities(etree.tostring(self.__docmanager,
+                                                  encoding='unicode',
+                                                  with_tail=False))
+        content = strip_nsdecls(content, original.decode(self._encoding))
+        content = content.encode(self._encoding, 'xmlcharrefreplace')
 
-            # log.debug("content: %s", repr(content))
-            f.write(self._header.rstrip()+"\n" + content)
+        return (text[:start] + content + text[end:],
+                (start, start + len(content), content))
 
     @property
     def filename(self):
@@ -608,6 +868,19 @@ class XmlHandler(object):
     def dm(self):
         return self.__docmanager
 
+    @property
+    def dirty(self):
+        """Returns if the tree was changed by set, delete, set_attr, del_attr,
+           or create_group since it was parsed or written
+
+        :return: dirty flag
+        :rtype:  bool
+        """
+        return self._dirty
+
     @property
     def fileutil(self):
+        if self._fileutil is None:
+            self._fileutil = FileUtil(self._filename)
+
         return self._fileutil
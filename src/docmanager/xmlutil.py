@@ -16,16 +16,13 @@
 # To contact SUSE about this file by physical or electronic mail,
 # you may find current contact information at www.suse.com
 
+import codecs
+import os
 import re
-import sys
-import xml.sax
-from collections import namedtuple
 from docmanager.core import NS, ReturnCodes, VALIDROOTS
 from docmanager.exceptions import DMInvalidXMLRootElement, \
-                                  DMFileNotFoundError
-from docmanager.logmanager import log, logmgr_flog
+                                  DMFileNotFoundError, DMXmlParseError
 from io import StringIO
-from itertools import accumulate
 
 # -------------------------------------------------------------------
 # Regular Expressions
@@ -33,6 +30,16 @@ from itertools import accumulate
 ENTS = re.compile("(&([\w_\.-]+);)")
 STEN = re.compile("(\[\[\[(\#?[\w_\.-]+)\]\]\])")
 NAMESPACE_REGEX = re.compile("\{(?P<ns>.*)\}(?P<local>[-a-zA-Z0-9._]+)")
+XMLDECL = re.compile("\ufeff?<\\?xml[^>]*\\?>")
+XMLDECL_BYTES = re.compile(b"(?:\xef\xbb\xbf)?<\\?xml[^>]*\\?>")
+DECL_ENCODING = re.compile(b"encoding[ \t\r\n]*=[ \t\r\n]*[\"']([A-Za-z][-A-Za-z0-9._]*)[\"']")
+
+# Entities and preserved entities split into (start, name, end); see
+# swapdelimiters
+ENT_PARTS = re.compile("(&)([\w_\.-]+)(;)")
+STEN_PARTS = re.compile("(\[\[\[)(\#?[\w_\.-]+)(\]\]\])")
+ENT_PARTS_BYTES = re.compile(ENT_PARTS.pattern.encode())
+STEN_PARTS_BYTES = re.compile(STEN_PARTS.pattern.encode())
 
 
 def ent2txt(match, start="[[[", end="]]]"):
@@ -44,8 +51,6 @@ def ent2txt(match, start="[[[", end="]]]"):
     :return: replaced string
     :rtype: str
     """
-    logmgr_flog()
-
     if match:
         return "{}{}{}".format(start,
                                match.group(2),
@@ -59,34 +64,71 @@ def txt2ent(match):
     :return: replaced string
     :rtype: str
     """
-    logmgr_flog()
-
     if match:
         return "&{};".format(match.group(2))
 
 
+def swapdelimiters(regex, text, start, end):
+    """Replaces the delimiters of all matches of regex in text
+
+    The text is split at the matches and the delimiters are replaced by
+    slice assignment, so no Python code runs for every match (unlike
+    re.sub with a function or a template with group references).
+
+    :param regex: compiled pattern with the groups (start, name, end)
+    :param text: the text
+    :type text: str or bytes
+    :param start: the new start delimiter
+    :param end: the new end delimiter
+    :return: the text with the new delimiters
+    :rtype: str or bytes
+    """
+    # [text, start, name, end, text, start, name, end, ..., text]
+    parts = regex.split(text)
+    count = len(parts) // 4
+
+    parts[1::4] = [start] * count
+    parts[3::4] = [end] * count
+
+    return text[:0].join(parts)
+
+
 def preserve_entities(text):
     """Preserve any entities in text
 
-    :param str text: the text that should preserve entities
+    :param text: the text that should preserve entities; can also be
+                 a whole document
+    :type text: str or bytes
     :return: the preserved text
-    :rtype: str
+    :rtype: str or bytes
     """
-    logmgr_flog()
+    if isinstance(text, bytes):
+        if b"&" not in text:
+            return text
+        return swapdelimiters(ENT_PARTS_BYTES, text, b"[[[", b"]]]")
 
-    return ENTS.sub(ent2txt, text)
+    if "&" not in text:
+        return text
+    return swapdelimiters(ENT_PARTS, text, "[[[", "]]]")
 
 
 def recover_entities(text):
     """Recover any preserved entities in text
 
-    :param str text: the text that should recover entities
+    :param text: the text that should recover entities; can also be
+                 a whole document
+    :type text: str or bytes
     :return: the recovered text
-    :rtype: str
+    :rtype: str or bytes
     """
-    logmgr_flog()
+    if isinstance(text, bytes):
+        if b"[[[" not in text:
+            return text
+        return swapdelimiters(STEN_PARTS_BYTES, text, b"&", b";")
 
-    return STEN.sub(txt2ent, text)
+    if "[[[" not in text:
+        return text
+    return swapdelimiters(STEN_PARTS, text, "&", ";")
 
 
 def replaceinstream(stream, func):
@@ -98,8 +140,6 @@ def replaceinstream(stream, func):
     :return: another stream with replaced entities
     :rtype: StringIO
     """
-    logmgr_flog()
-
     result = StringIO()
 
     for line in stream:
@@ -113,8 +153,6 @@ def check_root_element(rootelem, etree):
 
     :param object: root element (object)
     :param object: etree element (etree object)"""
-    logmgr_flog()
-
     tag = etree.QName(rootelem.tag)
     if tag.localname not in VALIDROOTS:
         raise DMInvalidXMLRootElement("Cannot add info element to %s. "
@@ -130,8 +168,6 @@ def is_xml(text):
        :return: True, if text can be considered as XML, otherwise False
        :rtype: bool
     """
-    logmgr_flog()
-
     possiblestartstrings = (re.compile("<\?xml"),
                             re.compile("<!DOCTYPE"),
                             re.compile("<!--",),
@@ -153,8 +189,6 @@ def findinfo_pos(root):
     :return: position where to insert <info>
     :rtype: int
     """
-    logmgr_flog()
-
     titles = root.xpath("(d:title|d:subtitle|d:titleabbrev)[last()]",
                         namespaces=NS)
     if not titles:
@@ -166,15 +200,16 @@ def findinfo_pos(root):
 
 # -------------------------------------------------------------------
 
-def ensurefileobj(source):
+def ensurefileobj(source, binary=False):
     """Return a file(-like) object, regardless if it's a another
        file-object, a filename, or a string
 
        :param source: filename, file-like object, or string
-       :return: StringIO or file-like object
+       :param bool binary: Return a read-only memory map of the raw bytes
+                           for filenames (see mapfile) instead of decoding
+                           them into a StringIO
+       :return: StringIO, mmap, or file-like object
     """
-    logmgr_flog()
-
     # StringIO support:
     if hasattr(source, 'getvalue') and hasattr(source, 'tell'):
         # we return the source
@@ -186,6 +221,11 @@ def ensurefileobj(source):
             # source isn't a file-like object nor starts with XML structure
             # so it has to be a filename
             try:
+                if binary:
+                    res = mapfile(source)
+                    if res is not None:
+                        return res
+
                 res = StringIO(open(source, 'r').read())
             except FileNotFoundError as err: # pylint:disable=undefined-variable
                 raise DMFileNotFoundError("Could not find file {!r}.".format(err.filename),
@@ -196,6 +236,144 @@ def ensurefileobj(source):
     # TODO: Check if source is an URL; should we allow this?
 
 
+def openfileobj(source):
+    """Return a file(-like) object like ensurefileobj, but open
+       filenames lazily instead of reading them completely into memory
+
+       :param source: filename, file-like object, or string
+       :return: file object or StringIO
+    """
+    if isinstance(source, str) and not is_xml(source):
+        try:
+            return open(source, 'r')
+        except FileNotFoundError as err: # pylint:disable=undefined-variable
+            raise DMFileNotFoundError("Could not find file {!r}.".format(err.filename),
+                                      err.filename, ReturnCodes.E_FILE_NOT_FOUND)
+
+    return ensurefileobj(source)
+
+
+def mapfile(filename):
+    """Maps a file read-only into memory; the pages are loaded by the
+       operating system when they are read and are not copied into a
+       Python object
+
+       :param str filename: The file name
+       :return: the memory map or None if the file is empty or its
+                encoding is not compatible with ASCII (for example UTF-16);
+                such files have to be decoded
+       :rtype: mmap.mmap
+       :raise FileNotFoundError: if the file does not exist
+    """
+    import mmap
+
+    with open(filename, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if not ascii_compatible(xmlencoding(data[:1024])):
+        data.close()
+        return None
+
+    return data
+
+
+def xmlencoding(head):
+    """Returns the encoding of an XML document from its byte order mark or
+       its XML declaration (default: UTF-8)
+
+       :param bytes head: The first bytes of the document
+       :return: the name of the encoding
+       :rtype: str
+    """
+    for bom, encoding in ((codecs.BOM_UTF32_LE, "utf-32"), (codecs.BOM_UTF32_BE, "utf-32"),
+                          (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16")):
+        if head.startswith(bom):
+            return encoding
+
+    decl = XMLDECL_BYTES.match(head)
+    match = DECL_ENCODING.search(head, 0, decl.end()) if decl is not None else None
+    if match is None:
+        return "utf-8"
+
+    try:
+        return codecs.lookup(match.group(1).decode("ascii")).name
+    except LookupError:
+        return "utf-8"
+
+
+def ascii_compatible(encoding):
+    """Checks if the markup characters of an encoding are single ASCII
+       bytes, so the raw bytes can be searched with byte patterns
+
+       :param str encoding: The name of the encoding
+       :return: True if the encoding is ASCII compatible
+       :rtype: bool
+    """
+    markup = "<?xml &;[]>\n"
+
+    try:
+        return markup.encode(encoding) == markup.encode("ascii")
+    except (LookupError, UnicodeError):
+        return False
+
+
+def findprolog_bytes(data, encoding, chunksize=4096):
+    """Returns the prolog of raw bytes like findprolog; only the prolog is
+       decoded
+
+       :param data: The document (bytes or mmap)
+       :param str encoding: The encoding of the document (see xmlencoding)
+       :param int chunksize: Size of bytes which are decoded at once
+       :return: same dictionary as findprolog with the additional key
+                'byteoffset', the offset of the start tag in bytes
+       :rtype: dict
+       :raise DMXmlParseError: if the prolog is not well-formed
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    text = ""
+    pos = 0
+
+    while True:
+        chunk = data[pos:pos + chunksize]
+        pos += len(chunk)
+        eof = pos >= len(data)
+
+        try:
+            text += decoder.decode(chunk, final=eof)
+        except UnicodeDecodeError as err:
+            raise DMXmlParseError("The prolog is not encoded in {}: {}".format(encoding, err),
+                                  ReturnCodes.E_XML_PARSE_ERROR)
+
+        try:
+            prolog = scanprolog(text, eof)
+        except PrologIncomplete:
+            continue
+
+        prolog['byteoffset'] = len(text[:prolog['offset']].encode(encoding))
+        return prolog
+
+
+def iterchunks(data, start=0, chunksize=65536):
+    """Yields the bytes of data in chunks which end at a line break, so an
+       entity reference is never split between two chunks
+
+       :param data: The document (bytes or mmap)
+       :param int start: The offset of the first chunk
+       :param int chunksize: The minimum size of a chunk
+       :return: generator of bytes
+    """
+    length = len(data)
+
+    while start < length:
+        end = data.find(b"\n", min(start + chunksize, length))
+        end = length if end == -1 else end + 1
+        yield data[start:end]
+        start = end
+
+
 # -------------------------------------------------------------------
 # Helper functions
 
@@ -206,8 +384,6 @@ def localname(tag):
     :return:  local name
     :rtype:  str
     """
-    logmgr_flog()
-
     m = NAMESPACE_REGEX.search(tag)
     if m:
         return m.groupdict()['local']
@@ -221,8 +397,6 @@ def get_namespace(tag):
     :return:        namespace of the element
     :rtype:         str
     """
-    logmgr_flog()
-
     m = NAMESPACE_REGEX.search(tag)
     if m:
         return m.groupdict()['ns']
@@ -237,8 +411,6 @@ def compilestarttag(roottag=None):
        :return: a pattern object
        :rtype: _sre.SRE_Pattern
     """
-    logmgr_flog()
-
     # Taken from the xmllib.py
     # http://code.metager.de/source/xref/python/jython/lib-python/2.7/xmllib.py
     _S = '[ \t\r\n]+'                       # white space
@@ -260,221 +432,274 @@ def compilestarttag(roottag=None):
 
 # -------------
 
-class LocatingWrapper(object):
-    """Holds a table which are used to transform line and column position
-       into offset
-    """
-    def __init__(self, f):
-        logmgr_flog()
-
-        self.f = f
-        self.offset = [0]
-        self.curoffs = 0
+# Tokens which are relevant while skipping a DOCTYPE declaration
+DOCTYPE_TOKENS = re.compile("<!--|[\"'\\[\\]>]")
+# Everything from the tag name until the end of a start tag
+STARTTAG_END = re.compile("(?:[^'\">]|\"[^\"]*\"|'[^']*')*>")
+STARTTAG_END_BYTES = re.compile(STARTTAG_END.pattern.encode())
+XMLNAME = re.compile("[a-zA-Z_:][-a-zA-Z0-9._:]*")
 
-    def read(self, *a):
-        """Read data"""
-        logmgr_flog()
 
-        data = self.f.read(*a)
-        self.offset.extend(accumulate(len(m)+1 for m in data.split('\n')))
-        return data
+class PrologIncomplete(Exception):
+    """Raised by scanprolog if the buffer ends before the prolog"""
 
-    def where(self, locator):
-        """Returns the offset from line and column
 
-        :param locator: locator object
-        :return: offset
-        :rtype:  int
-        """
-        logmgr_flog()
+def _prologerror(text, pos, msg):
+    """Raises a DMXmlParseError for a position in the prolog
 
-        return self.offset[locator.getLineNumber() - 1] + locator.getColumnNumber()
-
-    def close(self):
-        """Close the locator"""
-        logmgr_flog()
-        # Normally, we would close our file(-alike) object and call
-        #   self.f.close()
-        # However, we do nothing
+    :param str text: the buffer
+    :param int pos: position of the error
+    :param str msg: error message
+    """
+    line = text.count("\n", 0, pos) + 1
+    col = pos - (text.rfind("\n", 0, pos) + 1)
+    raise DMXmlParseError("<{}:{}> {}".format(line, col, msg),
+                          ReturnCodes.E_XML_PARSE_ERROR)
 
 
+def _skipdoctype(text, pos):
+    """Returns the position after a DOCTYPE declaration (including an
+       internal subset)
 
-class Handler(xml.sax.handler.ContentHandler):
-    """ContentHandler to watch for start and end elements. Needed to
-       get the location of all the elements
+    :param str text: the buffer
+    :param int pos: position of '<!DOCTYPE'
+    :return: position after the closing '>'
+    :rtype: int
+    """
+    depth = 0
+    pos += len("<!DOCTYPE")
+
+    while True:
+        match = DOCTYPE_TOKENS.search(text, pos)
+        if match is None:
+            raise PrologIncomplete()
+
+        token = match.group(0)
+        pos = match.end()
+
+        if token == "<!--":
+            end = text.find("-->", pos)
+            if end == -1:
+                raise PrologIncomplete()
+            pos = end + 3
+        elif token in "\"'":
+            end = text.find(token, pos)
+            if end == -1:
+                raise PrologIncomplete()
+            pos = end + 1
+        elif token == "[":
+            depth += 1
+        elif token == "]":
+            depth -= 1
+        elif not depth:
+            return pos
+
+
+def scanprolog(text, eof=True):
+    """Scans the prolog of an XML document (everything before the start tag
+       of the root element) and the start tag itself
+
+    :param str text: the beginning of an XML document
+    :param bool eof: True, if text contains the complete document
+    :return: same dictionary as findprolog
+    :rtype: dict
+    :raise PrologIncomplete: if eof is False and text is too short
+    :raise DMXmlParseError: if the prolog is not well-formed
     """
-    def __init__( self, context, locator):
-        logmgr_flog()
-        super().__init__()# pylint:disable=super-on-old-class
-        self.context = context
-        self.locstm = locator
-        self.pos = namedtuple('Position', ['line', 'col', 'offset'])
-
-    def setDocumentLocator(self, locator):
-        """Called by the parser to give the application a locator for
-           locating the origin of document events.
-
-        :param LocatingWrapper loc: LocatingWrapper object
-        """
-        logmgr_flog()
-
-        self.loc = locator
-
-    def startElement(self, name, attrs):
-        """Signals the start of an element in non-namespace mode
-
-        :param str name:  XML 1.0 Name of the element
-        :param Attributes attrs: attributes of the current element
-        """
-        logmgr_flog()
-
-        ctxlen = len(self.context)
-        # We are only interested in the first two start tags
-        if ctxlen < 2:
-            current = self.locstm.where(self.loc)
-            pos = self.pos(self.loc.getLineNumber(), \
-                         self.loc.getColumnNumber(), \
-                         current)
-            self.context.append(["%s" % name, pos])
-
-    def endElement(self, name):
-        """Signals the end of an element in non-namespace mode
-
-        :param str name:  XML 1.0 Name of the element
-        """
-        logmgr_flog()
-
-        eline = self.loc.getLineNumber()
-        ecol = self.loc.getColumnNumber()
-        last = self.locstm.where(self.loc)
-        pos = self.pos(line=eline, col=ecol, offset=last)
-
-        # save the position of an end tag and add '/' in front of the
-        # name to distinguish it from a start tag
-        self.context.append(["/%s" % name, pos])
-
-    def processingInstruction(self, target, data):
-        """Receive notification of a processing instruction (PI)
-
-        :param str target: the target of the PI
-        :param str data:   the data of the PI
-        """
-        logmgr_flog()
-
-        ctxlen = len(self.context)
-        # Only append PIs when it's NOT before start-tag
-        if ctxlen:
-            current = self.locstm.where(self.loc)
-            pos = self.pos(self.loc.getLineNumber(), \
-                            self.loc.getColumnNumber(), \
-                            current)
-            self.context.append(["?%s" % target, pos])
-
-    def comment(self, text): # pylint: disable=unused-argument
-        """Signals an XML comment
-
-        :param str text: text content of the XML comment
-        """
-        logmgr_flog()
-
-        ctxlen = len(self.context)
-        # We are only interested in the first two start tags
-        if ctxlen:
-            current = self.locstm.where(self.loc)
-            pos = self.pos(self.loc.getLineNumber(), \
-                           self.loc.getColumnNumber(), \
-                           current)
-            self.context.append(["-- comment", pos])
-
-    # From LexicalParser
-    def startCDATA(self):
-        """Signals a CDATA section"""
-        logmgr_flog()
-
-    endCDATA = startCDATA
-
-    def startDTD(self,  doctype, publicID, systemID): # pylint:disable=unused-argument
-        """Signals the start of an DTD declaration
-
-        :param  doctype: name of the root element
-        :param publicID: public identifier (or empty)
-        :param systemID: system identifier (or empty)
-        """
-        logmgr_flog()
-
-    def endDTD(self):
-        """Reports the end of a DTD declaration"""
-        logmgr_flog()
-
-    def startEntity(self, name):  # pylint: disable=unused-argument
-        """Reports the start of an entity"""
-        logmgr_flog()
-
-
-def findprolog(source, maxsize=-1):
+    pos = 0
+    length = len(text)
+
+    # skip a byte order mark
+    if text.startswith("\ufeff"):
+        pos = 1
+
+    while True:
+        start = text.find("<", pos)
+        if start == -1:
+            if not eof:
+                raise PrologIncomplete()
+            _prologerror(text, length, "no element found")
+
+        # only whitespace is allowed between the markup of the prolog
+        if text[pos:start].strip():
+            _prologerror(text, pos, "syntax error")
+
+        try:
+            # we need enough characters to decide which markup follows
+            if not eof and length - start < len("<!DOCTYPE"):
+                raise PrologIncomplete()
+
+            if text.startswith("<?", start):
+                end = text.find("?>", start + 2)
+                if end == -1:
+                    raise PrologIncomplete()
+                pos = end + 2
+            elif text.startswith("<!--", start):
+                end = text.find("-->", start + 4)
+                if end == -1:
+                    raise PrologIncomplete()
+                pos = end + 3
+            elif text.startswith("<!DOCTYPE", start):
+                pos = _skipdoctype(text, start)
+            else:
+                break
+        except PrologIncomplete:
+            if not eof:
+                raise
+            _prologerror(text, start, "unclosed token")
+
+    # We have found the start tag of the root element
+    name = XMLNAME.match(text, start + 1)
+    if name is None:
+        _prologerror(text, start, "not well-formed (invalid token)")
+
+    tagend = STARTTAG_END.match(text, name.end())
+    if tagend is None:
+        if not eof:
+            raise PrologIncomplete()
+        _prologerror(text, start, "unclosed token")
+
+    # validate the start tag with its attributes
+    roottag = name.group(0)
+    starttag = re.compile(compilestarttag(re.escape(roottag)).pattern + r"\Z")
+    if not starttag.match(text, start, tagend.end()):
+        _prologerror(text, start, "not well-formed (invalid token)")
+
+    # the start tag includes any text until the next markup
+    end = text.find("<", tagend.end())
+    if end == -1:
+        if not eof:
+            raise PrologIncomplete()
+        end = length
+
+    return {'header':  text[:start],
+            'root':    text[start:end].rstrip(' '),
+            'offset':  start,
+            'roottag': roottag,
+           }
+
+
+def findprolog(source, maxsize=-1, chunksize=4096):
     """Returns a dictionary with essential information about the prolog
 
+    Only the beginning of the source is read, until the start tag of
+    the root element is found.
+
     :param source:
     :type source: source, file object, or file-like object
                   expected to be well-formed
-    :param int maxize: Maximum size of bytes to read into XML buffer
+    :param int maxsize: Maximum size of characters to read into XML buffer
+                        (-1 = no limit)
+    :param int chunksize: Size of characters which are read at once
     :return: { 'header': '...', # str everything before the start tag
                'root':   '...', # str: start tag from '<' til '>'
                'offset:  1,     # Integer
+               'roottag': '...' # str: name of the root element
              }
     :rtype: dict
+    :raise DMXmlParseError: if the prolog is not well-formed
     """
-    logmgr_flog()
-
-    result = {}
-
-    # context is used to save our locations
-    context = []
-
-    buf = ensurefileobj(source)
-    # We read in maxsize and hope this is enough...
-    xmlbuf = buf.read(maxsize)
-    buf.seek(0)
-    locstm = LocatingWrapper(buf)
-    parser = xml.sax.make_parser()
-
-    # Disable certain features:
-    # no validation, no external general and parameter entities
-    parser.setFeature(xml.sax.handler.feature_validation, False)
-    parser.setFeature(xml.sax.handler.feature_external_ges, False)
-    parser.setFeature(xml.sax.handler.feature_external_pes, False)
-
-    handler = Handler(context, locstm)
-    parser.setProperty(xml.sax.handler.property_lexical_handler, handler);
-
-    parser.setContentHandler(handler)
-    parser.parse(locstm)
-
-    first = context[0]
-    soffset = first[1].offset
-    doctype = xmlbuf[:soffset]
-
-    # Check if we have reached the "end tag" (symbolized with '/' in
-    # its first character).
-    # If yes, start and end tag is on the same line and we can use the
-    # last entry.
-    # If not, we need to look in the next entry
-    if context[1][0][0] == '/':
-        last = context[-1]
-    elif context[1][0][0] ==  '-':
-        last = context[1]
-    else:
-        last = context[1]
+    buf = openfileobj(source)
+    text = ""
 
-    eoffset = last[1].offset
-    starttag = xmlbuf[soffset:eoffset].rstrip(' ')
+    try:
+        while True:
+            if maxsize != -1:
+                chunksize = min(chunksize, maxsize - len(text))
 
-    result['header'] = doctype
-    result['root'] = starttag
-    result['offset'] = len(doctype)
-    result['roottag'] = context[0][0]
+            data = buf.read(chunksize)
+            text += data
+            eof = not data or len(text) == maxsize
+
+            try:
+                return scanprolog(text, eof)
+            except PrologIncomplete:
+                continue
+    finally:
+        if isinstance(buf, StringIO):
+            buf.seek(0)
+        else:
+            # we have opened the file ourselves
+            buf.close()
+
+# Namespace declarations in a start tag
+NSDECL = re.compile("[ \t\r\n]+xmlns(?::([-a-zA-Z0-9._]+))?[ \t\r\n]*=[ \t\r\n]*"
+                    "(?:\"([^\"]*)\"|'([^']*)')")
+
+
+def findelementspan(text, qname, offset=0):
+    """Returns the position of an element in the (unparsed) text
+
+    The element has to occur exactly once after offset; there must not
+    be any comments or CDATA sections inside of it.
+
+    :param text: The XML text
+    :type text: str, bytes, or mmap (then the positions are byte offsets)
+    :param str qname: The qualified name of the element, like
+                      'dm:docmanager'
+    :param int offset: Start searching from here
+    :return: (start, end) of the element, end is exclusive; or None if
+             the element could not be found unambiguously
+    :rtype: tuple
+    """
+    binary = not isinstance(text, str)
+
+    def pattern(expr):
+        return re.compile(expr.encode() if binary else expr)
+
+    def literal(value):
+        return value.encode() if binary else value
+
+    qname = re.escape(qname)
+    starttags = list(pattern("<{}(?=[ \t\r\n/>])".format(qname)).finditer(text, offset))
+    if len(starttags) != 1:
+        return None
+
+    start = starttags[0].start()
+    tagend = (STARTTAG_END_BYTES if binary else STARTTAG_END).match(text, starttags[0].end())
+    if tagend is None:
+        return None
+
+    if text[tagend.end() - 2:tagend.end() - 1] == literal("/"):
+        # empty element
+        return start, tagend.end()
+
+    endtags = list(pattern("</{}[ \t\r\n]*>".format(qname)).finditer(text, tagend.end()))
+    if len(endtags) != 1:
+        return None
+
+    end = endtags[0].end()
+    content = text[tagend.end():end]
+    if literal("<!--") in content or literal("<![CDATA[") in content:
+        return None
+
+    return start, end
+
+
+def strip_nsdecls(elemtext, original):
+    """Removes all namespace declarations from the start tag of an
+       serialized element which are not in the start tag of the original
+       element text; lxml declares all inherited namespaces when a single
+       element is serialized.
+
+    :param str elemtext: The serialized element
+    :param str original: The original text of the element
+    :return: the element text without the additional declarations
+    :rtype: str
+    """
+    def decls(tag):
+        return { (m.group(1), m.group(2) if m.group(2) is not None else m.group(3))
+                 for m in NSDECL.finditer(tag) }
+
+    tagend = STARTTAG_END.match(original)
+    keep = decls(original[:tagend.end()] if tagend else original)
+
+    tagend = elemtext.index(">")
+    starttag = NSDECL.sub(lambda m: m.group(0) if decls(m.group(0)) <= keep else "",
+                          elemtext[:tagend])
+
+    return starttag + elemtext[tagend:]
 
-    return result
 
 def xml_indent(elem, level=0):
     """Indent XML elements
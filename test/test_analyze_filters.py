@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+
+import pytest
+from docmanager.analyzer import Analyzer, AnalyzeQuery
+from docmanager.exceptions import DMAnalyzeInvalidFilterSyntax
+from docmanager.filters import FilterExpression
+from docmanager.xmlhandler import XmlHandler
+
+DOCUMENT = """<article xmlns="http://docbook.org/ns/docbook"
+         xmlns:dm="urn:x-suse:ns:docmanager" version="5.0">
+  <title>Filters</title>
+  <info>
+    <dm:docmanager>
+      <dm:maintainer team="doc">toms</dm:maintainer>
+      <dm:status>editing</dm:status>
+      <dm:priority>10</dm:priority>
+      <dm:deadline>2026-10-15</dm:deadline>
+      <dm:bugtracker>
+        <dm:component>Documentation</dm:component>
+      </dm:bugtracker>
+    </dm:docmanager>
+  </info>
+  <para>Bla</para>
+</article>
+"""
+
+
+@pytest.mark.parametrize("filters,matched", [
+    (["status=editing"],                        True),
+    (["+status=editing"],                       True),
+    (["-status=editing"],                       False),
+    (["status!=editing"],                       False),
+    (["missing!=editing"],                      False),
+    (["priority>=5"],                           True),
+    (["priority > 9", "priority<11"],           True),
+    (["priority<9"],                            False),
+    (["deadline<2026-11-01"],                   True),
+    (["deadline>=2026-11-01"],                  False),
+    (["status in editing,edited"],              True),
+    (["status not in editing,edited"],          False),
+    (["maintainer~^to"],                        True),
+    (["maintainer!~^to"],                       False),
+    (["bugtracker/component=Documentation"],    True),
+    (["maintainer@team=doc"],                   True),
+    (["maintainer@team in qa, l10n"],           False),
+    (["maintainer@missing=doc"],                False),
+])
+def test_analyze_filters(filters, matched, tmpdir):
+    """Checks the filter expressions on a file"""
+    xmlfile = tmpdir / "filters.xml"
+    xmlfile.write(DOCUMENT)
+
+    handler = XmlHandler(str(xmlfile), True, True)
+    analyzer = Analyzer(handler)
+    data = analyzer.fetch_data(AnalyzeQuery({"status"}, filters))
+
+    assert analyzer.filters_matched == matched
+    assert data == ({"status": "editing"} if matched else {})
+
+
+@pytest.mark.parametrize("expression", ["status", "=editing", "maintainer~(",
+                                        "a//b=c", "status in"])
+def test_analyze_filters_invalid(expression):
+    """Checks that invalid filters are rejected"""
+    with pytest.raises(DMAnalyzeInvalidFilterSyntax):
+        FilterExpression([expression])
+
+
+def test_analyze_filters_lookup():
+    """Checks that the expression only asks for the keys of its filters"""
+    predicate = FilterExpression(["priority>=5", "maintainer@team=doc", "priority<10"])
+    values = {"priority": "7", "maintainer@team": "doc", "status": "edited"}
+    asked = list()
+
+    def lookup(key):
+        asked.append(key)
+        return values.get(key)
+
+    assert predicate.keys == ["priority", "maintainer@team"]
+    assert predicate(lookup)
+    assert set(asked) == {"priority", "maintainer@team"}
@@ -1,8 +1,11 @@
 #!/usr/bin/python3
 
+import pickle
 import pytest
 import shlex
 from docmanager.action import Actions
+from docmanager.analyzer import Analyzer, AnalyzeQuery, QueryFormat
+from docmanager.xmlhandler import XmlHandler
 from docmanager.cli import parsecli
 
 def test_analyze_sort_0(testdir, tmpdir, capsys):
@@ -31,3 +34,38 @@ def test_analyze_sort_0(testdir, tmpdir, capsys):
     assert not err
     for i in expected_output:
         assert i in out
+
+
+@pytest.mark.parametrize("queryformat, line", [
+    ("{maintainer} {status}",       "toms editing"),
+    ("{os.file}: {status}",         "x.xml: editing"),
+    ("{{status}} {missing}!",       "{{status}} !"),
+    ("\\{status} {status",          "\\{status} {status"),
+    ("{status}{status}",            "editingediting"),
+])
+def test_analyze_queryformat(queryformat, line):
+    """Checks the compiled query format"""
+
+    class Handler(object):
+        filename = "x.xml"
+
+    template = QueryFormat(queryformat)
+    data = {"maintainer": "toms", "status": "editing"}
+
+    assert template.render(Handler(), data) == line
+    assert template.fields <= {"maintainer", "status", "missing"}
+
+
+def test_analyze_query_pickle(testdir):
+    """Checks that a compiled query can be sent to a worker process"""
+    handler = XmlHandler(str(testdir / "analyze_output-1.xml"), True, True)
+    query = AnalyzeQuery({"maintainer"}, ["status=wip"], "priority")
+    data = Analyzer(handler).fetch_data(query)
+
+    assert data == {"maintainer": "mschnitzer", "priority": "1"}
+    assert Analyzer(handler).fetch_data(pickle.loads(pickle.dumps(query))) == data
+
+    query = AnalyzeQuery({"maintainer"}, ["-status=wip"])
+    analyzer = Analyzer(handler)
+    assert analyzer.fetch_data(query) == {}
+    assert not analyzer.filters_matched
@@ -54,3 +54,80 @@ def test_analyze_sort_1(testdir, tmpdir, capsys):
 
     assert not err
     assert expected_output == out
+
+
+@pytest.mark.parametrize("options,expected_output", [
+    ('-s priority -l 2',            "1\n2\n"),
+    ('-s priority -r -l 2',         "10\n2\n"),
+    ('-s priority -r',              "10\n2\n1\n"),
+    ('-l 1',                        "1\n"),
+    ('-s priority -l 0',            ""),
+])
+def test_analyze_sort_limit(options, expected_output, testdir, tmpdir, capsys):
+    """ Test the analyze limit and reverse options """
+
+    xmlset = [ "analyze_sort-{}.xml".format(i) for i in range(1, 4) ]
+    for base in xmlset:
+        (testdir / base).copy(tmpdir)
+    xmlfiles = [ str(tmpdir / base) for base in xmlset ]
+
+    clicmd = 'analyze -qf "{{priority}}" -q {} {}'.format(options, " ".join(xmlfiles))
+    Actions(parsecli(shlex.split(clicmd))).parse()
+    out, err = capsys.readouterr()
+
+    assert not err
+    assert expected_output == out
+
+
+def test_analyze_group_by(testdir, tmpdir, capsys):
+    """ Test the analyze group-by feature """
+
+    xmlset = [ "analyze_sort-{}.xml".format(i) for i in range(1, 4) ] + \
+             [ "analyze_output-{}.xml".format(i) for i in range(1, 4) ]
+    for base in xmlset:
+        (testdir / base).copy(tmpdir)
+    xmlfiles = [ str(tmpdir / base) for base in xmlset ]
+
+    clicmd = 'analyze -g status -a count -a min:priority -a max:maintainer ' \
+             '-s count -r -l 3 {}'.format(" ".join(xmlfiles))
+    Actions(parsecli(shlex.split(clicmd))).parse()
+    out, err = capsys.readouterr()
+
+    assert not err
+    assert out.startswith("status\tcount\tmin:priority\tmax:maintainer\n"
+                          "a\t3\t1\tc\n"
+                          "done\t1\t10\ttoms\n"
+                          "editing\t1\t4\tfs\n")
+
+
+@pytest.mark.parametrize("option", ["-a sum:priority", "-a min", "-a count:status", "-l -1"])
+def test_analyze_group_by_invalid(option):
+    """ Test that invalid aggregates and limits are rejected """
+
+    with pytest.raises(SystemExit):
+        parsecli(shlex.split("analyze -g status {} x.xml".format(option)))
+
+
+def test_analyze_limit_stops(testdir, tmpdir, capsys, monkeypatch):
+    """ Test that analyze -l without sort stops after the limit """
+
+    (testdir / "analyze_sort-1.xml").copy(tmpdir)
+    xmlfile = str(tmpdir / "analyze_sort-1.xml")
+    consumed = []
+
+    def run_jobs(self, job, *jobargs):
+        try:
+            for i in range(100):
+                consumed.append(i)
+                yield { "file": xmlfile, "line": str(i), "data": {} }
+        finally:
+            consumed.append("closed")
+
+    monkeypatch.setattr(Actions, "run_jobs", run_jobs)
+
+    clicmd = 'analyze -qf "{{priority}}" -q -l 2 {}'.format(xmlfile)
+    Actions(parsecli(shlex.split(clicmd))).parse()
+    out, _ = capsys.readouterr()
+
+    assert out == "0\n1\n"
+    assert consumed == [0, 1, "closed"]
@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+
+import os
+import pytest
+import shlex
+from docmanager.action import Actions
+from docmanager.batch import parse_script_line
+from docmanager.cli import parsecli
+from docmanager.xmlhandler import XmlHandler
+
+SCRIPT = """# release preparation
+set -p status=editing -p priority=2
+["set-attr", "-p", "status", "-a", "team=doc"]
+
+{"command": "analyze", "args": ["-qf", "{priority}:{status}"]}
+"""
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("set -p 'a=b c'",                       ["set", "-p", "a=b c"]),
+    ('["get", "-p", "status"]',              ["get", "-p", "status"]),
+    ('{"command": "get", "args": ["-p", "x"]}', ["get", "-p", "x"]),
+    ("  # comment",                          None),
+    ("",                                     None),
+])
+def test_batch_script_line(line, expected):
+    """Checks the shell-like and the JSON syntax of batch scripts"""
+    assert parse_script_line(line) == expected
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_batch(executor, testdir, tmpdir, capsys):
+    """Checks that all sub commands run and every file is written once"""
+    xmlfiles = []
+    for base in ["test-dm-status-1.xml", "test-dm-status-2.xml"]:
+        (testdir / base).copy(tmpdir)
+        xmlfiles.append(str(tmpdir / base))
+
+    script = tmpdir / "script"
+    script.write(SCRIPT)
+
+    clicmd = "--executor {} batch -s {} {}".format(executor, script, " ".join(xmlfiles))
+    Actions(parsecli(shlex.split(clicmd))).parse()
+    out, _ = capsys.readouterr()
+
+    assert "2:editing\n2:editing\n" in out
+    for f in xmlfiles:
+        xml = XmlHandler(f)
+        assert xml.get(["status", "priority"]) == {"status": "editing", "priority": "2"}
+        assert xml.get_attr(["status"], ["team"]) == {"status": {"team": "doc"}}
+
+
+def test_batch_invalid_command(testdir, tmpdir):
+    """Checks that sub commands like config are rejected before any write"""
+    xmlfile = str(testdir / "test-dm-status-1.xml")
+    script = tmpdir / "script"
+    script.write("set -p status=editing\nconfig --user general.foo\n")
+    mtime = os.path.getmtime(xmlfile)
+
+    with pytest.raises(SystemExit):
+        Actions(parsecli(["batch", "-s", str(script), xmlfile])).parse()
+
+    assert os.path.getmtime(xmlfile) == mtime
@@ -1,6 +1,6 @@
 
 import configparser
-from docmanager.config import docmanagerconfig
+from docmanager.config import docmanagerconfig, default_configfiles, find_git_root
 from docmanager.exceptions import DMConfigFileNotFound
 from docmanager.cli import parsecli
 import os
@@ -60,4 +60,16 @@ def test_docmanager_allconfigfiles(tmp_valid_xml):
     assert args
     assert args.config
     assert args.config.configfiles
-    assert args.config.usedconfigfile
\ No newline at end of file
+    assert args.config.usedconfigfile
+
+def test_docmanager_find_git_root(tmpdir, monkeypatch):
+    """Checks that the Git repository is found without git"""
+    subdir = tmpdir.mkdir("repo").mkdir("a").mkdir("b")
+    (tmpdir / "repo").mkdir(".git")
+
+    assert find_git_root(subdir.strpath) == (tmpdir / "repo").strpath
+
+    monkeypatch.chdir(subdir)
+    configfiles = default_configfiles(include_etc=False)
+    assert configfiles[-1] == (tmpdir / "repo" / ".git" / "docmanager.conf").strpath
+    assert default_configfiles(include_etc=False) == configfiles
@@ -0,0 +1,148 @@
+#!/usr/bin/python3
+
+import os
+import pytest
+import shlex
+from docmanager.action import Actions
+from docmanager.cli import parsecli
+from docmanager.core import ReturnCodes
+from docmanager.dcfile import DependencyGraph, is_dc_file, read_dc_file
+
+SET = """<set xmlns="http://docbook.org/ns/docbook"
+     xmlns:xi="http://www.w3.org/2001/XInclude" version="5.0" xml:id="set">
+  <title>Set</title>
+  <xi:include href="book-a.xml"/>
+  <xi:include href="book-b.xml"/>
+  <xi:include href="legal.txt" parse="text"/>
+</set>
+"""
+
+BOOK = """<book xmlns="http://docbook.org/ns/docbook"
+      xmlns:xi="http://www.w3.org/2001/XInclude"
+      xmlns:dm="urn:x-suse:ns:docmanager" version="5.0" xml:id="book-{0}">
+  <title>Book {0} &product;</title>
+  <info>
+    <dm:docmanager>
+      <dm:status>{0}</dm:status>
+    </dm:docmanager>
+  </info>
+  <xi:include href="chapter-{0}.xml"/>
+  <xi:include href="common.xml"/>
+</book>
+"""
+
+CHAPTER = """<chapter xmlns="http://docbook.org/ns/docbook"
+         xmlns:dm="urn:x-suse:ns:docmanager" version="5.0">
+  <title>Chapter</title>
+  <info>
+    <dm:docmanager>
+      <dm:status>{0}</dm:status>
+    </dm:docmanager>
+  </info>
+  <para>Chapter</para>
+</chapter>
+"""
+
+
+@pytest.fixture
+def docdir(tmpdir, monkeypatch):
+    """Creates a DAPS documentation directory with two books in a set"""
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmpdir / "cache"))
+    xmldir = tmpdir.mkdir("xml")
+    (xmldir / "MAIN.xml").write(SET)
+    for name in "ab":
+        (xmldir / "book-{}.xml".format(name)).write(BOOK.format(name))
+        (xmldir / "chapter-{}.xml".format(name)).write(CHAPTER.format("chapter-" + name))
+    (xmldir / "common.xml").write(CHAPTER.format("common"))
+    (tmpdir / "DC-set").write('## The whole set\nMAIN="MAIN.xml"\n')
+    (tmpdir / "DC-book-b").write("MAIN=MAIN.xml # main file\nROOTID='book-b'\n")
+    return tmpdir
+
+
+def names(files):
+    return [ os.path.basename(f) for f in files ]
+
+
+def test_dcfile_resolve(docdir):
+    """Checks the files of a set and of a single book"""
+    graph = DependencyGraph()
+
+    assert is_dc_file(str(docdir / "DC-set"))
+    assert not is_dc_file(str(docdir / "xml" / "MAIN.xml"))
+    assert read_dc_file(str(docdir / "DC-book-b")) == {"MAIN": "MAIN.xml", "ROOTID": "book-b"}
+
+    assert names(graph.resolve(str(docdir / "DC-set"))) == [
+        "MAIN.xml", "book-a.xml", "chapter-a.xml", "common.xml", "book-b.xml", "chapter-b.xml"]
+    assert names(graph.resolve(str(docdir / "DC-book-b"))) == [
+        "book-b.xml", "chapter-b.xml", "common.xml"]
+
+
+def test_dcfile_cache(docdir, monkeypatch):
+    """Checks that only changed files are scanned again"""
+    graph = DependencyGraph()
+    graph.resolve(str(docdir / "DC-set"))
+    graph.save()
+
+    scanned = list()
+    scan = DependencyGraph.scan
+
+    def record(fname):
+        scanned.append(os.path.basename(fname))
+        return scan(fname)
+
+    monkeypatch.setattr(DependencyGraph, "scan", staticmethod(record))
+
+    chapter = docdir / "xml" / "chapter-a.xml"
+    chapter.write(CHAPTER.format("changed") + " ")
+
+    files = DependencyGraph().resolve(str(docdir / "DC-set"))
+    assert len(files) == 6
+    assert scanned == ["chapter-a.xml"]
+
+
+def test_dcfile_unreadable(docdir, monkeypatch):
+    """Checks that a file which cannot be read is a file without XIncludes"""
+    scan = DependencyGraph.scan
+
+    def unreadable(fname):
+        if os.path.basename(fname) == "book-a.xml":
+            raise PermissionError(13, "Permission denied", fname)
+        return scan(fname)
+
+    monkeypatch.setattr(DependencyGraph, "scan", staticmethod(unreadable))
+
+    graph = DependencyGraph()
+    assert names(graph.resolve(str(docdir / "DC-set"))) == [
+        "MAIN.xml", "book-a.xml", "book-b.xml", "chapter-b.xml", "common.xml"]
+    assert str(docdir / "xml" / "book-a.xml") not in graph.nodes
+
+
+@pytest.mark.parametrize("content", [b"", b"\x7fELF\x02\x01\x01\x00\x00\xff\xfe"])
+def test_dcfile_not_xml(docdir, content):
+    """Checks that an included file which is not XML has no XIncludes"""
+    (docdir / "xml" / "book-a.xml").write_binary(content)
+
+    graph = DependencyGraph()
+    assert names(graph.resolve(str(docdir / "DC-set"))) == [
+        "MAIN.xml", "book-a.xml", "book-b.xml", "chapter-b.xml", "common.xml"]
+
+
+def test_dcfile_cli(docdir):
+    """Checks that a DC file on the command line is replaced by its files"""
+    clicmd = "get -p status {}".format(docdir / "DC-book-b")
+    res = Actions(parsecli(shlex.split(clicmd))).parse()
+
+    assert [ (os.path.basename(f), data) for f, data in res['data'] ] == [
+        ("book-b.xml", {"status": "b"}),
+        ("chapter-b.xml", {"status": "chapter-b"}),
+        ("common.xml", {"status": "common"})]
+
+
+def test_dcfile_invalid(docdir):
+    """Checks that a DC file without MAIN is rejected"""
+    (docdir / "DC-broken").write("ROOTID=book-a\n")
+
+    with pytest.raises(SystemExit) as err:
+        parsecli(shlex.split("get {}".format(docdir / "DC-broken")))
+
+    assert err.value.code == ReturnCodes.E_INVALID_DC_FILE
@@ -0,0 +1,85 @@
+#!/usr/bin/python3
+
+import pytest
+import re
+import shlex
+from docmanager.action import Actions
+from docmanager.cli import parsecli
+
+
+def copy_files(testdir, tmpdir, xmlset):
+    """Copies XML test files into tmpdir and returns their new names"""
+    for base in xmlset:
+        (testdir / base).copy(tmpdir)
+    return [ str(tmpdir / base) for base in xmlset ]
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_executor_get(executor, testdir, tmpdir):
+    """Checks if both executors return the same properties"""
+    xmlfiles = copy_files(testdir, tmpdir, ["test-dm-status-1.xml",
+                                            "test-dm-status-2.xml",
+                                            "broken_xml_file.xml"])
+
+    clicmd = "--executor {} -j 2 get -p status {}".format(executor, " ".join(xmlfiles))
+    res = Actions(parsecli(shlex.split(clicmd))).parse()
+
+    assert res['data'] == [ (xmlfiles[0], {'status': 'a'}),
+                            (xmlfiles[1], {'status': 'b'}) ]
+    assert [ i[0] for i in res['errors'] ] == [ xmlfiles[2] ]
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_executor_set(executor, testdir, tmpdir, capsys):
+    """Checks if the worker processes write the files"""
+    xmlfiles = copy_files(testdir, tmpdir, ["test-dm-status-1.xml",
+                                            "test-dm-status-2.xml"])
+
+    clicmd = "--executor {} set -p status=editing {}".format(executor, " ".join(xmlfiles))
+    Actions(parsecli(shlex.split(clicmd))).parse()
+
+    clicmd = "analyze -qf {{status}} -q -s filename {}".format(" ".join(xmlfiles))
+    Actions(parsecli(shlex.split(clicmd))).parse()
+    out, _ = capsys.readouterr()
+
+    assert out.endswith("editing\nediting\n")
+
+
+def test_executor_invalid(testdir, tmpdir):
+    """Checks that an invalid executor is rejected"""
+    xmlfiles = copy_files(testdir, tmpdir, ["test-dm-status-1.xml"])
+
+    with pytest.raises(SystemExit):
+        parsecli(shlex.split("--executor fibers get {}".format(xmlfiles[0])))
+
+
+def test_executor_unchanged(testdir, tmpdir, capsys):
+    """Checks that files with the same values are not written"""
+    xmlfiles = copy_files(testdir, tmpdir, ["test-dm-status-1.xml",
+                                            "test-dm-status-2.xml"])
+
+    clicmd = "-j 2 set -p status=a {}".format(" ".join(xmlfiles))
+    Actions(parsecli(shlex.split(clicmd))).parse()
+    out, _ = capsys.readouterr()
+
+    out = re.sub("\x1b\\[[0-9;]*m", "", out)
+
+    assert "Wrote 1 valid XML file. Left 1 XML file unchanged." in out
+    assert re.search(r"unchanged\. Writing took [0-9]+\.[0-9] ms\.", out)
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_executor_stop_on_error(executor, testdir, tmpdir):
+    """Checks that --stop-on-error stops before any file is written"""
+    xmlfiles = copy_files(testdir, tmpdir, ["test-dm-status-1.xml",
+                                            "broken_xml_file.xml",
+                                            "test-dm-status-2.xml"])
+    before = [ open(f).read() for f in xmlfiles ]
+
+    clicmd = "--executor {} set --stop-on-error -p status=stopped {}".format(
+             executor, " ".join(xmlfiles))
+    with pytest.raises(SystemExit) as err:
+        Actions(parsecli(shlex.split(clicmd))).parse()
+
+    assert err.value.code
+    assert [ open(f).read() for f in xmlfiles ] == before
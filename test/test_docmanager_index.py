@@ -0,0 +1,85 @@
+#!/usr/bin/python3
+
+import os
+import pytest
+import shlex
+from docmanager import jobs
+from docmanager.action import Actions
+from docmanager.cli import parsecli
+
+
+@pytest.fixture
+def xmlfiles(testdir, tmpdir, monkeypatch):
+    """Copies XML test files into tmpdir and uses a private index"""
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmpdir / "cache"))
+    names = ["test-dm-status-1.xml", "test-dm-status-2.xml"]
+    for base in names:
+        (testdir / base).copy(tmpdir)
+    return [ str(tmpdir / base) for base in names ]
+
+
+def run(clicmd):
+    return Actions(parsecli(shlex.split(clicmd))).parse()
+
+
+def test_index_get(xmlfiles, capsys):
+    """Checks that get returns the same data with and without the index"""
+    files = " ".join(xmlfiles)
+    run("index rebuild {}".format(files))
+
+    uncached = run("get -p status {}".format(files))
+    cached = run("--use-index get -p status {}".format(files))
+
+    assert cached == uncached
+    assert cached['data'][0][1] == {'status': 'a'}
+
+
+def test_index_stale(xmlfiles):
+    """Checks that changed files are parsed again"""
+    run("--use-index get -p status {}".format(xmlfiles[0]))
+    run("set -p status=editing {}".format(xmlfiles[0]))
+
+    # make sure the modification time differs from the indexed one
+    stat = os.stat(xmlfiles[0])
+    os.utime(xmlfiles[0], (stat.st_atime, stat.st_mtime + 10))
+
+    res = run("--use-index get -p status {}".format(xmlfiles[0]))
+    assert res['data'][0][1] == {'status': 'editing'}
+
+
+def test_index_status_clear(xmlfiles, capsys):
+    """Checks the status and clear actions"""
+    run("index rebuild {}".format(xmlfiles[0]))
+    capsys.readouterr()
+
+    run("index status {}".format(" ".join(xmlfiles)))
+    out, _ = capsys.readouterr()
+    assert "Indexed files: 1" in out
+    assert "Up to date: 1, changed: 0, not indexed or removed: 1" in out
+
+    run("index clear")
+    run("index status")
+    out, _ = capsys.readouterr()
+    assert "Indexed files: 0" in out
+
+
+def test_index_analyze_filter(xmlfiles, capsys, monkeypatch):
+    """Checks that analyze doesn't open files whose indexed values don't match"""
+    files = " ".join(xmlfiles)
+    run("index rebuild {}".format(files))
+    capsys.readouterr()
+
+    opened = list()
+    open_handler = jobs.open_handler
+
+    def record(fname, *args):
+        opened.append(fname)
+        return open_handler(fname, *args)
+
+    monkeypatch.setattr(jobs, "open_handler", record)
+
+    run("--executor thread --use-index analyze -qf {{status}} -f 'status in a,c' {}".format(files))
+    out, _ = capsys.readouterr()
+
+    assert out.startswith("a\n")
+    assert opened == xmlfiles[:1]
@@ -4,6 +4,8 @@ import pytest
 from docmanager.cli import parsecli
 from docmanager.action import Actions
 from docmanager.core import ReturnCodes
+from docmanager import urlcheck
+from docmanager.urlcheck import URLCheck, is_valid_url
 
 @pytest.mark.parametrize("option,correct,wrong", [
     #('maintainer', 'SUSE', ''),
@@ -40,3 +42,45 @@ def test_docmanager_inputformatcheck(option, correct, wrong, tmp_valid_xml, caps
         code = e.code
         
     assert 0 == code, "Wrong exit code. Expected 0 but got {}.".format(code)
+
+
+@pytest.mark.parametrize("url,expected", [
+    ('https://github.com/openSUSE/docmanager', True),
+    ('git://github.com/openSUSE/docmanager.git', True),
+    ('ssh://git@github.com:22/openSUSE/docmanager', True),
+    ('bla', False),
+    ('http://', False),
+    ('file:///etc/passwd', False),
+    ('http://example.com:port/', False),
+])
+def test_docmanager_urlsyntax(url, expected):
+    """Checks the syntax check of repository URLs"""
+    assert is_valid_url(url) == expected
+
+
+def test_docmanager_urlcheck_cache(tmpdir, monkeypatch, caplog):
+    """Checks that a URL is requested only once per TTL"""
+    requests = []
+
+    def request_url(url, timeout):
+        requests.append(url)
+        return "Not reachable."
+
+    monkeypatch.setattr(urlcheck, "request_url", request_url)
+    cachefile = str(tmpdir / "urlcheck.json")
+    url = 'https://example.com/repo'
+
+    check = URLCheck(url, cachefile, ttl=60)
+    check.wait()
+    assert requests == [url]
+    assert urlcheck.read_cache(cachefile)[url][1] == "Not reachable."
+
+    # the second check uses the cache and doesn't start a thread
+    check = URLCheck(url, cachefile, ttl=60)
+    assert check.thread is None
+    assert check.message == "Not reachable."
+    assert requests == [url]
+
+    # an expired result is requested again
+    URLCheck(url, cachefile, ttl=0).wait()
+    assert requests == [url, url]
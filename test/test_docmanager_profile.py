@@ -0,0 +1,49 @@
+#!/usr/bin/python3
+
+import pstats
+import pytest
+from docmanager import run
+from docmanager.cli import optional_value, parsecli
+from docmanager.core import PROFILE_FILE, ReturnCodes
+
+
+@pytest.mark.parametrize("cliargs,expected", [
+    (["--profile", "get", "a.xml"], ["--profile=" + PROFILE_FILE, "get", "a.xml"]),
+    (["--profile=out.pstats", "get"], ["--profile=out.pstats", "get"]),
+    (["-j", "2", "--profile", "get"], ["-j", "2", "--profile=" + PROFILE_FILE, "get"]),
+    (["get", "--profile"], ["get", "--profile"]),
+])
+def test_profile_optional_value(cliargs, expected):
+    """Checks that the sub command is never taken as the file of --profile"""
+    assert optional_value(cliargs, "--profile", PROFILE_FILE) == expected
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_profile_workers(executor, testdir, tmpdir, capsys):
+    """Checks that the merged stats contain the jobs of all workers"""
+    for base in ("test-dm-status-1.xml", "test-dm-status-2.xml"):
+        (testdir / base).copy(tmpdir)
+    xmlfiles = [ str(tmpdir / "test-dm-status-1.xml"), str(tmpdir / "test-dm-status-2.xml") ]
+    pstatsfile = str(tmpdir / "dm.pstats")
+
+    with pytest.raises(SystemExit):
+        run(["--profile=" + pstatsfile, "--executor", executor, "-j", "2",
+             "get", "-p", "status"] + xmlfiles)
+    _, err = capsys.readouterr()
+
+    assert "written to {!r}".format(pstatsfile) in err
+
+    stats = pstats.Stats(pstatsfile).stats
+    calls = [ value[1] for (fname, _, func), value in stats.items()
+              if func == "run_job" and fname.endswith("jobs.py") ]
+
+    # run_job is only called by the workers
+    assert calls == [2]
+
+
+def test_profile_with_trace(capsys):
+    """Checks that --profile and --trace can't be combined"""
+    with pytest.raises(SystemExit) as exc:
+        parsecli(["--profile", "--trace", "all", "get", "-p", "status", "a.xml"])
+
+    assert exc.value.code == ReturnCodes.E_INVALID_ARGUMENTS
@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+
+import os
+import pytest
+import threading
+from docmanager import run
+from docmanager.client import forward
+from docmanager.jobs import open_handler
+from docmanager.server import DocManagerServer, HandlerCache
+
+
+@pytest.fixture
+def server(tmpdir):
+    """Fixture: Runs a server in a thread and returns its socket file"""
+    socketfile = str(tmpdir / "dm.sock")
+    srv = DocManagerServer(socketfile, run)
+    thread = threading.Thread(target=srv.serve_forever)
+    thread.start()
+
+    yield socketfile
+
+    srv.shutdown()
+    srv.server_close()
+    thread.join()
+
+
+def test_serve_forward(server, testdir, tmpdir, capsys):
+    """Checks that get and set are answered by the server"""
+    (testdir / "test-dm-status-1.xml").copy(tmpdir)
+    xmlfile = str(tmpdir / "test-dm-status-1.xml")
+
+    assert forward(["get", "-p", "status", xmlfile], server) == 0
+    assert forward(["set", "-p", "status=editing", xmlfile], server) == 0
+    capsys.readouterr()
+
+    assert forward(["get", "-p", "status", xmlfile], server) == 0
+    out, _ = capsys.readouterr()
+    assert out == "editing\n"
+
+    assert forward(["get", "-p", "status", "missing.xml"], server) != 0
+    assert not os.path.exists(str(tmpdir / "missing.xml"))
+
+
+def test_serve_no_server(tmpdir):
+    """Checks that the command runs locally if there is no server"""
+    assert forward(["get", "-p", "status", "a.xml"], str(tmpdir / "dm.sock")) is None
+
+
+def test_handler_cache(testdir, tmpdir):
+    """Checks that the cache drops handlers of modified files"""
+    (testdir / "test-dm-status-1.xml").copy(tmpdir)
+    xmlfile = str(tmpdir / "test-dm-status-1.xml")
+    cache = HandlerCache(maxsize=1)
+
+    def loader():
+        return open_handler(xmlfile, True)
+
+    first = cache.get(xmlfile, loader)
+    assert cache.get(xmlfile, loader) is first
+
+    # a new modification time invalidates the handler
+    stat = os.stat(xmlfile)
+    os.utime(xmlfile, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert cache.get(xmlfile, loader) is not first
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert len(cache) == 1
+
+
+def test_serve_main_no_runtime(server, testdir, tmpdir, monkeypatch, capsys):
+    """Checks that a forwarded command doesn't log the runtime in the client"""
+    import atexit
+    from docmanager import main
+
+    (testdir / "test-dm-status-1.xml").copy(tmpdir)
+    xmlfile = str(tmpdir / "test-dm-status-1.xml")
+    hooks = []
+
+    monkeypatch.setenv("DOCMANAGER_SOCKET", server)
+    monkeypatch.delenv("DOCMANAGER_NO_SERVER", raising=False)
+    monkeypatch.setattr(atexit, "register", lambda *args: hooks.append(args))
+
+    with pytest.raises(SystemExit) as err:
+        main(["get", "-p", "status", xmlfile])
+
+    assert err.value.code == 0
+    assert capsys.readouterr().out == "a\n"
+    assert hooks == []
@@ -0,0 +1,82 @@
+#!/usr/bin/python3
+
+import json
+import pytest
+import time
+from docmanager import run, timings
+
+
+def test_timings_nested_phases():
+    """Checks that nested phases are not counted twice"""
+    timings.enable()
+
+    try:
+        with timings.recording() as phases:
+            with timings.phase("parse"):
+                time.sleep(0.02)
+                with timings.phase("entities"):
+                    time.sleep(0.02)
+    finally:
+        timings.disable()
+
+    assert 0.02 <= phases["parse"][0] < 0.04
+    assert 0.02 <= phases["entities"][0] < 0.04
+    assert phases["total"][0] == pytest.approx(sum(phases[p][0] for p in
+                                                   ("parse", "entities", "other")))
+
+
+def test_timings_disabled():
+    """Checks that nothing is recorded without --timings"""
+    with timings.recording() as phases:
+        with timings.phase("parse"):
+            pass
+
+    assert phases == {}
+
+
+@pytest.mark.parametrize("values,percent,expected", [
+    ([1, 2, 3, 4], 50, 2),
+    ([1, 2, 3, 4], 95, 4),
+    ([5], 95, 5),
+    (list(range(1, 101)), 95, 95),
+])
+def test_timings_percentile(values, percent, expected):
+    """Checks the nearest-rank percentiles"""
+    assert timings.percentile(values, percent) == expected
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_timings_json(executor, testdir, tmpdir, capsys):
+    """Checks the JSON summary of --timings"""
+    for base in ("test-dm-status-1.xml", "test-dm-status-2.xml"):
+        (testdir / base).copy(tmpdir)
+    xmlfiles = [ str(tmpdir / "test-dm-status-1.xml"), str(tmpdir / "test-dm-status-2.xml") ]
+
+    with pytest.raises(SystemExit):
+        run(["--timings", "--timings-format", "json", "--executor", executor,
+             "set", "-p", "status=editing"] + xmlfiles)
+    _, err = capsys.readouterr()
+
+    summary = json.loads(err)
+    phases = { p["phase"]: p for p in summary["phases"] }
+
+    assert { "config", "command", "parse", "job", "write", "total" } <= set(phases)
+    assert phases["total"]["count"] == 2
+    assert phases["total"]["p50"] <= phases["total"]["p95"] <= phases["total"]["max"]
+    assert sorted(f["file"] for f in summary["slowest"]) == xmlfiles
+    assert not timings.ENABLED
+
+
+def test_timings_text(testdir, tmpdir, capsys):
+    """Checks the text summary of --timings"""
+    (testdir / "test-dm-status-1.xml").copy(tmpdir)
+    xmlfile = str(tmpdir / "test-dm-status-1.xml")
+
+    with pytest.raises(SystemExit):
+        run(["--timings", "get", "-p", "status", xmlfile])
+    out, err = capsys.readouterr()
+
+    assert out == "a\n"
+    assert err.startswith("Timings (ms):")
+    assert "Slowest files (ms):" in err
+    assert err.rstrip().endswith(xmlfile)
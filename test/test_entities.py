@@ -1,6 +1,7 @@
 #
 
 import pytest
+import sys
 
 from io import StringIO
 from docmanager.xmlutil import preserve_entities, recover_entities, \
@@ -41,6 +42,54 @@ def test_restore_entities(text, expected):
     assert result == expected
 
 
+@pytest.mark.parametrize("text, expected", [
+  ("a &welt; b",        "a {s}welt{e} b"),
+  ("a &#xa0; b",        "a &#xa0; b"),
+  ("a &w_e.lt; b",      "a {s}w_e.lt{e} b"),
+  ("a &ab1; b &cde; c", "a {s}ab1{e} b {s}cde{e} c"),
+  ("no entities",       "no entities"),
+])
+def test_entities_bytes(text, expected):
+    """Checks preserving and restoring entities in bytes"""
+    expected = expected.format(s=START, e=END)
+    assert preserve_entities(text.encode()) == expected.encode()
+    assert recover_entities(expected.encode()) == text.encode()
+
+
+def test_entities_whole_buffer():
+    """Checks that a whole document gives the same result as line by line"""
+    lines = [ "<para>&prod; {} &ver;&amp; &#xa0;</para>\n".format(i) for i in range(100) ]
+    text = "".join(lines)
+
+    preserved = preserve_entities(text)
+    assert preserved == "".join(preserve_entities(line) for line in lines)
+    assert recover_entities(preserved) == text
+
+
+@pytest.mark.parametrize("func, text", [
+  (preserve_entities, "<para>&prod; &ver;</para>\n" * 5000),
+  (recover_entities,  "<para>[[[prod]]] [[[ver]]]</para>\n" * 5000),
+  (preserve_entities, b"<para>&prod; &ver;</para>\n" * 5000),
+])
+def test_entities_no_python_calls(func, text):
+    """Checks that no Python function runs for every entity"""
+    calls = []
+
+    def profile(frame, event, arg):
+        if event == "call":
+            calls.append(frame.f_code.co_name)
+
+    sys.setprofile(profile)
+    try:
+        func(text)
+    finally:
+        sys.setprofile(None)
+
+    # the calls of the function itself and of the re module for the
+    # compiled pattern, but not 10000 calls for the entities
+    assert len(calls) < 10
+
+
 @pytest.mark.parametrize("textio, expected", [
   (StringIO("a &welt; b"),        "a {s}welt{e} b"),
   (StringIO("a &we-lt; b"),        "a {s}we-lt{e} b"),
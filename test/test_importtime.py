@@ -0,0 +1,60 @@
+#!/usr/bin/python3
+
+import os
+import pytest
+import subprocess
+import sys
+
+# Modules which must only be imported by the sub commands which need them
+HEAVY_MODULES = ("lxml.etree", "prettytable", "urllib.request", "multiprocessing",
+                 "multiprocessing.pool", "docmanager.analyzer", "docmanager.xmlhandler",
+                 "sqlite3", "socketserver")
+
+# Upper limit for the import of the docmanager package (in microseconds)
+IMPORT_BUDGET = 200000
+
+# python -X importtime is available since Python 3.7
+pytestmark = pytest.mark.skipif(sys.version_info < (3, 7),
+                                reason="requires python -X importtime")
+
+MAIN = "import sys; sys.argv[0] = 'docmanager'; from docmanager import main; main()"
+
+
+def importtime(code, *args):
+    """Runs python -X importtime and returns {module: cumulative time}"""
+    env = dict(os.environ, DOCMANAGER_NO_SERVER="1")
+    # the output of the command is skipped with all other lines
+    output = subprocess.check_output([sys.executable, "-X", "importtime", "-c", code] + list(args),
+                                     stderr=subprocess.STDOUT, env=env,
+                                     universal_newlines=True)
+    modules = dict()
+
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative)
+
+    return modules
+
+
+@pytest.mark.parametrize("code, args", [
+    ("import docmanager", []),
+    (MAIN, ["--version"]),
+    (MAIN, ["config", "--help"]),
+])
+def test_importtime_heavy_modules(code, args):
+    """Checks that the package and the light sub commands don't import
+       lxml, prettytable, urllib, or multiprocessing
+    """
+    modules = importtime(code, *args)
+
+    assert "docmanager" in modules
+    assert [ m for m in HEAVY_MODULES if m in modules ] == []
+
+
+def test_importtime_budget():
+    """Checks the import time of the docmanager package"""
+    modules = importtime("import docmanager")
+
+    assert modules["docmanager"] < IMPORT_BUDGET
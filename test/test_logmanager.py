@@ -0,0 +1,50 @@
+#!/usr/bin/python3
+
+import logging
+import sys
+from docmanager.logmanager import logmgr_trace, setloglevel
+from docmanager.xmlutil import localname
+
+
+def test_trace_disabled():
+    """Checks that no profile function is installed without traced modules"""
+    setloglevel(2)
+    logmgr_trace([])
+
+    assert sys.getprofile() is None
+
+
+def test_trace_module(caplog):
+    """Checks that only calls in traced modules are logged"""
+    setloglevel(2)
+    logmgr_trace(["xmlutil"])
+
+    try:
+        with caplog.at_level(logging.DEBUG):
+            localname("{urn:x}foo")
+            logging.getLogger("unrelated").name
+    finally:
+        logmgr_trace([])
+        setloglevel(0)
+
+    calls = [ r.getMessage() for r in caplog.records if "Called function" in r.getMessage() ]
+    assert len(calls) == 1
+    assert '"localname"' in calls[0]
+    assert sys.getprofile() is None
+
+
+def test_setlogstream():
+    """Checks that the log stream is replaced and restored"""
+    import io
+    from docmanager.logmanager import log, setlogstream
+
+    stream = io.StringIO()
+    previous = setlogstream(stream)
+
+    try:
+        setloglevel(0)
+        log.error("to the stream")
+    finally:
+        assert setlogstream(previous) is stream
+
+    assert "to the stream" in stream.getvalue()
@@ -2,6 +2,7 @@
 
 import pytest
 import re
+from docmanager.exceptions import DMXmlParseError
 from docmanager.xmlutil import findprolog
 from io import StringIO
 
@@ -181,3 +182,29 @@ def test_prolog_with_filename(xml, expected, tmpdir):
     result = findprolog(tmp)
     assert result == expected
 
+
+
+@pytest.mark.parametrize("xml,expected",
+                         doctypeslist,
+                         ids=IDS
+                        )
+def test_prolog_with_small_chunks(xml, expected):
+    """Checks if the prolog is found if the source is read in small chunks
+    """
+    result = findprolog(StringIO(xml), chunksize=3)
+    assert result == expected
+
+
+@pytest.mark.parametrize("xml", [
+    "<!DOCTYPE book [ <!ENTITY a 'b'> <book/>",
+    "<!-- unclosed comment <book/>",
+    "text<book/>",
+    "<book id='a/>",
+    "<book<!DOCTYPE book>",
+    "<?xml version='1.0'?>",
+])
+def test_prolog_not_wellformed(xml):
+    """Checks if an invalid prolog raises an error
+    """
+    with pytest.raises(DMXmlParseError):
+        findprolog(xml)
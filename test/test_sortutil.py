@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+
+import pytest
+import random
+from docmanager.sortutil import ExternalSort, GroupBy, TopN, sortkey
+
+
+@pytest.mark.parametrize("reverse", [False, True])
+@pytest.mark.parametrize("buffersize", [1, 3, 1000])
+def test_external_sort(buffersize, reverse):
+    """Checks that the runs are merged in a stable order"""
+    rnd = random.Random(42)
+    records = [ (rnd.randint(0, 20), "line {}".format(i)) for i in range(200) ]
+
+    sorter = ExternalSort(buffersize, reverse)
+    for key, line in records:
+        sorter.add(key, line)
+
+    assert len(sorter) == len(records)
+    assert list(sorter) == sorted(records, key=lambda r: r[0], reverse=reverse)
+
+
+def test_external_sort_empty():
+    """Checks that nothing is returned for an empty sort"""
+    assert list(ExternalSort(2)) == []
+
+
+@pytest.mark.parametrize("reverse", [False, True])
+def test_topn(reverse):
+    """Checks that TopN returns the first records of a stable sort"""
+    rnd = random.Random(42)
+    records = [ (rnd.randint(0, 20), "line {}".format(i)) for i in range(200) ]
+
+    topn = TopN(15, reverse)
+    for key, line in records:
+        topn.add(key, line)
+
+    assert len(topn) == 15
+    assert list(topn) == sorted(records, key=lambda r: r[0], reverse=reverse)[:15]
+
+
+def test_sortkey():
+    """Checks that numbers are sorted as numbers and before text"""
+    values = ["b", "10", "2.5", "a", "-1", "2026-11-01"]
+
+    assert sorted(values, key=sortkey) == ["-1", "2.5", "10", "2026-11-01", "a", "b"]
+
+
+def test_group_by():
+    """Checks the aggregates of GroupBy"""
+    grouper = GroupBy([("count", None), ("min", "priority"), ("max", "priority")])
+    for status, priority in [("a", "2"), ("b", "10"), ("a", "10"), ("a", "")]:
+        grouper.add(status, {"priority": priority})
+
+    assert dict(grouper) == {"a": [3, "2", "10"], "b": [1, "10", "10"]}
+
+
+def test_sortkey_numbers_only():
+    """Checks that only complete numbers are sorted as numbers"""
+    assert sortkey("10")[0] == 0
+    assert sortkey("-1.5")[0] == 0
+    assert sortkey("10a")[0] == 1
+    assert sortkey("10\n")[0] == 1
@@ -0,0 +1,58 @@
+#!/usr/bin/python3
+
+import pytest
+from docmanager.core import NS
+from docmanager.xmlhandler import XmlHandler
+
+BROKEN_BODY = """<!DOCTYPE article [
+<!ENTITY foo "Hallo Welt">
+]>
+<article version="5.0" xml:lang="en"
+        xmlns:dm="urn:x-suse:ns:docmanager"
+        xmlns="http://docbook.org/ns/docbook">
+  <title>Example &foo;</title>
+  <info>
+    <dm:docmanager>
+      <dm:maintainer>toms</dm:maintainer>
+      <dm:bugtracker>
+        <dm:component>Doc</dm:component>
+      </dm:bugtracker>
+    </dm:docmanager>
+  </info>
+  <para>Bla and &foo;</pra>
+  <unclosed>
+"""
+
+def test_readonly_get(tmp_valid_xml):
+    """Checks if the head parse mode returns the properties
+
+    :param py.path.local tmp_valid_xml: Fixture, pointing to a temporary XML file
+    """
+    xml = XmlHandler(tmp_valid_xml.strpath, readonly=True)
+    assert xml.dm is not None
+    assert xml.get(["maintainer"]) == {"maintainer": None}
+
+
+def test_readonly_stops_after_docmanager(tmpdir):
+    """Checks that the body after the dm:docmanager element is never parsed
+
+    :param tmpdir: temporary directory
+    """
+    xmlfile = tmpdir / "broken_body.xml"
+    xmlfile.write(BROKEN_BODY)
+
+    xml = XmlHandler(xmlfile.strpath, readonly=True)
+    assert xml.get_all() == {"maintainer": "toms",
+                             "bugtracker": "\n        ",
+                             "bugtracker/component": "Doc"}
+    assert xml.root.find("d:para", namespaces=NS) is None
+
+
+def test_readonly_no_write(tmp_valid_xml):
+    """Checks that a read-only handler refuses to write
+
+    :param py.path.local tmp_valid_xml: Fixture, pointing to a temporary XML file
+    """
+    xml = XmlHandler(tmp_valid_xml.strpath, readonly=True)
+    with pytest.raises(ValueError):
+        xml.write()
@@ -14,4 +14,19 @@ def test_XmlHandler_tree(tmp_valid_xml):
     """
     xml = XmlHandler(tmp_valid_xml.strpath)
     assert xml, "No XmlHandler could be instantiated"
-    assert xml.tree
\ No newline at end of file
+    assert xml.tree
+
+def test_XmlHandler_release(tmp_valid_xml):
+    """Checks that release drops the tree and that the buffer of the file
+       is not kept
+
+    :param py.path.local tmp_valid_xml: Fixture, pointing to a temporary XML file
+    """
+    xml = XmlHandler(tmp_valid_xml.strpath)
+    assert xml._buffer is None
+    assert not hasattr(xml, "__dict__")
+
+    xml.release()
+    assert xml.tree is None
+    assert xml.dm is None
+    assert xml.filename == tmp_valid_xml.strpath
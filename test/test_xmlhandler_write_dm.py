@@ -0,0 +1,150 @@
+#!/usr/bin/python3
+
+import pytest
+from docmanager.xmlhandler import XmlHandler
+
+HEAD = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE article [
+<!ENTITY foo "Hallo Welt">
+]>
+<article version="5.0" xml:lang="en"
+        xmlns:dm="urn:x-suse:ns:docmanager"
+        xmlns="http://docbook.org/ns/docbook">
+  <title>Example &foo;</title>
+  <info>
+"""
+
+DOCMANAGER = """    <dm:docmanager>
+      <dm:maintainer>toms</dm:maintainer>
+    </dm:docmanager>
+"""
+
+BODY = """  </info>
+  <para   role='x'>Bla and &foo; <emphasis/></para>
+</article>
+"""
+
+
+def test_write_dm_keeps_body(tmpdir):
+    """Checks that write() only replaces the dm:docmanager element
+
+    :param tmpdir: temporary directory
+    """
+    xmlfile = tmpdir / "patch.xml"
+    xmlfile.write(HEAD + DOCMANAGER + BODY)
+
+    xml = XmlHandler(xmlfile.strpath)
+    xml.set({"status": "editing"})
+    xml.write()
+
+    content = xmlfile.read()
+    assert content.startswith(HEAD + "    <dm:docmanager>")
+    assert content.endswith("</dm:docmanager>\n" + BODY)
+
+    xml = XmlHandler(xmlfile.strpath)
+    assert xml.get(["maintainer", "status"]) == {"maintainer": "toms",
+                                                 "status": "editing"}
+
+
+@pytest.mark.parametrize("docmanager", [DOCMANAGER, ""])
+def test_write_dm_encoding(docmanager, tmpdir):
+    """Checks that files are read and written in the encoding of their
+       XML declaration
+
+    :param tmpdir: temporary directory
+    """
+    head = HEAD.replace("UTF-8", "ISO-8859-1").replace("Example", "Beispiel \xfcber")
+    xmlfile = tmpdir / "latin1.xml"
+    xmlfile.write_binary((head + docmanager + BODY).encode("iso-8859-1"))
+
+    xml = XmlHandler(xmlfile.strpath)
+    assert xml.root.find("{http://docbook.org/ns/docbook}title").text.startswith("Beispiel \xfcber")
+
+    xml.set({"maintainer": "J\xf6rg"})
+    xml.set({"status": "\u20ac"})
+    assert xml.write()
+
+    content = xmlfile.read_binary()
+    assert content.startswith(head.encode("iso-8859-1"))
+    assert "<dm:maintainer>J\xf6rg</dm:maintainer>".encode("iso-8859-1") in content
+    assert b"<dm:status>&#8364;</dm:status>" in content
+
+    xml = XmlHandler(xmlfile.strpath)
+    assert xml.get(["maintainer", "status"]) == {"maintainer": "J\xf6rg",
+                                                 "status": "\u20ac"}
+
+
+@pytest.mark.parametrize("docmanager", [
+    # no dm:docmanager element: it has to be created
+    "",
+    # the element name also occurs in a comment
+    "    <!-- <dm:docmanager/> -->\n" + DOCMANAGER,
+])
+def test_write_dm_fallback(docmanager, tmpdir):
+    """Checks that the whole file is written if the element can't be located
+
+    :param tmpdir: temporary directory
+    """
+    xmlfile = tmpdir / "fallback.xml"
+    xmlfile.write(HEAD + docmanager + BODY)
+
+    xml = XmlHandler(xmlfile.strpath)
+    xml.set({"status": "editing"})
+    xml.write()
+
+    xml = XmlHandler(xmlfile.strpath)
+    assert xml.get(["status"]) == {"status": "editing"}
+    assert "<para role=\"x\">" in xmlfile.read()
+
+
+def test_write_atomic(tmpdir):
+    """Checks that write() replaces the file, keeps its permissions and
+       symbolic links, and skips unchanged files
+
+    :param tmpdir: temporary directory
+    """
+    xmlfile = tmpdir / "atomic.xml"
+    xmlfile.write(HEAD + DOCMANAGER + BODY)
+    xmlfile.chmod(0o640)
+    link = tmpdir / "link.xml"
+    link.mksymlinkto(xmlfile)
+
+    xml = XmlHandler(link.strpath)
+    xml.set({"status": "editing"})
+    assert xml.write()
+
+    assert link.islink()
+    assert xmlfile.stat().mode & 0o777 == 0o640
+    assert "<dm:status>editing</dm:status>" in xmlfile.read()
+    assert sorted(f.basename for f in tmpdir.listdir()) == ["atomic.xml", "link.xml"]
+
+    # the serialized document is the same as the file
+    mtime = xmlfile.mtime()
+    assert not xml.write()
+    assert xmlfile.mtime() == mtime
+
+
+@pytest.mark.parametrize("change, dirty", [
+    (lambda xml: xml.set({"maintainer": "toms"}), False),
+    (lambda xml: xml.set({"maintainer": "tom"}), True),
+    (lambda xml: xml.set({"status": "editing"}), True),
+    (lambda xml: xml.set_attr("maintainer", {"team": "doc"}), True),
+    (lambda xml: xml.del_attr("maintainer", ["team"]), False),
+    (lambda xml: xml.delete("status"), False),
+    (lambda xml: xml.delete("maintainer"), True),
+])
+def test_write_dirty(change, dirty, tmpdir):
+    """Checks that only changed trees are written
+
+    :param tmpdir: temporary directory
+    """
+    xmlfile = tmpdir / "dirty.xml"
+    xmlfile.write(HEAD + DOCMANAGER + BODY)
+
+    xml = XmlHandler(xmlfile.strpath)
+    assert not xml.dirty
+
+    change(xml)
+    assert xml.dirty == dirty
+    assert xml.write() == dirty
+    assert not xml.dirty
@@ -3,7 +3,7 @@
 import pytest
 
 from lxml import etree
-from docmanager.xmlutil import findinfo_pos
+from docmanager.xmlutil import findinfo_pos, findprolog_bytes, iterchunks, xmlencoding
 
 
 IDS =['with_title', 'with_subtitle', 'with_titleabbrev',
@@ -125,3 +125,34 @@ xmltestlist = [
 def test_findinfo_pos(xml, expected):
     root = etree.XML(xml)
     assert findinfo_pos(root) == expected
+
+
+@pytest.mark.parametrize("head,encoding", [
+    (b'<?xml version="1.0" encoding="ISO-8859-1"?><a/>', "iso8859-1"),
+    (b"<?xml version='1.0' encoding='utf-8'?><a/>",       "utf-8"),
+    (b'<?xml version="1.0"?><a encoding="latin1"/>',      "utf-8"),
+    (b'\xef\xbb\xbf<a/>',                                 "utf-8"),
+    ("<a/>".encode("utf-16"),                             "utf-16"),
+])
+def test_xmlencoding(head, encoding):
+    """Checks the encoding from the byte order mark or the XML declaration"""
+    assert xmlencoding(head) == encoding
+
+
+def test_findprolog_bytes():
+    """Checks that the offset of the start tag is counted in bytes"""
+    data = '<?xml version="1.0" encoding="UTF-8"?>\n<!-- \xe4\xf6\xfc -->\n<article>'.encode("utf-8")
+    prolog = findprolog_bytes(data, "utf-8", chunksize=5)
+
+    assert prolog["roottag"] == "article"
+    assert data[prolog["byteoffset"]:] == b"<article>"
+
+
+def test_iterchunks():
+    """Checks that the chunks end at line breaks"""
+    data = b"".join(("line &ent; %d\n" % i).encode() for i in range(100))
+    chunks = list(iterchunks(data, 5, chunksize=16))
+
+    assert b"".join(chunks) == data[5:]
+    assert all(chunk.endswith(b"\n") for chunk in chunks)
+